@@ -0,0 +1,237 @@
+"""Persistent on-disk cache of analysis results.
+
+Every analysed file gets one directory holding its RMS envelope and all
+levels of its waveform pyramid as .npy files, plus a meta.json with the
+sample rate and duration. Arrays are opened memory-mapped, so a hit costs
+a few small reads however long the recording is. Silence segments detected
+so far are kept as one small .npy per detection settings; results are
+held in memory first and only written when asked to (see
+CacheEntry.store_segments), so live re-detection never waits for the disk.
+
+Entries are keyed by a fingerprint of the file (size, mtime and a hash of
+a few sampled chunks of its content) together with the analysis
+parameters. Each entry directory's mtime records its last use. Once the
+total size exceeds max_bytes, the least recently used entries are deleted;
+eviction scans the directory, so there is no shared index for concurrent
+processes (e.g. the CLI's workers) to lose updates to.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+CACHE_VERSION = 2
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+FINGERPRINT_CHUNK = 1 << 20  # bytes hashed at the start, middle and end of a file
+MAX_SEGMENT_RESULTS = 32  # detection results kept per entry
+META_NAME = "meta.json"
+SEGMENTS_PREFIX = "segments-"
+TEMP_PREFIX = ".tmp-"
+STALE_TEMP_SECONDS = 3600  # temporary directories older than this were left by a crash
+
+
+def default_cache_dir():
+    base = os.environ.get("LOCALAPPDATA") if os.name == "nt" else None
+    base = base or os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "silence_cutter")
+
+
+def file_fingerprint(filepath):
+    """Return a cheap fingerprint of a file: size, mtime and a hash of sampled chunks."""
+    stat = os.stat(filepath)
+    digest = hashlib.blake2b(digest_size=16)
+    with open(filepath, "rb") as f:
+        for offset in sorted({0, max(0, stat.st_size // 2 - FINGERPRINT_CHUNK // 2),
+                              max(0, stat.st_size - FINGERPRINT_CHUNK)}):
+            f.seek(offset)
+            digest.update(f.read(FINGERPRINT_CHUNK))
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "content": digest.hexdigest()}
+
+
+def _settings_key(settings):
+    return json.dumps(settings, sort_keys=True)
+
+
+def _write_json(path, data):
+    # Write to a temporary file first so readers never see a half-written file.
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def _directory_size(path):
+    return sum(entry.stat().st_size for entry in os.scandir(path) if entry.is_file())
+
+
+def _segments_filename(settings_key):
+    return SEGMENTS_PREFIX + hashlib.blake2b(settings_key.encode("utf-8"), digest_size=8).hexdigest() + ".npy"
+
+
+class CacheEntry:
+    """One cached analysis: memory-mapped arrays, metadata and detection results."""
+
+    def __init__(self, cache, key, directory, meta):
+        self.cache = cache
+        self.key = key
+        self.directory = directory
+        self.meta = meta
+        self._results = {}  # settings key -> segments, most recent last
+        self._unsaved = set()  # settings keys of results not written yet
+        self._lock = threading.Lock()  # results come from the Tk thread and from job workers
+
+    def array(self, name):
+        return np.load(os.path.join(self.directory, name + ".npy"), mmap_mode="r")
+
+    def segments(self, settings):
+        """Return the cached silence segments for a settings dict, or None."""
+        settings_key = _settings_key(settings)
+        with self._lock:
+            segments = self._results.get(settings_key)
+        if segments is not None:
+            return list(segments)
+        try:
+            array = np.load(os.path.join(self.directory, _segments_filename(settings_key)))
+        except (OSError, ValueError):
+            return None
+        segments = [tuple(segment) for segment in array.tolist()]
+        self._remember(settings_key, segments)
+        return list(segments)
+
+    def store_segments(self, settings, segments, persist=True):
+        """Keep a detection result; with persist, write it (and any unsaved ones) to disk.
+
+        Without persist the result is only held in memory until the next
+        flush, which is what live re-detection on the GUI thread wants.
+        """
+        settings_key = _settings_key(settings)
+        self._remember(settings_key, [tuple(segment) for segment in segments])
+        with self._lock:
+            self._unsaved.add(settings_key)
+        if persist:
+            self.flush()
+
+    def _remember(self, settings_key, segments):
+        with self._lock:
+            self._results.pop(settings_key, None)
+            self._results[settings_key] = segments
+            while len(self._results) > MAX_SEGMENT_RESULTS:
+                oldest = next(iter(self._results))  # dicts keep insertion order
+                del self._results[oldest]
+                self._unsaved.discard(oldest)
+
+    def flush(self):
+        """Write the results not saved yet, keeping the MAX_SEGMENT_RESULTS newest files."""
+        with self._lock:
+            unsaved = [(settings_key, self._results[settings_key]) for settings_key in self._results
+                       if settings_key in self._unsaved]
+            self._unsaved.clear()
+        if not unsaved:
+            return
+        try:
+            for settings_key, segments in unsaved:
+                array = np.array(segments, dtype=np.float64).reshape(-1, 2)
+                fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix=TEMP_PREFIX, suffix=".npy")
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(temp_path, os.path.join(self.directory, _segments_filename(settings_key)))
+            saved = sorted((entry for entry in os.scandir(self.directory)
+                            if entry.name.startswith(SEGMENTS_PREFIX)), key=lambda entry: entry.stat().st_mtime)
+            for entry in saved[:-MAX_SEGMENT_RESULTS]:
+                os.unlink(entry.path)
+        except OSError:
+            pass  # Evicted meanwhile; the results are simply not cached.
+
+
+class AnalysisCache:
+    """Directory of cached analyses with a size cap and LRU eviction."""
+
+    def __init__(self, directory=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory or default_cache_dir()
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key_for(self, filepath, params):
+        description = {"version": CACHE_VERSION, "file": file_fingerprint(filepath), "params": params}
+        return hashlib.blake2b(_settings_key(description).encode("utf-8"), digest_size=20).hexdigest()
+
+    def lookup(self, key):
+        """Return the CacheEntry for a key from key_for, or None on a miss."""
+        directory = os.path.join(self.directory, key)
+        meta = _read_json(os.path.join(directory, META_NAME), None)
+        if meta is None:
+            return None
+        self._touch(directory)
+        return CacheEntry(self, key, directory, meta)
+
+    def store(self, key, arrays, meta):
+        """Write arrays (name -> ndarray) and meta under a key; return the new CacheEntry."""
+        directory = os.path.join(self.directory, key)
+        temp_directory = tempfile.mkdtemp(dir=self.directory, prefix=TEMP_PREFIX)
+        try:
+            for name, array in arrays.items():
+                np.save(os.path.join(temp_directory, name + ".npy"), np.ascontiguousarray(array))
+            _write_json(os.path.join(temp_directory, META_NAME), meta)
+            os.replace(temp_directory, directory)
+        except OSError:
+            # Another process stored the same entry first.
+            shutil.rmtree(temp_directory, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+        self._touch(directory)
+        self.evict(keep=key)
+        return CacheEntry(self, key, directory, _read_json(os.path.join(directory, META_NAME), meta))
+
+    @staticmethod
+    def _touch(directory):
+        try:
+            os.utime(directory)
+        except OSError:
+            pass  # Evicted by another process meanwhile.
+
+    def entries(self):
+        """Return (last_used, bytes, key) for every entry, read from the directory itself."""
+        entries = []
+        now = time.time()
+        for item in os.scandir(self.directory):
+            try:
+                if not item.is_dir():
+                    continue
+                last_used = item.stat().st_mtime
+                if item.name.startswith(TEMP_PREFIX):
+                    if now - last_used > STALE_TEMP_SECONDS:
+                        shutil.rmtree(item.path, ignore_errors=True)
+                    continue
+                entries.append((last_used, _directory_size(item.path), item.name))
+            except OSError:
+                continue  # Removed by another process while scanning.
+        return entries
+
+    def evict(self, keep=None):
+        """Delete least recently used entries (except keep) until the cache fits in max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, key in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+        os.makedirs(self.directory, exist_ok=True)
@@ -0,0 +1,92 @@
+"""Benchmark: librosa/audioread load vs. the ffmpeg pipe decoder on a long MP4.
+
+Builds a 1080p H.264 + AAC test video (a one-minute clip, stream-copied in a
+loop up to the requested length, so generating it is quick), then times
+
+* librosa      - librosa.load(path), the old load path (audioread fallback)
+* pipe         - decode_ffmpeg at 22050 Hz into one preallocated array
+* pipe stream  - iter_ffmpeg_blocks at 22050 Hz through the streaming analysis
+
+and load_audio + detect_silence end to end, with and without streaming.
+Peak memory is not measured here. Requires ffmpeg and ffprobe on PATH. Run
+from the repository root:
+
+    python benchmarks/bench_decode.py [--minutes 120] [--input existing.mp4]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import warnings
+
+import librosa
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DetectionSettings, compute_rms, detect_silence, load_audio  # noqa: E402
+from ffmpeg_decode import decode_ffmpeg, iter_ffmpeg_blocks, probe_audio  # noqa: E402
+from ffmpeg_utils import FFMPEG, run_ffmpeg  # noqa: E402
+from streaming import analyse_blocks  # noqa: E402
+
+ANALYSIS_RATE = 22050
+
+
+def make_test_video(path, minutes, workdir):
+    clip = os.path.join(workdir, "clip.mp4")
+    # A 440 Hz tone that pauses for 1.5 s out of every 5 s.
+    run_ffmpeg([
+        FFMPEG, "-y", "-f", "lavfi", "-i", "testsrc2=size=1920x1080:rate=30",
+        "-f", "lavfi", "-i", "aevalsrc=0.3*sin(2*PI*440*t)*gt(mod(t\\,5)\\,1.5):s=48000:c=stereo",
+        "-t", "60", "-c:v", "libx264", "-preset", "ultrafast", "-b:v", "4M", "-maxrate", "4M",
+        "-bufsize", "8M", "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "128k", clip
+    ])
+    run_ffmpeg([FFMPEG, "-y", "-stream_loop", str(int(minutes) - 1), "-i", clip, "-c", "copy", path])
+
+
+def timed(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return time.perf_counter() - started, result
+
+
+def load_and_detect(path, **kwargs):
+    source = load_audio(path, **kwargs)
+    compute_rms(source)
+    return detect_silence(source, DetectionSettings())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=float, default=120, help="test video length in minutes")
+    parser.add_argument("--input", help="use this file instead of generating one")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore")  # librosa warns about its audioread fallback on every call
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = args.input
+        if path is None:
+            path = os.path.join(workdir, "test.mp4")
+            make_test_video(path, args.minutes, workdir)
+        _, duration, _ = probe_audio(path)
+        print(f"{path}: {duration / 60:.1f} min, {os.path.getsize(path) / 1e6:.0f} MB")
+        librosa.load(path, duration=1.0)  # warm up librosa's lazy submodules
+
+        librosa_time, (librosa_samples, _) = timed(librosa.load, path, sr=ANALYSIS_RATE)
+        pipe_time, pipe_samples = timed(decode_ffmpeg, path, ANALYSIS_RATE, duration)
+        stream_time, analysis = timed(analyse_blocks, iter_ffmpeg_blocks(path, ANALYSIS_RATE), ANALYSIS_RATE)
+        print(f"{'decode':>14} {'time (s)':>9} {'samples':>12} {'speedup':>8}")
+        for name, elapsed, n_samples in (("librosa", librosa_time, librosa_samples.shape[0]),
+                                         ("pipe", pipe_time, pipe_samples.shape[0]),
+                                         ("pipe stream", stream_time, analysis.n_samples)):
+            print(f"{name:>14} {elapsed:>9.2f} {n_samples:>12} {librosa_time / elapsed:>7.1f}x")
+        del librosa_samples, pipe_samples
+
+        print(f"{'load + detect':>14} {'time (s)':>9} {'gaps':>12}")
+        for name, kwargs in (("in memory", {}), ("streaming", {"streaming": True})):
+            elapsed, segments = timed(load_and_detect, path, **kwargs)
+            print(f"{name:>14} {elapsed:>9.2f} {len(segments):>12}")
+
+
+if __name__ == "__main__":
+    main()
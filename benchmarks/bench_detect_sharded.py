@@ -0,0 +1,71 @@
+"""Benchmark: single-pass RMS + segmentation vs. the sharded multi-core analysis.
+
+Builds a synthetic recording in memory (noise bursts and pauses at the
+analysis rate, 2 hours by default) and times detect_silence without a
+cached envelope on 1 process and on 2, 4 and 8 worker processes. The pool
+is started (and its workers warmed up) before timing, as it is reused for
+every later file. Every sharded run is checked against the single pass:
+the envelope and the segments must be identical. Scaling needs that many
+free cores. Run from the repository root:
+
+    python benchmarks/bench_detect_sharded.py [--hours 10] [--workers 2 4 8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import ANALYSIS_RATE, AudioSource, DetectionSettings, detect_silence  # noqa: E402
+from parallel_detect import MIN_SHARDED_SAMPLES, sharded_analysis  # noqa: E402
+
+BLOCK_SECONDS = 60
+
+
+def synthetic_recording(hours, seed=0):
+    # Built a minute at a time into one preallocated array.
+    rng = np.random.default_rng(seed)
+    n_samples = max(int(hours * 3600 * ANALYSIS_RATE), MIN_SHARDED_SAMPLES)
+    samples = np.empty(n_samples, dtype=np.float32)
+    quarter = ANALYSIS_RATE // 4
+    block = BLOCK_SECONDS * ANALYSIS_RATE
+    for start in range(0, n_samples, block):
+        stop = min(start + block, n_samples)
+        n = stop - start
+        loud = np.repeat(rng.random(-(-n // quarter)) > 0.3, quarter)[:n]
+        samples[start:stop] = rng.standard_normal(n) * np.where(loud, 0.2, 0.002)
+    return samples
+
+
+def timed_detect(samples, workers):
+    source = AudioSource("synthetic.wav", ANALYSIS_RATE, samples.shape[0] / ANALYSIS_RATE, audio_data=samples)
+    started = time.perf_counter()
+    segments = detect_silence(source, DetectionSettings(), workers=workers)
+    return time.perf_counter() - started, source.rms, segments
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=float, default=2, help="length of the synthetic recording")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8])
+    args = parser.parse_args()
+
+    samples = synthetic_recording(args.hours)
+    print(f"{samples.shape[0] / ANALYSIS_RATE / 3600:.1f} h at {ANALYSIS_RATE} Hz, {os.cpu_count()} CPUs")
+    timed_detect(samples[:ANALYSIS_RATE * 60], 1)  # librosa's first call compiles its kernels
+    single_time, single_rms, single_segments = timed_detect(samples, 1)
+    print(f"{'workers':>8} {'time (s)':>9} {'speedup':>8} {'efficiency':>11} {'identical':>10}")
+    print(f"{1:>8} {single_time:>9.2f} {1.0:>7.2f}x {1.0:>10.0%} {'-':>10}")
+    for workers in args.workers:
+        sharded_analysis(samples[:MIN_SHARDED_SAMPLES], 2048, 512, workers)  # start and warm up the pool
+        elapsed, rms, segments = timed_detect(samples, workers)
+        identical = np.array_equal(rms, single_rms) and segments == single_segments
+        speedup = single_time / elapsed
+        print(f"{workers:>8} {elapsed:>9.2f} {speedup:>7.2f}x {speedup / workers:>10.0%} {str(identical):>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark: load + detect with resampling vs. the native-rate analysis path.
+
+Writes a synthetic 44.1 kHz stereo recording (speech-like bursts separated
+by pauses) and times load_audio + compute_rms + detect_silence for
+
+* resampled - the default: librosa.load to 22050 Hz mono
+* native    - native_rate=True: decoded at 44.1 kHz, RMS on 2x decimated frames
+* streaming - block-wise native-rate analysis
+
+Run from the repository root (the argument is the length in minutes):
+
+    python benchmarks/bench_load_detect.py 30
+"""
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import DetectionSettings, compute_rms, detect_silence, load_audio  # noqa: E402
+
+SAMPLE_RATE = 44100
+
+
+def write_recording(filepath, minutes, seed=0):
+    # Written a minute at a time so long recordings never have to fit in memory.
+    rng = np.random.default_rng(seed)
+    with sf.SoundFile(filepath, "w", SAMPLE_RATE, 2, subtype="PCM_16") as f:
+        for _ in range(int(minutes)):
+            quarter = SAMPLE_RATE // 4
+            loud = np.repeat(rng.random(240) > 0.3, quarter)[:, None]
+            noise = rng.standard_normal((240 * quarter, 2)).astype(np.float32)
+            f.write(noise * np.where(loud, 0.2, 0.002).astype(np.float32))
+
+
+def time_load_detect(filepath, **load_kwargs):
+    started = time.perf_counter()
+    source = load_audio(filepath, **load_kwargs)
+    compute_rms(source)
+    segments = detect_silence(source, DetectionSettings())
+    return time.perf_counter() - started, source, segments
+
+
+def main():
+    minutes = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    with tempfile.TemporaryDirectory() as tmp:
+        filepath = os.path.join(tmp, "recording.wav")
+        write_recording(filepath, minutes)
+        load_audio(filepath, streaming=True)  # warm up librosa's lazy submodules and the page cache
+        print(f"{minutes:g} min, 44.1 kHz stereo WAV")
+        print(f"{'path':>10} {'time (s)':>9} {'rate (Hz)':>10} {'hop (ms)':>9} {'gaps':>6}")
+        baseline = None
+        for name, kwargs in (("resampled", {}), ("native", {"native_rate": True}), ("streaming", {"streaming": True})):
+            elapsed, source, segments = time_load_detect(filepath, **kwargs)
+            baseline = baseline or elapsed
+            hop_ms = 1000.0 * source.hop_length / source.sample_rate
+            print(f"{name:>10} {elapsed:>9.2f} {source.sample_rate:>10} {hop_ms:>9.1f} {len(segments):>6}"
+                  f"  ({baseline / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Rendering benchmark: per-gap axvspan/axvline artists vs. the blitted WaveformView.
+
+Scrolls a zoomed-in view across a synthetic one-hour waveform with 100,
+1,000 and 10,000 silence gaps, a twentieth of the window per frame as when
+dragging the scroll slider, and reports frames per second for
+
+* legacy   - one axvspan and two axvlines per gap, full canvas draw per frame
+* full     - WaveformView with a full canvas draw per frame
+* scroll   - WaveformView.set_view alone, what the GUI does: the visible part
+             of the pre-rendered strip and the overlay are blitted, and the
+             strip is rendered again whenever the view reaches its edge
+* redetect - WaveformView.set_silence on a fixed view, i.e. a new detection
+             result
+
+Uses the Agg backend, so no display is needed; the copy of the blitted (or
+fully drawn) pixels to a Tk window is not included. Run from the repository
+root:
+
+    python benchmarks/bench_render.py
+"""
+import os
+import sys
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from waveform_pyramid import WaveformPyramid  # noqa: E402
+from waveform_view import WaveformView  # noqa: E402
+
+SAMPLE_RATE = 8000
+DURATION = 3600.0
+ZOOM = 10  # the visible window is DURATION / ZOOM
+FRAMES = 60
+STEPS_PER_WINDOW = 20  # scrolling moves the view by window / STEPS_PER_WINDOW per frame
+
+
+def synthetic_pyramid(seed=0):
+    rng = np.random.default_rng(seed)
+    samples = (rng.standard_normal(int(DURATION * SAMPLE_RATE)) * 0.3).astype(np.float32)
+    return WaveformPyramid.from_samples(samples, SAMPLE_RATE)
+
+
+def synthetic_gaps(n_gaps, seed=0):
+    # One gap somewhere in the first half of each of n_gaps equal slots, so they never overlap.
+    rng = np.random.default_rng(seed)
+    slot = DURATION / n_gaps
+    starts = np.arange(n_gaps) * slot + rng.uniform(0, slot / 2, n_gaps)
+    lengths = rng.uniform(0.1, 0.5, n_gaps) * min(slot, 2.0)
+    return list(zip(starts, starts + lengths))
+
+
+def scroll_positions():
+    window = DURATION / ZOOM
+    return [(start, start + window) for start in np.arange(FRAMES) * window / STEPS_PER_WINDOW]
+
+
+def new_axes():
+    fig, ax = plt.subplots(figsize=(8, 2), dpi=100)
+    ax.axis("off")
+    return fig, ax
+
+
+def bench_legacy(pyramid, gaps):
+    # What main.py used to do: three artists per gap and a full redraw per frame.
+    fig, ax = new_axes()
+    ax.set_ylim(-pyramid.peak, pyramid.peak)
+    for start, end in gaps:
+        ax.axvspan(start, end, color="red", alpha=0.3)
+        ax.axvline(x=start, color="red", linestyle="--", linewidth=0.8)
+        ax.axvline(x=end, color="red", linestyle="--", linewidth=0.8)
+    waveform = None
+    started = time.perf_counter()
+    for start, end in scroll_positions():
+        ax.set_xlim(start, end)
+        times, mins, maxs = pyramid.view(start, end, int(ax.bbox.width))
+        if waveform is not None:
+            waveform.remove()
+        waveform = ax.fill_between(times, mins, maxs, step="post", linewidth=0.5)
+        fig.canvas.draw()
+    elapsed = time.perf_counter() - started
+    plt.close(fig)
+    return FRAMES / elapsed
+
+
+def bench_full(pyramid, gaps):
+    fig, ax = new_axes()
+    view = WaveformView(ax, pyramid)
+    view.set_silence(gaps)
+    started = time.perf_counter()
+    for start, end in scroll_positions():
+        view.set_view(start, end)
+        fig.canvas.draw()
+    elapsed = time.perf_counter() - started
+    plt.close(fig)
+    return FRAMES / elapsed
+
+
+def bench_scroll(pyramid, gaps):
+    fig, ax = new_axes()
+    view = WaveformView(ax, pyramid)
+    view.set_silence(gaps)
+    view.set_view(*scroll_positions()[0])  # The first view draws the canvas and caches the background.
+    started = time.perf_counter()
+    for start, end in scroll_positions()[1:]:
+        view.set_view(start, end)
+    elapsed = time.perf_counter() - started
+    plt.close(fig)
+    return (FRAMES - 1) / elapsed
+
+
+def bench_redetect(pyramid, gaps):
+    fig, ax = new_axes()
+    view = WaveformView(ax, pyramid)
+    view.set_view(*scroll_positions()[FRAMES // 2])  # Draws the canvas and caches the background.
+    started = time.perf_counter()
+    for _ in range(FRAMES):
+        view.set_silence(gaps)
+    elapsed = time.perf_counter() - started
+    plt.close(fig)
+    return FRAMES / elapsed
+
+
+def main():
+    pyramid = synthetic_pyramid()
+    print(f"{'gaps':>6} {'legacy fps':>11} {'full fps':>9} {'scroll fps':>11} {'redetect fps':>13}")
+    for n_gaps in (100, 1000, 10000):
+        gaps = synthetic_gaps(n_gaps)
+        print(f"{n_gaps:>6} {bench_legacy(pyramid, gaps):>11.1f} {bench_full(pyramid, gaps):>9.1f} "
+              f"{bench_scroll(pyramid, gaps):>11.1f} {bench_redetect(pyramid, gaps):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
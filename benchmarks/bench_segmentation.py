@@ -0,0 +1,88 @@
+"""Micro-benchmark: vectorized segmentation vs. the original per-frame loop.
+
+Run from the repository root:
+
+    python benchmarks/bench_segmentation.py
+"""
+import os
+import sys
+import time
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from segmentation import detect_silence_segments  # noqa: E402
+
+SAMPLE_RATE = 22050
+HOP_LENGTH = 512
+
+
+def legacy_detect(rms, sample_rate, hop_length, noise_threshold_percent,
+                  min_silence_duration_ms, offset_in_ms, offset_out_ms):
+    # Copy of the loop that used to live in SilenceCutterApp._detect_silence.
+    silence_mask = rms < noise_threshold_percent * np.max(rms)
+    silence_segments = []
+    in_silence = False
+    silence_start_frame = 0
+    min_silence_frames = int(min_silence_duration_ms * sample_rate / hop_length / 1000)
+    for i, is_silent in enumerate(silence_mask):
+        if is_silent and not in_silence:
+            in_silence = True
+            silence_start_frame = i
+        elif not is_silent and in_silence:
+            in_silence = False
+            silence_end_frame = i
+            if (silence_end_frame - silence_start_frame) >= min_silence_frames:
+                start_time = librosa.frames_to_time(silence_start_frame, sr=sample_rate, hop_length=hop_length)
+                end_time = librosa.frames_to_time(silence_end_frame, sr=sample_rate, hop_length=hop_length)
+                start_time += (offset_in_ms / 1000.0)
+                end_time -= (offset_out_ms / 1000.0)
+                start_time = max(0, start_time)
+                end_time = max(start_time, end_time)
+                silence_segments.append((start_time, end_time))
+    return silence_segments
+
+
+def synthetic_rms(hours, seed=0):
+    # Alternating speech (loud) and pause (quiet) runs of random length.
+    rng = np.random.default_rng(seed)
+    n_frames = int(hours * 3600 * SAMPLE_RATE / HOP_LENGTH)
+    rms = np.empty(n_frames, dtype=np.float32)
+    pos = 0
+    loud = True
+    while pos < n_frames:
+        run = int(rng.integers(5, 200))
+        level = rng.uniform(0.2, 1.0) if loud else rng.uniform(0.0, 0.05)
+        rms[pos:pos + run] = level
+        pos += run
+        loud = not loud
+    return rms
+
+
+def time_call(func, *args, repeat=3):
+    best = float("inf")
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    params = (SAMPLE_RATE, HOP_LENGTH, 0.1, 200, 20, 20)
+    legacy_detect(synthetic_rms(0.01), *params)  # warm up librosa's lazy submodules
+    print(f"{'mask':>6} {'frames':>10} {'loop (s)':>10} {'vector (s)':>11} {'speedup':>8}")
+    for hours in (1, 10):
+        rms = synthetic_rms(hours)
+        loop_time, loop_segments = time_call(legacy_detect, rms, *params, repeat=1)
+        vec_time, vec_segments = time_call(detect_silence_segments, rms, *params)
+        # The vectorized path also keeps a trailing run, which the loop drops.
+        assert np.allclose(vec_segments[:len(loop_segments)], loop_segments)
+        print(f"{hours:>5}h {rms.size:>10} {loop_time:>10.3f} {vec_time:>11.4f} {loop_time / vec_time:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
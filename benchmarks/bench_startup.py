@@ -0,0 +1,106 @@
+"""Startup check: how long importing the GUI takes, and what it pulls in.
+
+Runs `python -X importtime -c "import main"` in fresh processes and reports
+the best total import time and the modules that took longest. Startup must
+not import matplotlib or librosa's analysis stack (SciPy, numba): main.py
+loads those on first use and warms them up in the background once the
+window is shown. The exit status is 1 if any of them is imported, or if
+the import takes longer than --budget:
+
+    python benchmarks/bench_startup.py [--budget 0.5] [--window]
+
+With --window, the time from starting the interpreter until the window has
+been drawn is measured as well (needs a display). Run from the repository
+root. Timings include the OS file cache: the first run after a reboot, or
+from a network home directory, is slower.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that take seconds to import and must not be loaded before the window appears.
+HEAVY_MODULES = ("matplotlib", "scipy", "numba", "llvmlite", "sklearn", "PIL", "librosa.core", "librosa.feature")
+
+WINDOW_SNIPPET = """
+import time
+import tkinter as tk
+import main
+root = tk.Tk()
+app = main.SilenceCutterApp(root)
+root.update()
+print(time.time())
+app.on_close()
+"""
+
+
+def import_times(module):
+    """Import module in a fresh interpreter; return {name: (self_us, cumulative_us)} in import order."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=ROOT,
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        # "import time:       self [us] |  cumulative | imported package"
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times.setdefault(name.strip(), (int(self_us), int(cumulative_us)))
+    return times
+
+
+def heavy_imports(times):
+    """The HEAVY_MODULES entries that were imported (as themselves or through a submodule)."""
+    return [heavy for heavy in HEAVY_MODULES if any(name == heavy or name.startswith(heavy + ".") for name in times)]
+
+
+def window_time():
+    """Seconds from starting the interpreter until the window is drawn, or None without a display."""
+    started = time.time()
+    result = subprocess.run([sys.executable, "-c", WINDOW_SNIPPET], cwd=ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        reason = result.stderr.strip().splitlines() or [f"exit status {result.returncode}"]
+        print(f"window: not measured ({reason[-1]})")
+        return None
+    return float(result.stdout.split()[-1]) - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default="main", help="module to import (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh imports; the fastest counts")
+    parser.add_argument("--budget", type=float, default=0.5, help="seconds the import may take (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    parser.add_argument("--window", action="store_true", help="also time until the window is drawn")
+    args = parser.parse_args()
+
+    runs = [import_times(args.module) for _ in range(max(1, args.repeat))]
+    best = min(runs, key=lambda times: times[args.module][1])
+    total = best[args.module][1] / 1e6
+    print(f"import {args.module}: {total:.3f}s (best of {len(runs)}), {len(best)} modules")
+    print(f"{'self (ms)':>10} {'total (ms)':>11}  module")
+    for name, (self_us, cumulative_us) in sorted(best.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{self_us / 1e3:>10.1f} {cumulative_us / 1e3:>11.1f}  {name}")
+
+    failures = 0
+    heavy = heavy_imports(best)
+    if heavy:
+        failures += 1
+        print(f"FAIL: startup imports {', '.join(heavy)}")
+    if total > args.budget:
+        failures += 1
+        print(f"FAIL: import takes {total:.3f}s, over the {args.budget:.3f}s budget")
+    if args.window:
+        seconds = window_time()
+        if seconds is not None:
+            # A later run can fail too (e.g. the display goes away); the fastest successful run counts.
+            times = [seconds] + [window_time() for _ in range(max(1, args.repeat) - 1)]
+            seconds = min(t for t in times if t is not None)
+            print(f"window drawn after {seconds:.3f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
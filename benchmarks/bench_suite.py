@@ -0,0 +1,268 @@
+"""End-to-end benchmark suite over a deterministic synthetic corpus.
+
+Every case of a profile (see corpus.py: audio-only and ffmpeg-generated
+video, 1 minute to 10 hours, 10 to 10,000 silence gaps) is run in a fresh
+process, so peak memory is measured per case, through
+
+* load   - load_audio + compute_rms, without the analysis cache
+* detect - detect_silence with the default settings
+* render - the GUI's waveform and silence overlay, drawn once with Agg
+* export - export_output to MP3 (audio cases) or MP4 (video cases)
+
+Every case is run --repeat times (default 5). The suite reports the median
+throughput (media seconds per wall second) for each step and end to end,
+the spread of the runs, the peak RSS of the process (ffmpeg's memory is not
+included), and the per-stage breakdown from profiling.py. Each detection
+is also checked against the number of gaps in the corpus. librosa's lazy
+imports and JIT compilation are warmed up before the timed runs; with
+--cold they are not, and every repeat runs in a fresh process so each one
+is a cold start.
+
+Save a run as a baseline and compare later runs against it. A step counts
+as slower only if its median got slower by more than --tolerance and by
+more than the spread of the two runs (half the range of the repeats of
+each, added), so run-to-run noise is not reported. The exit status is 1
+if a step got slower, or the peak memory grew by more than --tolerance:
+
+    python benchmarks/bench_suite.py --profile quick --save-baseline baseline.json
+    python benchmarks/bench_suite.py --profile quick --baseline baseline.json
+
+Generated inputs are kept in --corpus-dir and reused by later runs.
+Requires ffmpeg and ffprobe on PATH. Run from the repository root.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt  # noqa: E402
+import numpy as np  # noqa: E402
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from core import (EXPORT_METHODS, EXPORT_STREAM_COPY, DetectionSettings, compute_rms,  # noqa: E402
+                  detect_silence, export_output, load_audio, warm_up_analysis)
+from corpus import PROFILES, ensure_case  # noqa: E402
+from ffmpeg_utils import FFMPEG, run_ffmpeg  # noqa: E402
+from profiling import Profiler, peak_rss, stage, using_profiler  # noqa: E402
+from waveform_view import WaveformView  # noqa: E402
+
+STEPS = ("load", "detect", "render", "export")
+DEFAULT_REPEAT = 5
+DEFAULT_CORPUS_DIR = os.path.join(tempfile.gettempdir(), "silence_cutter_corpus")
+
+
+def warm_up():
+    # librosa's first analysis imports SciPy and numba, and matplotlib's first draw loads
+    # fonts: together that takes seconds.
+    warm_up_analysis()
+    fig, ax = plt.subplots(figsize=(8, 2), dpi=100)
+    fig.canvas.draw()
+    plt.close(fig)
+
+
+def render(source, segments):
+    # What SilenceCutterApp.plot_waveform and show_silence draw, on an off-screen canvas.
+    fig, ax = plt.subplots(figsize=(8, 2), dpi=100)
+    ax.axis("off")
+    view = WaveformView(ax, source.pyramid)
+    view.set_view(0, source.total_duration)  # Draws the canvas: draw_idle is immediate on Agg.
+    view.set_silence(segments)
+    plt.close(fig)
+
+
+def run_once(case, filepath, streaming, export_method, export, workdir):
+    profiler = Profiler(case.name)
+    walls = {}
+    with using_profiler(profiler):
+        started = time.perf_counter()
+        source = load_audio(filepath, streaming=streaming)
+        compute_rms(source)
+        walls["load"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        segments = detect_silence(source, DetectionSettings())
+        walls["detect"] = time.perf_counter() - started
+
+        started = time.perf_counter()
+        with stage("plot", gaps=len(segments)):
+            render(source, segments)
+        walls["render"] = time.perf_counter() - started
+
+        if export:
+            output_filepath = os.path.join(workdir, case.name + (".mp4" if case.kind == "video" else ".mp3"))
+            started = time.perf_counter()
+            export_output(source, segments, output_filepath, method=export_method)
+            walls["export"] = time.perf_counter() - started
+    return source.total_duration, len(segments), walls, profiler
+
+
+def run_case(case, filepath, streaming, export_method, export, repeat, cold=False):
+    """Run one case (in a worker process) repeat times; return the wall times of every run."""
+    if not cold:
+        warm_up()
+    runs = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        for _ in range(repeat):
+            media_seconds, gaps_found, walls, profiler = run_once(case, filepath, streaming, export_method,
+                                                                  export, workdir)
+            for step, wall in dict(walls, total=sum(walls.values())).items():
+                runs.setdefault(step, []).append(wall)
+    return {"media_seconds": media_seconds, "gaps_found": gaps_found, "runs": runs, "peak_rss": peak_rss(),
+            "stages": profiler.summary()}  # stages of the last repeat
+
+
+def summarise(case, parts):
+    """Merge the run_case results of one case into its medians and spreads."""
+    runs = {}
+    for part in parts:
+        for step, walls in part["runs"].items():
+            runs.setdefault(step, []).extend(walls)
+    wall = {step: float(np.median(walls)) for step, walls in runs.items()}
+    media_seconds = parts[-1]["media_seconds"]
+    peaks = [part["peak_rss"] for part in parts if part["peak_rss"] is not None]
+    return {
+        "kind": case.kind,
+        "media_seconds": media_seconds,
+        "sample_rate": case.sample_rate,
+        "gaps_expected": case.n_gaps,
+        "gaps_found": parts[-1]["gaps_found"],
+        "wall": wall,
+        # Half the range of the repeats: how far a single median may move by noise alone.
+        "spread": {step: (max(walls) - min(walls)) / 2 for step, walls in runs.items()},
+        "runs": runs,
+        "throughput": {step: media_seconds / median for step, median in wall.items() if median > 0},
+        "peak_rss": max(peaks) if peaks else None,
+        "stages": parts[-1]["stages"],
+    }
+
+
+def ffmpeg_version():
+    try:
+        return run_ffmpeg([FFMPEG, "-version"]).decode("utf-8", "replace").splitlines()[0]
+    except (OSError, RuntimeError):
+        return None
+
+
+def machine_info():
+    return {"platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "python": platform.python_version(), "numpy": np.__version__, "ffmpeg": ffmpeg_version()}
+
+
+def megabytes(value):
+    return f"{value / 2 ** 20:.0f}" if value is not None else "-"
+
+
+def print_results(results):
+    header = f"{'case':<18} {'media':>8} {'gaps':>11}" + "".join(f" {step + ' (x)':>12}" for step in STEPS)
+    print(header + f" {'total (x)':>11} {'spread':>7} {'RSS MB':>7}")
+    for name, result in results.items():
+        throughput = result["throughput"]
+        steps = "".join(f" {throughput[step]:>12.1f}" if step in throughput else f" {'-':>12}" for step in STEPS)
+        gaps = f"{result['gaps_found']}/{result['gaps_expected']}"
+        spread = result["spread"]["total"] / result["wall"]["total"] if result["wall"]["total"] > 0 else 0.0
+        print(f"{name:<18} {result['media_seconds']:>7.0f}s {gaps:>11}{steps} {throughput['total']:>11.1f} "
+              f"{spread:>7.0%} {megabytes(result['peak_rss']):>7}")
+
+
+def compare(results, baseline, tolerance):
+    """Print the change of the medians against a baseline run; return the number of regressions."""
+    regressions = 0
+    for key in ("options", "machine"):
+        if baseline.get(key) != results.get(key):
+            print(f"note: {key} differ from the baseline; comparisons may not be meaningful")
+    print(f"{'case':<18} {'step':<8} {'baseline':>9} {'now':>9} {'change':>8} {'noise':>8}")
+    for name, result in results["cases"].items():
+        previous = baseline["cases"].get(name)
+        if previous is None:
+            print(f"{name:<18} (not in the baseline)")
+            continue
+        for step in STEPS + ("total",):
+            if step not in result["wall"] or step not in previous["wall"]:
+                continue
+            old, new = previous["wall"][step], result["wall"][step]
+            change = (new - old) / old if old > 0 else 0.0
+            # What the medians may differ by through noise alone; never below 10 ms.
+            noise = max(0.01, previous.get("spread", {}).get(step, 0.0) + result["spread"][step])
+            slower = change > tolerance and new - old > noise
+            regressions += slower
+            print(f"{name:<18} {step:<8} {old:>8.3f}s {new:>8.3f}s {change:>+7.1%} {noise:>7.3f}s"
+                  f"{'  SLOWER' if slower else ''}")
+        if result["peak_rss"] and previous.get("peak_rss"):
+            change = (result["peak_rss"] - previous["peak_rss"]) / previous["peak_rss"]
+            larger = change > tolerance
+            regressions += larger
+            print(f"{name:<18} {'RSS':<8} {megabytes(previous['peak_rss']):>7}MB {megabytes(result['peak_rss']):>7}MB "
+                  f"{change:>+7.1%}{'  LARGER' if larger else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profile", choices=tuple(PROFILES), default="quick",
+                        help="which cases to run (default: %(default)s; full includes a 10-hour file)")
+    parser.add_argument("--cases", nargs="+", metavar="NAME", help="only run these cases of the profile")
+    parser.add_argument("--corpus-dir", default=DEFAULT_CORPUS_DIR,
+                        help="where generated inputs are kept (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help="runs per case; the median of each step counts (default: %(default)s)")
+    parser.add_argument("--streaming", action="store_true", help="use the low-memory streaming analysis")
+    parser.add_argument("--export-method", choices=EXPORT_METHODS, default=EXPORT_STREAM_COPY)
+    parser.add_argument("--no-export", action="store_true", help="skip the export step")
+    parser.add_argument("--cold", action="store_true",
+                        help="do not warm up librosa; every repeat runs in a fresh process")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--baseline", metavar="PATH", help="compare against a baseline written by --save-baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10,
+                        help="relative slow-down or memory growth counted as a regression (default: %(default)s)")
+    args = parser.parse_args()
+
+    cases = [case for case in PROFILES[args.profile] if not args.cases or case.name in args.cases]
+    options = {"profile": args.profile, "streaming": args.streaming, "export_method": args.export_method,
+               "export": not args.no_export, "repeat": args.repeat, "cold": args.cold}
+    results = {"options": options, "machine": machine_info(), "cases": {}}
+    for case in cases:
+        started = time.perf_counter()
+        filepath = ensure_case(case, args.corpus_dir)
+        generated = time.perf_counter() - started
+        if generated > 1:
+            print(f"generated {os.path.basename(filepath)} in {generated:.0f}s")
+        # A new process per case (per repeat with --cold): peak RSS is a high-water mark and
+        # must not carry over, and only the first run in a process is cold.
+        repeat = max(1, args.repeat)
+        parts = []
+        for chunk in ([1] * repeat if args.cold else [repeat]):
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                parts.append(pool.submit(run_case, case, filepath, args.streaming, args.export_method,
+                                         not args.no_export, chunk, args.cold).result())
+        results["cases"][case.name] = summarise(case, parts)
+    print_results(results["cases"])
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+    mismatched = [name for name, result in results["cases"].items()
+                  if result["gaps_found"] != result["gaps_expected"]]
+    if mismatched:
+        print(f"warning: unexpected number of gaps in {', '.join(mismatched)}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        print(f"{regressions} regression(s) beyond {args.tolerance:.0%}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
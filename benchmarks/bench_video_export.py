@@ -0,0 +1,103 @@
+"""Benchmark: per-segment re-encode (sequential and parallel) vs. stream-copy vs. single-pass export.
+
+Generates a synthetic H.264 test video with ffmpeg, cuts the same keep-list
+with every export path and reports wall time and frame accuracy: the output
+frame count against the number of source frames inside the kept segments,
+and how many output frames show a different source frame than the one
+expected at their position (a frame repeated or dropped at a cut). Requires
+ffmpeg and ffprobe on PATH. Run from the repository root:
+
+    python benchmarks/bench_video_export.py [--duration 600] [--gaps 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ffmpeg_utils import FFMPEG, run_ffmpeg  # noqa: E402
+from filtergraph_export import export_video_single_pass  # noqa: E402
+from parallel_export import export_video_parallel  # noqa: E402
+from video_export import export_video_reencode, export_video_smart, probe_video_packets  # noqa: E402
+
+
+def make_test_video(path, duration, fps=30, gop=48):
+    run_ffmpeg([
+        FFMPEG, "-y", "-f", "lavfi", "-i", f"testsrc2=size=1280x720:rate={fps}",
+        "-f", "lavfi", "-i", "sine=frequency=440:sample_rate=48000",
+        "-t", str(duration), "-c:v", "libx264", "-preset", "veryfast", "-g", str(gop),
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path
+    ])
+
+
+def make_keep_list(duration, gaps, seed=0):
+    # Evenly spread gaps of random length and jittered position.
+    rng = np.random.default_rng(seed)
+    period = duration / (gaps + 1)
+    keep = []
+    last_end = 0.0
+    for i in range(1, gaps + 1):
+        centre = i * period + rng.uniform(-0.2, 0.2) * period
+        half = rng.uniform(0.1, 0.4) * period / 2
+        keep.append((last_end, centre - half))
+        last_end = centre + half
+    keep.append((last_end, float(duration)))
+    return keep
+
+
+def expected_frames(packet_times, keep):
+    """Indices of the source frames inside the kept segments, in output order."""
+    return np.concatenate([np.flatnonzero((packet_times >= s - 1e-5) & (packet_times < e - 1e-5)) for s, e in keep])
+
+
+def thumbnails(path, width=64, height=36):
+    """Every decoded frame, in presentation order, as a small grey image."""
+    raw = run_ffmpeg([FFMPEG, "-v", "error", "-i", path, "-map", "0:v:0", "-fps_mode", "passthrough",
+                      "-s", f"{width}x{height}", "-pix_fmt", "gray", "-f", "rawvideo", "-"])
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, width * height)
+
+
+def wrong_frames(source_frames, output_frames, expected, reach=2):
+    """Output frames that look more like a source frame near the expected one than like the expected one."""
+    wrong = 0
+    for frame, index in zip(output_frames.astype(np.float32), expected):
+        nearby = np.arange(max(0, index - reach), min(len(source_frames), index + reach + 1))
+        errors = np.mean((source_frames[nearby].astype(np.float32) - frame) ** 2, axis=1)
+        wrong += int(nearby[np.argmin(errors)] != index)
+    return wrong
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=300.0, help="test video length in seconds")
+    parser.add_argument("--gaps", type=int, default=50, help="number of silence gaps to cut")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        source = os.path.join(workdir, "source.mp4")
+        make_test_video(source, args.duration)
+        packet_times, _ = probe_video_packets(source)
+        keep = make_keep_list(args.duration, args.gaps)
+        expected = expected_frames(packet_times, keep)
+        source_frames = thumbnails(source)
+        print(f"source {args.duration:.0f}s, {args.gaps} gaps, {len(expected)} frames expected")
+        print(f"{'path':>10} {'wall (s)':>9} {'frames':>7} {'error':>6} {'wrong':>6}")
+        paths = (("reencode", export_video_reencode), ("parallel", export_video_parallel),
+                 ("smart", export_video_smart), ("single", export_video_single_pass))
+        for name, export in paths:
+            output = os.path.join(workdir, f"{name}.mp4")
+            start = time.perf_counter()
+            export(source, keep, output)
+            wall = time.perf_counter() - start
+            output_frames = thumbnails(output)
+            frames = len(output_frames)
+            wrong = wrong_frames(source_frames, output_frames, expected)
+            print(f"{name:>10} {wall:>9.2f} {frames:>7} {frames - len(expected):>+6} {wrong:>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""Deterministic synthetic speech/silence corpus for the benchmark suite.
+
+Every case is a recording of speech-like noise bursts (amplitude-modulated
+at a syllable rate, never quieter than a third of their peak) separated by
+exactly n_gaps pauses of 0.4-1.2 s of near-silence. Gap positions and all
+samples come from a seeded generator, so a case is the same file on every
+machine and every run; with the default detection settings exactly n_gaps
+silence gaps are found.
+
+Audio cases are written as 16-bit WAV a block at a time (a 10-hour case
+never has to fit in memory). Video cases mux that audio with an ffmpeg
+test pattern encoded as H.264 with a fixed GOP, written bit-exact.
+"""
+import hashlib
+import os
+import sys
+
+import numpy as np
+import soundfile as sf
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ffmpeg_utils import FFMPEG, run_ffmpeg  # noqa: E402
+
+CORPUS_VERSION = 1
+BLOCK_SECONDS = 60
+SPEECH_AMPLITUDE = 0.25
+SILENCE_AMPLITUDE = 0.002
+SYLLABLE_RATE = 4.0  # Hz
+MIN_GAP, MAX_GAP = 0.4, 1.2  # seconds
+
+
+class Case:
+    """One corpus entry: kind is "audio" or "video", duration in seconds."""
+
+    def __init__(self, name, kind, duration, n_gaps, sample_rate=44100, seed=0):
+        self.name = name
+        self.kind = kind
+        self.duration = float(duration)
+        self.n_gaps = n_gaps
+        self.sample_rate = sample_rate
+        self.seed = seed
+
+    @property
+    def extension(self):
+        return ".mp4" if self.kind == "video" else ".wav"
+
+    def filename(self):
+        # Parameters are part of the name, so a changed case is never mistaken for a stale file.
+        spec = f"{CORPUS_VERSION}:{self.kind}:{self.duration}:{self.n_gaps}:{self.sample_rate}:{self.seed}"
+        return f"{self.name}-{hashlib.blake2b(spec.encode(), digest_size=4).hexdigest()}{self.extension}"
+
+
+# Profiles: which cases a run covers. Long cases use 16 kHz to keep the files manageable.
+PROFILES = {
+    "quick": [
+        Case("audio-1m-10", "audio", 60, 10),
+        Case("audio-10m-100", "audio", 600, 100),
+        Case("video-1m-10", "video", 60, 10),
+    ],
+    "standard": [
+        Case("audio-1m-10", "audio", 60, 10),
+        Case("audio-10m-100", "audio", 600, 100),
+        Case("audio-1h-1000", "audio", 3600, 1000, sample_rate=16000),
+        Case("video-1m-10", "video", 60, 10),
+        Case("video-10m-100", "video", 600, 100),
+    ],
+    "full": [
+        Case("audio-1m-10", "audio", 60, 10),
+        Case("audio-10m-100", "audio", 600, 100),
+        Case("audio-1h-1000", "audio", 3600, 1000, sample_rate=16000),
+        Case("audio-10h-10000", "audio", 36000, 10000, sample_rate=16000),
+        Case("video-1m-10", "video", 60, 10),
+        Case("video-10m-100", "video", 600, 100),
+        Case("video-1h-1000", "video", 3600, 1000),
+    ],
+}
+
+
+def gap_boundaries(case):
+    """Return the sorted times [speech, gap, speech, gap, ..., speech] alternate between."""
+    rng = np.random.default_rng(case.seed)
+    gaps = rng.uniform(MIN_GAP, MAX_GAP, case.n_gaps)
+    # Speech runs share what is left, each between 0.5x and 1.5x of the average.
+    weights = 0.5 + rng.random(case.n_gaps + 1)
+    speech = weights / weights.sum() * (case.duration - gaps.sum())
+    lengths = np.empty(2 * case.n_gaps + 1)
+    lengths[0::2] = speech
+    lengths[1::2] = gaps
+    return np.cumsum(lengths)[:-1]
+
+
+def silence_segments(case):
+    """The (start, end) gaps of a case in seconds."""
+    boundaries = gap_boundaries(case)
+    return list(zip(boundaries[0::2].tolist(), boundaries[1::2].tolist()))
+
+
+def write_audio(case, filepath):
+    boundaries = gap_boundaries(case)
+    rng = np.random.default_rng(case.seed + 1)
+    block = int(BLOCK_SECONDS * case.sample_rate)
+    n_samples = int(case.duration * case.sample_rate)
+    with sf.SoundFile(filepath, "w", case.sample_rate, 1, subtype="PCM_16") as f:
+        for start in range(0, n_samples, block):
+            t = np.arange(start, min(start + block, n_samples)) / case.sample_rate
+            # Even boundary index: speech; odd: a gap.
+            silent = np.searchsorted(boundaries, t, side="right") % 2 == 1
+            envelope = SPEECH_AMPLITUDE * (0.65 + 0.35 * np.sin(2 * np.pi * SYLLABLE_RATE * t))
+            envelope[silent] = SILENCE_AMPLITUDE
+            f.write((rng.standard_normal(t.shape[0]) * envelope).astype(np.float32))
+
+
+def write_video(case, filepath, audio_filepath):
+    run_ffmpeg([
+        FFMPEG, "-y", "-f", "lavfi", "-i", "testsrc2=size=640x360:rate=25", "-i", audio_filepath,
+        "-t", str(case.duration), "-map", "0:v", "-map", "1:a",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "50", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-fflags", "+bitexact", "-flags:v", "+bitexact",
+        "-flags:a", "+bitexact", filepath
+    ])
+
+
+def ensure_case(case, corpus_dir):
+    """Return the path of a case's file, generating it on first use."""
+    os.makedirs(corpus_dir, exist_ok=True)
+    filepath = os.path.join(corpus_dir, case.filename())
+    if os.path.exists(filepath):
+        return filepath
+    temp_filepath = filepath + ".part" + case.extension
+    if case.kind == "video":
+        audio_filepath = os.path.join(corpus_dir, case.filename() + ".audio.wav")
+        write_audio(case, audio_filepath)
+        try:
+            write_video(case, temp_filepath, audio_filepath)
+        finally:
+            os.unlink(audio_filepath)
+    else:
+        write_audio(case, temp_filepath)
+    os.replace(temp_filepath, filepath)
+    return filepath
@@ -0,0 +1,192 @@
+"""Command-line / batch front end for Silence Cutter.
+
+Processes many files without a display, e.g. on a render server:
+
+    python cli.py "lectures/*.mp4" -o cut/ --jobs 8
+
+Every input gets a JSON summary next to its output (or in --summary-dir),
+including wall time, CPU time and peak memory per stage; --trace also
+writes a Chrome trace of each run. The exit status is non-zero if any file
+failed.
+"""
+import argparse
+import glob
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis_cache import AnalysisCache
+from core import ANALYSIS_RATE, EXPORT_METHODS, EXPORT_STREAM_COPY, DetectionSettings, is_video_file, process_file
+from parallel_detect import default_detect_workers
+from parallel_export import default_workers
+from profiling import Profiler, write_chrome_trace
+
+OUTPUT_SUFFIX = "_silence_cut"
+
+
+def expand_inputs(patterns):
+    """Expand globs (shells on Windows do not) and drop duplicates, keeping order."""
+    inputs = []
+    seen = set()
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for match in matches:
+            if os.path.isfile(match) and match not in seen:
+                seen.add(match)
+                inputs.append(match)
+    return inputs
+
+
+def output_path_for(filepath, output_dir=None, output_format=None):
+    stem = os.path.splitext(os.path.basename(filepath))[0] + OUTPUT_SUFFIX
+    if output_format:
+        ext = "." + output_format.lstrip(".")
+    else:
+        ext = ".mp4" if is_video_file(filepath) else ".mp3"
+    return os.path.join(output_dir or os.path.dirname(filepath), stem + ext)
+
+
+def summary_path_for(filepath, output_filepath, summary_dir=None):
+    base = output_filepath or os.path.splitext(filepath)[0] + OUTPUT_SUFFIX
+    if summary_dir:
+        base = os.path.join(summary_dir, os.path.basename(base))
+    return base + ".json"
+
+
+def trace_path_for(summary_filepath):
+    return os.path.splitext(summary_filepath)[0] + ".trace.json"
+
+
+def path_collisions(paths):
+    """{path: inputs} for the paths more than one input would write; paths maps each input to its paths."""
+    writers = {}
+    for filepath, written in paths.items():
+        for path in written:
+            if path is not None:
+                writers.setdefault(os.path.normcase(os.path.abspath(path)), []).append(filepath)
+    return {path: inputs for path, inputs in writers.items() if len(inputs) > 1}
+
+
+def run_job(filepath, output_filepath, summary_filepath, settings, streaming, method, workers, cache=None,
+            native_rate=False, analysis_rate=ANALYSIS_RATE, trace=False, detect_workers=1):
+    """Process one file in a worker process; never raises, always writes a summary.
+
+    With trace, a Chrome trace of the run is written next to the summary
+    (also when the run failed).
+    """
+    started = time.perf_counter()
+    profiler = Profiler(os.path.basename(filepath))
+    try:
+        summary = process_file(filepath, output_filepath, settings, streaming=streaming,
+                               method=method, workers=workers, cache=cache, native_rate=native_rate,
+                               analysis_rate=analysis_rate, profiler=profiler, detect_workers=detect_workers)
+        summary["status"] = "ok"
+    except Exception as e:
+        summary = {
+            "input": filepath,
+            "output": output_filepath,
+            "status": "error",
+            "error": f"{type(e).__name__}: {e}",
+            "traceback": traceback.format_exc(),
+            "settings": settings.as_dict(),
+            "timings": {"total": time.perf_counter() - started},
+            "stages": profiler.summary(),
+        }
+    with open(summary_filepath, "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    if trace:
+        write_chrome_trace(trace_path_for(summary_filepath), [profiler])
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Remove silent segments from audio and video files.")
+    parser.add_argument("inputs", nargs="+", help="input files or glob patterns")
+    parser.add_argument("-o", "--output-dir", help="directory for outputs (default: next to each input)")
+    parser.add_argument("--summary-dir", help="directory for JSON summaries (default: next to each output)")
+    parser.add_argument("-f", "--format", choices=("mp3", "mp4"),
+                        help="output format (default: mp4 for video inputs, mp3 for audio inputs)")
+    parser.add_argument("-j", "--jobs", type=int, default=os.cpu_count() or 1,
+                        help="number of files processed concurrently (default: CPU count)")
+    parser.add_argument("--threshold", type=float, default=10.0, help="noise level threshold in %% of max RMS")
+    parser.add_argument("--min-silence", type=int, default=200, help="minimum silence duration in ms")
+    parser.add_argument("--offset-in", type=int, default=20, help="offset in, ms")
+    parser.add_argument("--offset-out", type=int, default=None, help="offset out, ms (default: same as --offset-in)")
+    parser.add_argument("--streaming", action="store_true", help="low-memory block-wise analysis")
+    parser.add_argument("--native-rate", action="store_true",
+                        help="decode at the file's own sample rate instead of resampling for analysis")
+    parser.add_argument("--analysis-rate", type=int, default=ANALYSIS_RATE,
+                        help="analysis sample rate in Hz, 0 for the file's own rate (default: %(default)s)")
+    parser.add_argument("--export-method", choices=EXPORT_METHODS, default=EXPORT_STREAM_COPY)
+    parser.add_argument("--export-workers", type=int,
+                        help="concurrent encodes per file for per-segment export (default: 1 with --jobs > 1)")
+    parser.add_argument("--detect-workers", type=int,
+                        help="processes a long file is analysed on (default: 1 with --jobs > 1, else up to 8)")
+    parser.add_argument("--cache-dir", help="analysis cache directory (default: the per-user cache directory)")
+    parser.add_argument("--no-cache", action="store_true", help="do not read or write the analysis cache")
+    parser.add_argument("--detect-only", action="store_true", help="only detect silence and write summaries")
+    parser.add_argument("--trace", action="store_true",
+                        help="also write a Chrome trace (.trace.json) of every run next to its summary")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    inputs = expand_inputs(args.inputs)
+    if not inputs:
+        print("No input files found.", file=sys.stderr)
+        return 2
+    settings = DetectionSettings(
+        noise_threshold=args.threshold,
+        min_silence_duration_ms=args.min_silence,
+        offset_in_ms=args.offset_in,
+        offset_out_ms=args.offset_in if args.offset_out is None else args.offset_out)
+    jobs = max(1, min(args.jobs, len(inputs)))
+    # With several files in flight, parallelism comes from the jobs, not from within one export.
+    workers = args.export_workers or (1 if jobs > 1 else default_workers())
+    detect_workers = args.detect_workers or (1 if jobs > 1 else default_detect_workers())
+    paths = {}
+    for filepath in inputs:
+        output_filepath = None if args.detect_only else output_path_for(filepath, args.output_dir, args.format)
+        paths[filepath] = (output_filepath, summary_path_for(filepath, output_filepath, args.summary_dir))
+    # Inputs sharing a name (a/talk.mp4 and b/talk.mp4 with -o, or talk.wav and talk.mp3) would
+    # overwrite each other's output and summary, so refuse before anything is processed.
+    collisions = path_collisions(paths)
+    if collisions:
+        print("Several inputs would write the same file:", file=sys.stderr)
+        for path, writers in collisions.items():
+            print(f"  {path}: {', '.join(writers)}", file=sys.stderr)
+        print("Rename them, or process them in separate runs with different --output-dir / --summary-dir.",
+              file=sys.stderr)
+        return 2
+    for directory in (args.output_dir, args.summary_dir):
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+    cache = None if args.no_cache else AnalysisCache(args.cache_dir)
+
+    failures = 0
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for filepath in inputs:
+            output_filepath, summary_filepath = paths[filepath]
+            future = pool.submit(run_job, filepath, output_filepath, summary_filepath, settings,
+                                 args.streaming, args.export_method, workers, cache, args.native_rate,
+                                 args.analysis_rate or None, args.trace, detect_workers)
+            futures[future] = filepath
+        for done, future in enumerate(as_completed(futures), start=1):
+            summary = future.result()
+            if summary["status"] == "ok":
+                print(f"[{done}/{len(inputs)}] ok    {futures[future]}: {summary['silence_gaps']} gaps, "
+                      f"{summary['timings']['total']:.1f}s")
+            else:
+                failures += 1
+                print(f"[{done}/{len(inputs)}] error {futures[future]}: {summary['error']}", file=sys.stderr)
+    print(f"{len(inputs) - failures} succeeded, {failures} failed")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
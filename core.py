@@ -0,0 +1,509 @@
+"""GUI-independent load / detect / export pipeline.
+
+Everything the Tk application does to a file lives here, so it can also be
+driven from the command line (see cli.py) or any other front end. Nothing
+in this module touches Tk; progress is reported through plain callbacks
+taking (percent, est_time_text), and every stage is timed through
+profiling.stage.
+"""
+import os
+import time
+
+import librosa
+import numpy as np
+import soundfile as sf
+
+from ffmpeg_decode import decode_ffmpeg, empty_samples, iter_ffmpeg_blocks, probe_audio
+from ffmpeg_utils import FFMPEG, run_ffmpeg_stdin
+from filtergraph_export import export_audio_single_pass, export_video_single_pass
+from parallel_detect import default_detect_workers, shared_signal, sharded_analysis, should_shard
+from parallel_export import default_workers, export_video_parallel
+from profiling import Profiler, annotate, stage, using_profiler
+from segmentation import (build_segments_to_keep, detect_silence_segments, kept_duration,
+                          silence_segments_from_runs)
+from streaming import analyse_blocks, can_stream, iter_mono_blocks, stream_rms
+from video_export import export_video_smart
+from waveform_pyramid import WaveformPyramid
+
+FRAME_LENGTH = 2048
+HOP_LENGTH = 512
+ANALYSIS_RATE = 22050  # Hz; FRAME_LENGTH and HOP_LENGTH are in samples at this rate
+
+VIDEO_EXTENSIONS = (".mp4", ".mkv", ".avi")
+
+# Export methods: stream copy is video-only; audio output falls back to the array-based path.
+EXPORT_STREAM_COPY = "stream-copy"
+EXPORT_SINGLE_PASS = "single-pass"
+EXPORT_PER_SEGMENT = "per-segment"
+EXPORT_METHODS = (EXPORT_STREAM_COPY, EXPORT_SINGLE_PASS, EXPORT_PER_SEGMENT)
+
+
+class DetectionSettings:
+    """Silence detection parameters, in the units the GUI shows them in."""
+
+    def __init__(self, noise_threshold=10.0, min_silence_duration_ms=200, offset_in_ms=20, offset_out_ms=20):
+        self.noise_threshold = noise_threshold  # percent of the maximum RMS
+        self.min_silence_duration_ms = min_silence_duration_ms
+        self.offset_in_ms = offset_in_ms
+        self.offset_out_ms = offset_out_ms
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class AudioSource:
+    """A loaded input file.
+
+    audio_data holds the mono samples after a normal load. After a streaming
+    load it is None and only the RMS envelope (rms) is kept. pyramid is the
+    min/max envelope used to draw the waveform.
+
+    samples are kept at sample_rate. When that is a native rate above the
+    analysis rate, decimation is the integer factor between them: RMS
+    frames are that many times longer, so the envelope has the time
+    resolution of the analysis rate without resampling anything.
+
+    The RMS envelope, its maximum and the (frame_length, hop_length) it was
+    computed with are cached here by compute_rms, so re-detecting with other
+    thresholds or offsets never touches the samples again.
+    """
+
+    def __init__(self, filepath, sample_rate, total_duration, audio_data=None, rms=None, pyramid=None,
+                 decimation=1, cache_entry=None):
+        self.filepath = filepath
+        self.sample_rate = sample_rate
+        self.total_duration = total_duration
+        self.audio_data = audio_data
+        self.decimation = decimation
+        self.rms = rms
+        self.rms_max = None if rms is None else _envelope_max(rms)
+        self.rms_params = (self.frame_length, self.hop_length) if rms is not None else None
+        self.pyramid = pyramid
+        self.cache_entry = cache_entry  # analysis_cache.CacheEntry, when loaded with a cache
+        self.is_video = is_video_file(filepath)
+
+    @property
+    def frame_length(self):
+        return FRAME_LENGTH * self.decimation
+
+    @property
+    def hop_length(self):
+        return HOP_LENGTH * self.decimation
+
+    def has_rms(self, frame_length=None, hop_length=None):
+        """True if the cached envelope was computed with these frame settings (default: the source's)."""
+        return self.rms is not None and self.rms_params == (frame_length or self.frame_length,
+                                                            hop_length or self.hop_length)
+
+
+def _envelope_max(rms):
+    return float(np.max(rms)) if rms.size else 0.0
+
+
+def is_video_file(filepath):
+    _, ext = os.path.splitext(filepath.lower())
+    return ext in VIDEO_EXTENSIONS
+
+
+def decimation_factor(native_rate, analysis_rate):
+    """Integer factor from native_rate down to about analysis_rate; 1 when analysis_rate is None."""
+    if not analysis_rate:
+        return 1
+    return max(1, int(native_rate // analysis_rate))
+
+
+def analysis_params(streaming, native_rate=False, analysis_rate=ANALYSIS_RATE):
+    """What an analysis depends on besides the file itself; part of the cache key."""
+    return {"frame_length": FRAME_LENGTH, "hop_length": HOP_LENGTH, "streaming": bool(streaming),
+            "native_rate": bool(native_rate), "analysis_rate": analysis_rate}
+
+
+def load_audio(filepath, streaming=False, cache=None, native_rate=False, analysis_rate=ANALYSIS_RATE,
+               detect_workers=None):
+    """Load a file for analysis; streaming keeps only the RMS envelope in memory.
+
+    By default the audio is resampled to analysis_rate. With native_rate the
+    samples are decoded at the file's own rate, nothing is resampled, and
+    the envelope is computed on integer-decimated frames instead (see
+    AudioSource); export then cuts from the original-rate samples.
+    Streaming always reads at the native rate. analysis_rate=None analyses
+    at the full native rate.
+
+    With an AnalysisCache, a file analysed before is restored from disk
+    (envelope and pyramid, no samples) and a new analysis is stored; the
+    envelope is then computed right away, on detect_workers processes (see
+    compute_rms).
+    """
+    if cache is None:
+        return _load_audio(filepath, streaming, native_rate, analysis_rate, detect_workers)
+    # Fingerprint before decoding: a file modified during the analysis will not match this key again.
+    with stage("cache lookup"):
+        key = cache.key_for(filepath, analysis_params(streaming, native_rate, analysis_rate))
+        entry = cache.lookup(key)
+        if entry is not None:
+            annotate(hit=True)
+            return _source_from_cache(filepath, entry)
+    source = _load_audio(filepath, streaming, native_rate, analysis_rate, detect_workers)
+    compute_rms(source, workers=detect_workers)
+    pyramid = source.pyramid
+    arrays = {"rms": source.rms}
+    for i, (_, level_mins, level_maxs) in enumerate(pyramid.levels):
+        arrays[f"mins_{i}"] = level_mins
+        arrays[f"maxs_{i}"] = level_maxs
+    meta = {
+        "sample_rate": source.sample_rate,
+        "decimation": source.decimation,
+        "total_duration": source.total_duration,
+        "n_samples": pyramid.n_samples,
+        "level_blocks": [block for block, _, _ in pyramid.levels],
+        "factor": pyramid.factor,
+    }
+    try:
+        with stage("cache store"):
+            source.cache_entry = cache.store(key, arrays, meta)
+    except OSError:
+        pass  # A full or read-only cache directory must not fail the load.
+    return source
+
+
+def _source_from_cache(filepath, entry):
+    meta = entry.meta
+    levels = [(block, entry.array(f"mins_{i}"), entry.array(f"maxs_{i}"))
+              for i, block in enumerate(meta["level_blocks"])]
+    pyramid = WaveformPyramid.from_levels(levels, meta["sample_rate"], meta["n_samples"], meta["factor"])
+    return AudioSource(filepath, meta["sample_rate"], meta["total_duration"], rms=entry.array("rms"),
+                       pyramid=pyramid, decimation=meta["decimation"], cache_entry=entry)
+
+
+def _signal_allocator(n_samples, detect_workers):
+    """shared_signal if a signal of n_samples will be analysed in shards (see compute_rms), else empty_samples.
+
+    Decoding a long signal straight into shared memory spares sharded_analysis a copy of it.
+    """
+    workers = default_detect_workers() if detect_workers is None else detect_workers
+    return shared_signal if should_shard(n_samples, workers) else empty_samples
+
+
+def _load_audio(filepath, streaming, native_rate, analysis_rate, detect_workers=None):
+    if not can_stream(filepath):
+        return _load_audio_ffmpeg(filepath, streaming, native_rate, analysis_rate, detect_workers)
+    if streaming:
+        # Only the RMS envelope is kept; samples are read again at export time if needed.
+        decimation = decimation_factor(sf.info(filepath).samplerate, analysis_rate)
+        # Decoding, RMS and the pyramid are interleaved block by block, so they are timed as one stage.
+        with stage("decode + analysis", streaming=True):
+            analysis = stream_rms(filepath, frame_length=FRAME_LENGTH * decimation,
+                                  hop_length=HOP_LENGTH * decimation)
+        return AudioSource(filepath, analysis.sample_rate, analysis.duration, rms=analysis.rms,
+                           pyramid=analysis.pyramid, decimation=decimation)
+    # For both audio and video, extract the audio track for waveform and silence detection
+    info = sf.info(filepath)
+    resample = not native_rate and analysis_rate and analysis_rate != info.samplerate
+    n_samples = info.frames * analysis_rate // info.samplerate if resample else info.frames
+    empty = _signal_allocator(n_samples, detect_workers)
+    with stage("decode"):
+        audio_data, sample_rate = read_native(filepath, empty=empty_samples if resample else empty)
+    if native_rate:
+        decimation = decimation_factor(sample_rate, analysis_rate)
+    else:
+        # What librosa.load(sr=analysis_rate) does, split so decode and resample are timed apart.
+        if resample:
+            with stage("resample", orig_sr=sample_rate, target_sr=analysis_rate):
+                audio_data = librosa.resample(audio_data, orig_sr=sample_rate, target_sr=analysis_rate)
+                if empty is not empty_samples:
+                    # The resampler allocates its own output; by now the larger input is gone.
+                    resampled, audio_data = audio_data, empty(audio_data.shape[0])
+                    audio_data[:] = resampled
+                    del resampled
+            sample_rate = analysis_rate
+        decimation = 1
+    total_duration = librosa.get_duration(y=audio_data, sr=sample_rate)
+    return AudioSource(filepath, sample_rate, total_duration, audio_data=audio_data,
+                       pyramid=_build_pyramid(audio_data, sample_rate), decimation=decimation)
+
+
+def _build_pyramid(audio_data, sample_rate):
+    with stage("pyramid"):
+        return WaveformPyramid.from_samples(audio_data, sample_rate)
+
+
+def _load_audio_ffmpeg(filepath, streaming, native_rate, analysis_rate, detect_workers=None):
+    # Video containers and other formats soundfile cannot read: one ffmpeg process decodes
+    # (and, unless native_rate, resamples) straight into NumPy, for streaming or not.
+    file_rate, duration, channels = probe_audio(filepath)
+    sample_rate = file_rate if native_rate or not analysis_rate else analysis_rate
+    decimation = decimation_factor(file_rate, analysis_rate) if native_rate else 1
+    # ffmpeg resamples while it decodes, so there is no separate resample stage here.
+    if streaming:
+        with stage("decode + analysis", streaming=True, ffmpeg=True, resampled=sample_rate != file_rate):
+            analysis = analyse_blocks(iter_ffmpeg_blocks(filepath, sample_rate, channels=channels), sample_rate,
+                                      FRAME_LENGTH * decimation, HOP_LENGTH * decimation,
+                                      expected_samples=duration and int(duration * sample_rate))
+        return AudioSource(filepath, sample_rate, analysis.duration, rms=analysis.rms,
+                           pyramid=analysis.pyramid, decimation=decimation)
+    empty = _signal_allocator(int((duration or 0) * sample_rate), detect_workers)
+    with stage("decode", ffmpeg=True, resampled=sample_rate != file_rate):
+        audio_data = decode_ffmpeg(filepath, sample_rate, duration, channels, empty)
+    return AudioSource(filepath, sample_rate, audio_data.shape[0] / float(sample_rate), audio_data=audio_data,
+                       pyramid=_build_pyramid(audio_data, sample_rate), decimation=decimation)
+
+
+def read_native(filepath, empty=empty_samples):
+    """Decode a whole file to mono float32 at its own sample rate, without resampling.
+
+    empty(n_samples) allocates the returned array (see decode_ffmpeg).
+    """
+    if can_stream(filepath):
+        with sf.SoundFile(filepath) as f:
+            if f.channels == 1:
+                samples = empty(f.frames)
+                return f.read(dtype="float32", out=samples[:, np.newaxis])[:, 0], f.samplerate
+            audio_data = f.read(dtype="float32", always_2d=True)
+            # Same downmix as librosa.to_mono: the mean over channels.
+            return np.mean(audio_data, axis=1, out=empty(audio_data.shape[0])), f.samplerate
+    sample_rate, duration, channels = probe_audio(filepath)
+    return decode_ffmpeg(filepath, sample_rate, duration, channels, empty), sample_rate
+
+
+def _stream_analysis(filepath, sample_rate, frame_length, hop_length):
+    if can_stream(filepath):
+        return stream_rms(filepath, frame_length=frame_length, hop_length=hop_length)
+    return analyse_blocks(iter_ffmpeg_blocks(filepath, sample_rate), sample_rate, frame_length, hop_length)
+
+
+def warm_up_analysis():
+    """Resample and analyse a short signal once.
+
+    librosa imports its submodules, SciPy and numba on the first analysis,
+    which takes seconds; a front end can do this ahead of the first file.
+    """
+    silence = np.zeros(1 << 14, dtype=np.float32)
+    librosa.resample(silence, orig_sr=44100, target_sr=ANALYSIS_RATE)
+    librosa.feature.rms(y=silence)
+
+
+def _use_shards(source, workers):
+    workers = default_detect_workers() if workers is None else workers
+    return source.audio_data is not None and should_shard(source.audio_data.shape[0], workers), workers
+
+
+def _set_rms(source, rms, frame_length, hop_length):
+    source.rms_max = _envelope_max(rms)
+    source.rms_params = (frame_length, hop_length)
+    source.rms = rms
+
+
+def compute_rms(source, frame_length=None, hop_length=None, workers=None):
+    """Return the RMS envelope of a source, computing it only on the first call.
+
+    frame_length and hop_length default to the source's own. The cache is
+    replaced when other frame settings are asked for. Long in-memory
+    signals are sharded across workers processes (default: one per core,
+    up to 8; 1 computes in this process); the result is the same.
+    """
+    frame_length = frame_length or source.frame_length
+    hop_length = hop_length or source.hop_length
+    if source.has_rms(frame_length, hop_length):
+        return source.rms
+    sharded, workers = _use_shards(source, workers)
+    with stage("rms", streaming=source.audio_data is None, workers=workers if sharded else 1):
+        if sharded:
+            rms, _, _ = sharded_analysis(source.audio_data, frame_length, hop_length, workers)
+        elif source.audio_data is not None:
+            rms = librosa.feature.rms(y=source.audio_data, frame_length=frame_length, hop_length=hop_length)[0]
+        else:
+            rms = _stream_analysis(source.filepath, source.sample_rate, frame_length, hop_length).rms
+    _set_rms(source, rms, frame_length, hop_length)
+    return rms
+
+
+def detect_silence(source, settings, workers=None, persist=True):
+    """Return the silence segments (start, end) in seconds for a loaded source.
+
+    Without a cached envelope, a long in-memory signal is analysed and
+    thresholded shard by shard on workers processes (see compute_rms).
+    With an analysis cache, the result is written to it unless persist is
+    False; it is then kept in memory until the next persisted detection
+    (or CacheEntry.flush), so live re-detection does no file I/O.
+    """
+    entry = source.cache_entry
+    if entry is not None:
+        segments = entry.segments(settings.as_dict())
+        if segments is not None:
+            if persist:
+                entry.flush()
+            return segments
+    sharded, workers = _use_shards(source, workers)
+    if sharded and not source.has_rms():
+        with stage("rms + segmentation", workers=workers):
+            rms, _, (start_frames, end_frames) = sharded_analysis(
+                source.audio_data, source.frame_length, source.hop_length, workers,
+                threshold_fraction=settings.noise_threshold / 100.0)
+            _set_rms(source, rms, source.frame_length, source.hop_length)
+            segments = silence_segments_from_runs(
+                start_frames, end_frames, source.sample_rate, source.hop_length,
+                settings.min_silence_duration_ms, settings.offset_in_ms, settings.offset_out_ms,
+                max_time=source.total_duration)
+    else:
+        rms = compute_rms(source)
+        with stage("segmentation", frames=rms.shape[0]):
+            segments = detect_silence_segments(
+                rms, source.sample_rate, source.hop_length, settings.noise_threshold / 100.0,
+                settings.min_silence_duration_ms, settings.offset_in_ms, settings.offset_out_ms,
+                max_time=source.total_duration, rms_max=source.rms_max)
+    if entry is not None:
+        entry.store_segments(settings.as_dict(), segments, persist=persist)
+    return segments
+
+
+# Samples written to ffmpeg per pipe write; bounds the extra memory of an audio export.
+EXPORT_CHUNK_SAMPLES = 1 << 18
+
+
+def iter_kept_samples(blocks, sample_ranges):
+    """Cut sorted (start_sample, end_sample) ranges out of consecutive blocks of samples.
+
+    Yields views of the blocks, so nothing is copied; stops reading blocks
+    after the last range.
+    """
+    ranges = iter(sample_ranges)
+    current = next(ranges, None)
+    position = 0
+    for block in blocks:
+        block_end = position + block.shape[0]
+        while current is not None and current[0] < block_end:
+            start = max(current[0], position)
+            end = min(current[1], block_end)
+            if end > start:
+                yield block[start - position:end - position]
+            if current[1] > block_end:
+                break  # The range continues in the next block.
+            current = next(ranges, None)
+        position = block_end
+        if current is None:
+            return
+
+
+def _sample_blocks(source):
+    """Mono float32 blocks of the whole source at source.sample_rate, in order."""
+    if source.audio_data is not None:
+        return [np.ascontiguousarray(source.audio_data, dtype=np.float32)]
+    # Streaming or cached load: decode again block by block instead of holding the file in memory.
+    if not can_stream(source.filepath):
+        return iter_ffmpeg_blocks(source.filepath, source.sample_rate)
+    native_rate = sf.info(source.filepath).samplerate
+    if native_rate == source.sample_rate:
+        return (block for _, block in iter_mono_blocks(source.filepath))
+    # A cached load that was resampled: librosa.resample needs the whole signal, and export must
+    # cut the very samples the analysis saw, not those of ffmpeg's resampler.
+    with stage("decode"):
+        audio_data, _ = read_native(source.filepath)
+    with stage("resample", orig_sr=native_rate, target_sr=source.sample_rate):
+        return [librosa.resample(audio_data, orig_sr=native_rate, target_sr=source.sample_rate)]
+
+
+def _chunked(views, chunk_samples=EXPORT_CHUNK_SAMPLES):
+    for view in views:
+        for start in range(0, view.shape[0], chunk_samples):
+            yield view[start:start + chunk_samples]
+
+
+def export_audio_piped(source, segments_to_keep, output_filepath, progress_callback=None):
+    """Encode the kept samples by writing them straight to ffmpeg's stdin.
+
+    No concatenated copy and no temporary WAV: views of the samples (or of
+    freshly decoded blocks after a streaming load) are written in fixed-size
+    chunks, and progress follows the bytes written.
+    """
+    sample_rate = source.sample_rate
+    n_samples = int(round(source.total_duration * sample_rate))
+    sample_ranges = []
+    for start, end in segments_to_keep:
+        start_sample = int(start * sample_rate)
+        end_sample = min(int(end * sample_rate), n_samples)
+        if end_sample > start_sample:
+            sample_ranges.append((start_sample, end_sample))
+    total_bytes = sum(end - start for start, end in sample_ranges) * 4
+    cmd = [
+        FFMPEG, "-y", "-f", "f32le", "-ar", str(sample_rate), "-ac", "1", "-i", "pipe:0",
+        "-vn", "-ar", str(sample_rate), "-ac", "2", "-b:a", "192k",
+        output_filepath
+    ]
+    chunks = _chunked(iter_kept_samples(_sample_blocks(source), sample_ranges))
+    with stage("encode", piped=True, segments=len(sample_ranges)):
+        run_ffmpeg_stdin(cmd, chunks, total_bytes, progress_callback)
+    if progress_callback is not None:
+        progress_callback(100, "Completed")
+
+
+def export_output(source, silence_segments, output_filepath, method=EXPORT_STREAM_COPY, workers=None,
+                  progress_callback=None):
+    """Write output_filepath with the silence segments removed.
+
+    An .mp4 output of a video source keeps the video; anything else is
+    written as audio only.
+    """
+    segments_to_keep = build_segments_to_keep(silence_segments, source.total_duration)
+    _, ext = os.path.splitext(output_filepath.lower())
+    if ext == ".mp4" and source.is_video:
+        if method == EXPORT_STREAM_COPY:
+            # Stream-copy keyframe-aligned spans, re-encode only the cut boundaries.
+            export_video_smart(source.filepath, segments_to_keep, output_filepath, progress_callback)
+        elif method == EXPORT_SINGLE_PASS:
+            # One ffmpeg process cuts the whole keep-list with a filtergraph.
+            export_video_single_pass(source.filepath, segments_to_keep, output_filepath, progress_callback)
+        else:
+            # Re-encode kept segments in batched chunks on a bounded pool of ffmpeg processes.
+            export_video_parallel(source.filepath, segments_to_keep, output_filepath, progress_callback,
+                                  workers=workers or default_workers())
+    elif method == EXPORT_SINGLE_PASS:
+        # Decode the source once and encode once, no temporary WAV.
+        export_audio_single_pass(source.filepath, segments_to_keep, output_filepath, progress_callback)
+    else:
+        export_audio_piped(source, segments_to_keep, output_filepath, progress_callback)
+    return segments_to_keep
+
+
+def process_file(filepath, output_filepath, settings, streaming=False, method=EXPORT_STREAM_COPY,
+                 workers=None, progress_callback=None, cache=None, native_rate=False, analysis_rate=ANALYSIS_RATE,
+                 profiler=None, detect_workers=None):
+    """Load, detect and (unless output_filepath is None) export one file.
+
+    workers is the number of concurrent encodes of a per-segment export,
+    detect_workers the number of processes a long file is analysed on.
+
+    Returns a JSON-serialisable summary of the run. Its per-stage totals
+    come from profiler (a new profiling.Profiler unless one is given, e.g.
+    to write a trace of the run afterwards).
+    """
+    profiler = profiler or Profiler(os.path.basename(filepath))
+    timings = {}
+    started = time.perf_counter()
+    with using_profiler(profiler):
+        source = load_audio(filepath, streaming=streaming, cache=cache, native_rate=native_rate,
+                            analysis_rate=analysis_rate, detect_workers=detect_workers)
+        timings["load"] = time.perf_counter() - started
+        stage_start = time.perf_counter()
+        silence_segments = detect_silence(source, settings, workers=detect_workers)
+        timings["detect"] = time.perf_counter() - stage_start
+        segments_to_keep = build_segments_to_keep(silence_segments, source.total_duration)
+        if output_filepath is not None:
+            stage_start = time.perf_counter()
+            export_output(source, silence_segments, output_filepath, method=method, workers=workers,
+                          progress_callback=progress_callback)
+            timings["export"] = time.perf_counter() - stage_start
+    timings["total"] = time.perf_counter() - started
+    return {
+        "input": filepath,
+        "output": output_filepath,
+        "duration": source.total_duration,
+        "sample_rate": source.sample_rate,
+        "analysis_rate": source.sample_rate / source.decimation,
+        "silence_gaps": len(silence_segments),
+        "silence_segments": silence_segments,
+        "kept_duration": kept_duration(segments_to_keep),
+        "settings": settings.as_dict(),
+        "export_method": method if output_filepath is not None else None,
+        "timings": timings,
+        "stages": profiler.summary(),
+    }
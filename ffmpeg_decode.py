@@ -0,0 +1,153 @@
+"""Audio decoding through an ffmpeg pipe.
+
+Used for everything soundfile cannot read (MP4/MKV/AVI containers, AAC,
+...). One ffmpeg process decodes the first audio stream, resamples it if
+asked to, and writes raw float32 samples to stdout. The samples are read
+with readinto straight into NumPy buffers, so no intermediate bytes
+objects are created.
+
+Multichannel audio is mixed down here, block by block, to the mean of the
+channels, as librosa.to_mono and read_native do. ffmpeg's own downmix
+("-ac 1") weights stereo by 0.707 instead of 0.5, which makes the samples
+3 dB louder than the same file read through soundfile.
+"""
+import subprocess
+import threading
+
+import numpy as np
+
+from ffmpeg_utils import FFMPEG, check_returncode, probe_json, start_process
+
+DEFAULT_BLOCK_SIZE = 1 << 18  # samples per read
+SAMPLE_BYTES = 4  # float32
+
+
+def probe_audio(filepath):
+    """Return (sample_rate, duration, channels) of the first audio stream; duration may be None."""
+    info = probe_json(filepath, "-select_streams", "a:0", "-show_entries",
+                      "stream=sample_rate,channels:format=duration")
+    streams = info.get("streams") or []
+    if not streams:
+        raise ValueError(f"No audio stream found in {filepath}")
+    duration = info.get("format", {}).get("duration")
+    return (int(streams[0]["sample_rate"]), float(duration) if duration else None,
+            int(streams[0].get("channels") or 1))
+
+
+def decode_command(filepath, sample_rate=None, channels=1):
+    """ffmpeg command writing the first audio stream as interleaved float32 PCM to stdout."""
+    # -vn/-sn/-dn as input options let the demuxer skip the other streams' packets. -ac is the
+    # stream's own channel count, so ffmpeg does not remix; it only pins the count should it change.
+    cmd = [FFMPEG, "-nostdin", "-v", "error", "-vn", "-sn", "-dn", "-i", filepath, "-map", "0:a:0",
+           "-ac", str(channels)]
+    if sample_rate:
+        cmd += ["-ar", str(sample_rate)]
+    return cmd + ["-f", "f32le", "pipe:1"]
+
+
+class DecodeProcess:
+    """Context manager around a running decode; stdout is the PCM stream.
+
+    Leaving the block early kills ffmpeg. A non-zero exit raises FFmpegError
+    (FFmpegCancelled if it was killed by cancelling its ProcessGroup).
+    channels is probed when not given.
+    """
+
+    def __init__(self, filepath, sample_rate=None, channels=None):
+        if channels is None:
+            channels = probe_audio(filepath)[2]
+        self.channels = channels
+        self.cmd = decode_command(filepath, sample_rate, channels)
+        # Interleaved frames of one read, averaged into the caller's mono buffer.
+        self._frames = np.empty((DEFAULT_BLOCK_SIZE, channels), dtype=np.float32) if channels > 1 else None
+        self.process = None
+        self._stderr_chunks = []
+        self._stderr_thread = None
+
+    def __enter__(self):
+        self.process = start_process(self.cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Drain stderr on the side so a chatty ffmpeg can never block on a full pipe.
+        self._stderr_thread = threading.Thread(target=lambda: self._stderr_chunks.append(self.process.stderr.read()))
+        self._stderr_thread.start()
+        return self
+
+    def readinto(self, samples):
+        """Fill a float32 array with raw interleaved values; return the number read (short only at EOF)."""
+        view = memoryview(samples).cast("B")
+        filled = 0
+        while filled < len(view):
+            n = self.process.stdout.readinto(view[filled:])
+            if not n:
+                break
+            filled += n
+        return filled // SAMPLE_BYTES
+
+    def read_mono(self, samples):
+        """Fill a float32 array with mono samples; return the number read (short only at EOF)."""
+        if self._frames is None:
+            return self.readinto(samples)
+        filled = 0
+        while filled < samples.shape[0]:
+            frames = self._frames[:samples.shape[0] - filled]
+            n = self.readinto(frames) // self.channels
+            np.mean(frames[:n], axis=1, out=samples[filled:filled + n])
+            filled += n
+            if n < frames.shape[0]:
+                break
+        return filled
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.process.kill()
+        self.process.stdout.close()
+        returncode = self.process.wait()
+        self._stderr_thread.join()
+        if exc_type is None:
+            check_returncode(self.cmd, returncode, b"".join(self._stderr_chunks))
+        return False
+
+
+def iter_ffmpeg_blocks(filepath, sample_rate=None, block_size=DEFAULT_BLOCK_SIZE, channels=None):
+    """Yield float32 mono blocks decoded by ffmpeg.
+
+    Every block is a view of the same reused buffer: copy anything that has
+    to outlive the next iteration.
+    """
+    buffer = np.empty(block_size, dtype=np.float32)
+    with DecodeProcess(filepath, sample_rate, channels) as decode:
+        while True:
+            n = decode.read_mono(buffer)
+            if n:
+                yield buffer[:n]
+            if n < block_size:
+                break
+
+
+def empty_samples(n_samples):
+    return np.empty(n_samples, dtype=np.float32)
+
+
+def decode_ffmpeg(filepath, sample_rate=None, duration=None, channels=None, empty=empty_samples):
+    """Decode a whole file to a float32 mono array; duration (if known) sizes the buffer up front.
+
+    empty(n_samples) allocates the float32 buffers (e.g. parallel_detect.shared_signal).
+    """
+    capacity = int((duration or 60.0) * (sample_rate or 48000)) + DEFAULT_BLOCK_SIZE
+    samples = empty(capacity)
+    n_samples = 0
+    with DecodeProcess(filepath, sample_rate, channels) as decode:
+        while True:
+            if n_samples == samples.shape[0]:
+                # The duration was short or unknown: grow geometrically.
+                grown = empty(2 * samples.shape[0])
+                grown[:n_samples] = samples
+                samples = grown
+            n = decode.read_mono(samples[n_samples:])
+            n_samples += n
+            if n_samples < samples.shape[0]:
+                break
+    if n_samples < samples.shape[0] // 2:
+        trimmed = empty(n_samples)  # do not keep a mostly empty buffer alive
+        trimmed[:] = samples[:n_samples]
+        return trimmed
+    return samples[:n_samples]
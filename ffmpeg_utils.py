@@ -0,0 +1,282 @@
+"""Small helpers around the ffmpeg / ffprobe command-line tools.
+
+Every process is started through start_process. While a thread runs inside
+using_process_group(group), the processes it starts join that group, so
+cancelling the group (e.g. from the GUI's job manager) kills whatever
+ffmpeg is running for it and makes the helpers raise FFmpegCancelled.
+
+The speed ffmpeg reports for a finished command is attached to the current
+profiling stage (see profiling.py), and so is the CPU time of the process,
+read from os.wait4 when it is reaped. Unlike RUSAGE_CHILDREN, which covers
+every child of the process, that charges each stage only for its own
+ffmpeg, even while other jobs run theirs at the same time.
+"""
+import contextlib
+import functools
+import json
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import time
+
+from profiling import add_child_cpu, annotate, stage
+
+FFMPEG = "ffmpeg"
+FFPROBE = "ffprobe"
+
+# The "speed=2.5x" field of ffmpeg's statistics line.
+SPEED_PATTERN = re.compile(rb"speed=\s*([0-9.]+)x")
+# "ffmpeg version 7.0.2-static ..." or "ffmpeg version n6.1 ..."
+VERSION_PATTERN = re.compile(rb"^ffmpeg version n?(\d+)\.")
+
+
+class FFmpegError(RuntimeError):
+    """Raised when an ffmpeg or ffprobe process exits with a non-zero status."""
+
+    def __init__(self, cmd, returncode, stderr):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr
+        # The last few lines of stderr carry the actual reason.
+        tail = "\n".join(stderr.strip().splitlines()[-5:])
+        super().__init__(f"{os.path.basename(cmd[0])} exited with status {returncode}:\n{tail}")
+
+
+class FFmpegCancelled(RuntimeError):
+    """Raised when a ProcessGroup is cancelled while its commands are running."""
+
+
+_local = threading.local()
+
+
+def current_process_group():
+    """The ProcessGroup new processes of this thread join, or None."""
+    return getattr(_local, "process_group", None)
+
+
+@contextlib.contextmanager
+def using_process_group(group):
+    """Make every process started by this thread inside the block join group."""
+    previous = current_process_group()
+    _local.process_group = group
+    try:
+        yield group
+    finally:
+        _local.process_group = previous
+
+
+class Process(subprocess.Popen):
+    """Popen that charges the child's CPU time to the current profiling stage when it is waited for."""
+
+    def _try_wait(self, wait_flags):
+        # Popen.wait() (and so communicate()) reaps the child here, holding its waitpid lock.
+        # Windows has no os.wait4, but its Popen never calls this either.
+        try:
+            pid, status, usage = os.wait4(self.pid, wait_flags)
+        except ChildProcessError:
+            return self.pid, 0
+        if pid == self.pid:
+            add_child_cpu(usage.ru_utime + usage.ru_stime)
+        return pid, status
+
+
+def start_process(cmd, **popen_kwargs):
+    """Start a Process that joins the current ProcessGroup, if any."""
+    group = current_process_group()
+    if group is None:
+        return Process(cmd, **popen_kwargs)
+    return group.start(cmd, **popen_kwargs)
+
+
+def check_returncode(cmd, returncode, stderr, group=None):
+    """Raise FFmpegCancelled if the process was killed by a cancel, FFmpegError on any other failure."""
+    group = group or current_process_group()
+    if group is not None and group.cancelled:
+        raise FFmpegCancelled("cancelled")
+    if returncode != 0:
+        raise FFmpegError(cmd, returncode, stderr.decode("utf-8", "replace"))
+
+
+def annotate_speed(stderr):
+    """Attach the last speed in ffmpeg's stderr statistics to the current profiling stage."""
+    # The final statistics line comes last; no need to search all of a long log.
+    speeds = SPEED_PATTERN.findall(stderr[-4096:])
+    if speeds:
+        try:
+            annotate(ffmpeg_speed=float(speeds[-1]))
+        except ValueError:
+            pass
+
+
+@functools.lru_cache(maxsize=None)
+def ffmpeg_major_version():
+    """The major version of the ffmpeg executable, or None if it cannot be told (e.g. git builds)."""
+    try:
+        output = subprocess.run([FFMPEG, "-version"], capture_output=True).stdout
+    except OSError:
+        return None
+    match = VERSION_PATTERN.match(output)
+    return int(match.group(1)) if match else None
+
+
+def run_ffmpeg(cmd):
+    """Run a command to completion and return its stdout; raise FFmpegError on failure."""
+    process = start_process(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    stdout, stderr = process.communicate()
+    check_returncode(cmd, process.returncode, stderr)
+    annotate_speed(stderr)
+    return stdout
+
+
+def run_ffmpeg_progress(cmd, total_duration, progress_callback=None):
+    """Run an ffmpeg command and report progress from its -progress output.
+
+    cmd must start with the ffmpeg executable; "-progress pipe:1 -nostats"
+    is inserted after it. progress_callback receives (percent, est_time_text)
+    where the estimate comes from ffmpeg's own encoding speed.
+    """
+    cmd = [cmd[0], "-progress", "pipe:1", "-nostats", *cmd[1:]]
+    process = start_process(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    # Drain stderr on the side so a chatty ffmpeg can never block on a full pipe.
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()))
+    stderr_thread.start()
+    out_time = 0.0
+    speed = 0.0
+    try:
+        for raw_line in process.stdout:
+            key, _, value = raw_line.decode("utf-8", "replace").strip().partition("=")
+            if key == "out_time_us" and value.lstrip("-").isdigit():
+                out_time = max(0.0, int(value) / 1e6)
+            elif key == "speed" and value.endswith("x"):
+                try:
+                    speed = float(value[:-1])
+                except ValueError:
+                    pass
+            elif key == "progress" and progress_callback is not None and total_duration > 0:
+                percent = min(100.0, out_time / total_duration * 100)
+                if speed > 0:
+                    remaining = (total_duration - out_time) / speed
+                    progress_callback(percent, f"Estimated time left: {int(max(0, remaining))}s")
+                else:
+                    progress_callback(percent, "Estimating...")
+    except BaseException:
+        # A failing progress_callback must not leave ffmpeg running or its stderr pipe undrained.
+        process.kill()
+        raise
+    finally:
+        returncode = process.wait()
+        stderr_thread.join()
+    check_returncode(cmd, returncode, b"".join(stderr_chunks))
+    if speed > 0:
+        annotate(ffmpeg_speed=speed)
+
+
+def run_ffmpeg_stdin(cmd, chunks, total_bytes=None, progress_callback=None):
+    """Run an ffmpeg command that reads its input from stdin, writing chunks to it.
+
+    chunks is an iterable of bytes-like objects (e.g. NumPy array views),
+    written as they come, so nothing is concatenated. With total_bytes,
+    progress_callback receives (percent, est_time_text) from the bytes
+    written so far; the last percent is left for ffmpeg to finish.
+    """
+    process = start_process(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    stderr_chunks = []
+    stderr_thread = threading.Thread(target=lambda: stderr_chunks.append(process.stderr.read()))
+    stderr_thread.start()
+    written = 0
+    started = time.time()
+    try:
+        for chunk in chunks:
+            process.stdin.write(chunk)
+            written += memoryview(chunk).nbytes
+            if progress_callback is not None and total_bytes:
+                elapsed = time.time() - started
+                remaining = elapsed / written * max(0, total_bytes - written)
+                progress_callback(min(99.0, written / total_bytes * 100),
+                                  f"Estimated time left: {int(remaining)}s")
+        process.stdin.close()
+    except BrokenPipeError:
+        # ffmpeg exited early; its exit status and stderr say why.
+        try:
+            process.stdin.close()
+        except BrokenPipeError:
+            pass
+    except BaseException:
+        process.kill()
+        raise
+    finally:
+        returncode = process.wait()
+        stderr_thread.join()
+    stderr = b"".join(stderr_chunks)
+    check_returncode(cmd, returncode, stderr)
+    annotate_speed(stderr)
+
+
+class ProcessGroup:
+    """Runs ffmpeg commands from several threads and can kill them all at once."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._processes = set()
+        self.cancelled = False
+
+    def start(self, cmd, **popen_kwargs):
+        """Start a process in the group; raise FFmpegCancelled once the group is cancelled."""
+        with self._lock:
+            if self.cancelled:
+                raise FFmpegCancelled("cancelled")
+            # Forget processes that have been waited for. poll() would reap finished ones
+            # here, on this thread, before their own thread could charge their CPU time.
+            self._processes = {process for process in self._processes if process.returncode is None}
+            process = Process(cmd, **popen_kwargs)
+            self._processes.add(process)
+        return process
+
+    def run(self, cmd):
+        """Run a command to completion and return its stdout; raise FFmpegError on failure."""
+        process = self.start(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        stdout, stderr = process.communicate()
+        with self._lock:
+            self._processes.discard(process)
+        check_returncode(cmd, process.returncode, stderr, group=self)
+        annotate_speed(stderr)
+        return stdout
+
+    def cancel(self):
+        """Kill every running process and refuse to start new ones."""
+        with self._lock:
+            self.cancelled = True
+            processes = list(self._processes)
+        for process in processes:
+            process.kill()
+
+
+def probe_json(filepath, *args):
+    """Run ffprobe with JSON output and return the parsed result."""
+    cmd = [FFPROBE, "-v", "error", *args, "-of", "json", filepath]
+    return json.loads(run_ffmpeg(cmd) or b"{}")
+
+
+def write_concat_list(filepaths):
+    """Write an ffmpeg concat-demuxer list file and return its path."""
+    concat_list = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt")
+    for filepath in filepaths:
+        concat_list.write(f"file '{filepath}'\n")
+    concat_list.close()
+    return concat_list.name
+
+
+def concat_files(filepaths, output_filepath):
+    """Join files with the concat demuxer without re-encoding."""
+    concat_list_path = write_concat_list(filepaths)
+    try:
+        with stage("concat", pieces=len(filepaths)):
+            run_ffmpeg([
+                FFMPEG, "-y", "-f", "concat", "-safe", "0", "-i", concat_list_path,
+                "-c", "copy", output_filepath
+            ])
+    finally:
+        os.unlink(concat_list_path)
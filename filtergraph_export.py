@@ -0,0 +1,119 @@
+"""Single-pass export: one ffmpeg process cuts the whole keep-list.
+
+The kept segments are turned into a select/aselect filtergraph, so the
+input is decoded once and the output encoded once, with no temporary
+segment files. The select expression is a balanced tree of comparisons over
+the sorted segments, so each frame costs O(log segments) to test rather
+than one term per segment. Long keep-lists go through a filter script file
+instead of the command line (-/filter_complex on ffmpeg 7 and later,
+-filter_complex_script before).
+"""
+import os
+import tempfile
+
+from ffmpeg_utils import FFMPEG, ffmpeg_major_version, probe_json, run_ffmpeg_progress
+from profiling import stage
+from segmentation import kept_duration
+
+# Above this many characters the filtergraph is written to a script file.
+MAX_INLINE_FILTERGRAPH = 4000
+# aselect keeps or drops whole audio frames; smaller frames give finer cuts.
+AUDIO_CUT_SAMPLES = 256
+
+VIDEO_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "fast", "-crf", "23"]
+VIDEO_AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "128k"]
+AUDIO_ENCODE_ARGS = ["-ac", "2", "-b:a", "192k"]
+
+
+def merge_segments(segments_to_keep):
+    """Sorted, non-overlapping (start, end) pairs at the expression's precision; touching ones are joined."""
+    merged = []
+    for start, end in sorted((round(start, 6), round(end, 6)) for start, end in segments_to_keep):
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def select_expression(segments_to_keep):
+    """Return an ffmpeg expression that is non-zero inside any kept segment.
+
+    ffmpeg's if() only evaluates the branch it takes, so the nested tree
+    costs about 2*log2(segments) comparisons per frame.
+    """
+    segments = merge_segments(segments_to_keep)
+    return _select_tree(segments, 0, len(segments))
+
+
+def _select_tree(segments, first, last):
+    if first == last:
+        return "0"
+    middle = (first + last) // 2
+    start, end = segments[middle]
+    return (f"if(lt(t,{start:.6f}),{_select_tree(segments, first, middle)},"
+            f"if(lt(t,{end:.6f}),1,{_select_tree(segments, middle + 1, last)}))")
+
+
+def build_filtergraph(segments_to_keep, video=True, audio=True):
+    """Build the filtergraph with [v] and/or [a] outputs for the keep-list."""
+    expression = select_expression(segments_to_keep)
+    chains = []
+    if video:
+        chains.append(f"[0:v:0]select='{expression}',setpts=N/FRAME_RATE/TB[v]")
+    if audio:
+        chains.append(f"[0:a:0]asetnsamples=n={AUDIO_CUT_SAMPLES},"
+                      f"aselect='{expression}',asetpts=N/SR/TB[a]")
+    return ";\n".join(chains)
+
+
+def has_audio_stream(filepath):
+    return bool(probe_json(filepath, "-select_streams", "a:0", "-show_entries", "stream=index").get("streams"))
+
+
+def _run_with_filtergraph(filepath, filtergraph, output_args, output_filepath, total_duration,
+                          progress_callback):
+    script_path = None
+    if len(filtergraph) > MAX_INLINE_FILTERGRAPH:
+        script = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt")
+        script.write(filtergraph)
+        script.close()
+        script_path = script.name
+        # ffmpeg 7 deprecates -filter_complex_script for the generic "-/option file" form.
+        version = ffmpeg_major_version()
+        if version is not None and version >= 7:
+            filter_args = ["-/filter_complex", script_path]
+        else:
+            filter_args = ["-filter_complex_script", script_path]
+    else:
+        filter_args = ["-filter_complex", filtergraph]
+    try:
+        with stage("encode", single_pass=True):
+            run_ffmpeg_progress([
+                FFMPEG, "-y", "-i", filepath, *filter_args, *output_args, output_filepath
+            ], total_duration, progress_callback)
+    finally:
+        if script_path is not None:
+            os.unlink(script_path)
+    if progress_callback is not None:
+        progress_callback(100, "Completed")
+
+
+def export_video_single_pass(filepath, segments_to_keep, output_filepath, progress_callback=None):
+    """Cut video (and audio, if present) in a single ffmpeg invocation."""
+    audio = has_audio_stream(filepath)
+    # select drops frames, so keep the timestamps setpts wrote instead of resampling to a default rate.
+    output_args = ["-map", "[v]", "-fps_mode", "passthrough", *VIDEO_ENCODE_ARGS]
+    if audio:
+        output_args += ["-map", "[a]", *VIDEO_AUDIO_ENCODE_ARGS]
+    _run_with_filtergraph(filepath, build_filtergraph(segments_to_keep, video=True, audio=audio),
+                          output_args, output_filepath, kept_duration(segments_to_keep), progress_callback)
+
+
+def export_audio_single_pass(filepath, segments_to_keep, output_filepath, progress_callback=None):
+    """Cut the audio track straight from the source in a single ffmpeg invocation."""
+    output_args = ["-map", "[a]", "-vn", *AUDIO_ENCODE_ARGS]
+    _run_with_filtergraph(filepath, build_filtergraph(segments_to_keep, video=False, audio=True),
+                          output_args, output_filepath, kept_duration(segments_to_keep), progress_callback)
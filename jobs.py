@@ -0,0 +1,207 @@
+"""Background job manager for the GUI.
+
+Load, detect and export work runs on a small, fixed set of worker threads
+that take jobs from a priority queue (loads before detections before
+exports). Every job has a CancelToken:
+
+* cancelling it kills the ffmpeg processes the job has started and makes
+  its progress reports raise JobCancelled, so the worker stops at the next
+  report;
+* submitting a job supersedes (cancels) the queued and running jobs of the
+  kinds it replaces - a new detection replaces an older one, a new file
+  replaces the loads and detections of the old one (a running export is
+  left to finish).
+
+Callbacks (progress, done, error, cancelled) are handed to a dispatch
+function, so the GUI can run them on the Tk thread. Results and progress
+of a job that was cancelled in the meantime are dropped.
+
+Each job runs with its own profiling.Profiler, so the stages it goes
+through are timed and can be shown or saved once it is done.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+from ffmpeg_utils import FFmpegCancelled, ProcessGroup, using_process_group
+from profiling import Profiler, using_profiler
+
+JOB_LOAD = "load"
+JOB_DETECT = "detect"
+JOB_EXPORT = "export"
+
+# Lower runs first.
+PRIORITIES = {JOB_LOAD: 0, JOB_DETECT: 1, JOB_EXPORT: 2}
+
+
+class JobCancelled(RuntimeError):
+    """Raised inside a job once its CancelToken has been cancelled."""
+
+
+class CancelToken:
+    """Cooperative cancellation flag that also owns the job's ffmpeg processes."""
+
+    def __init__(self):
+        self.process_group = ProcessGroup()
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+        self.process_group.cancel()
+
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled("cancelled")
+
+
+class Job:
+    """One unit of background work and its timing."""
+
+    def __init__(self, manager, kind, func, args, priority, callbacks, profiler=None):
+        self.manager = manager
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.priority = priority
+        self.callbacks = callbacks
+        self.token = CancelToken()
+        self.profiler = profiler or Profiler(kind)
+        self.state = "queued"
+        self.submitted_at = time.perf_counter()
+        self.started_at = None
+        self.finished_at = None
+
+    @property
+    def wall_time(self):
+        """Seconds spent running, so far or in total."""
+        if self.started_at is None:
+            return 0.0
+        return (self.finished_at or time.perf_counter()) - self.started_at
+
+    @property
+    def queue_time(self):
+        return (self.started_at or time.perf_counter()) - self.submitted_at
+
+    def cancel(self):
+        self.token.cancel()
+
+    def check(self):
+        """Raise JobCancelled if the job has been cancelled."""
+        self.token.check()
+
+    def report_progress(self, percent, est_time_text):
+        """Progress callback for the pipeline: (percent, est_time_text), as everywhere else."""
+        self.token.check()
+        self.manager._deliver(self, "progress", percent, est_time_text)
+
+
+class JobManager:
+    """Runs jobs on `workers` threads in priority order; see the module docstring."""
+
+    def __init__(self, dispatch=None, workers=2):
+        self._dispatch = dispatch or (lambda func, *args: func(*args))
+        self._heap = []
+        self._active = set()
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        self._shutdown = False
+        self._threads = [threading.Thread(target=self._worker, daemon=True) for _ in range(workers)]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, kind, func, *args, supersedes=None, on_done=None, on_error=None, on_progress=None,
+               on_cancelled=None, profiler=None):
+        """Queue func(job, *args) and return the Job.
+
+        supersedes lists the job kinds to cancel first (default: the same kind).
+        on_done(job, result), on_error(job, exception), on_progress(job, percent,
+        est_time_text) and on_cancelled(job) are called through dispatch.
+        The job's stages are recorded in profiler (default: a new Profiler).
+        """
+        callbacks = {"done": on_done, "error": on_error, "progress": on_progress, "cancelled": on_cancelled}
+        job = Job(self, kind, func, args, PRIORITIES.get(kind, len(PRIORITIES)), callbacks, profiler)
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("job manager is shut down")
+            self._cancel_locked((kind,) if supersedes is None else supersedes)
+            self._active.add(job)
+            heapq.heappush(self._heap, (job.priority, next(self._sequence), job))
+            self._condition.notify()
+        return job
+
+    def cancel(self, kinds=None):
+        """Cancel every queued or running job, or only those of the given kinds."""
+        with self._condition:
+            self._cancel_locked(kinds)
+
+    def _cancel_locked(self, kinds):
+        for job in self._active:
+            if kinds is None or job.kind in kinds:
+                job.cancel()
+
+    def active(self, kind=None):
+        """Jobs that are queued or running."""
+        with self._condition:
+            return [job for job in self._active if kind is None or job.kind == kind]
+
+    def shutdown(self):
+        """Cancel everything and stop the workers once they are idle."""
+        with self._condition:
+            self._shutdown = True
+            self._cancel_locked(None)
+            self._condition.notify_all()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                while not self._heap and not self._shutdown:
+                    self._condition.wait()
+                if not self._heap:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+            self._run(job)
+
+    def _run(self, job):
+        try:
+            job.check()
+            job.state = "running"
+            job.started_at = time.perf_counter()
+            with using_process_group(job.token.process_group), using_profiler(job.profiler):
+                result = job.func(job, *job.args)
+            job.check()  # Superseded while finishing: the result is stale.
+        except (JobCancelled, FFmpegCancelled):
+            self._finish(job, "cancelled")
+        except Exception as e:
+            if job.token.cancelled:
+                # A cancel (e.g. a killed ffmpeg) made it fail; that is not an error to report.
+                self._finish(job, "cancelled")
+            else:
+                self._finish(job, "failed", "error", e)
+        else:
+            self._finish(job, "done", "done", result)
+
+    def _finish(self, job, state, event=None, *args):
+        job.finished_at = time.perf_counter()
+        if job.started_at is None:
+            job.started_at = job.finished_at
+        job.state = state
+        with self._condition:
+            self._active.discard(job)
+        self._deliver(job, event or state, *args)
+
+    def _deliver(self, job, event, *args):
+        callback = job.callbacks.get(event)
+        if callback is not None:
+            self._dispatch(self._call, job, event, callback, args)
+
+    @staticmethod
+    def _call(job, event, callback, args):
+        # Runs on the dispatch thread: drop anything but the cancel notice of a cancelled job.
+        if job.token.cancelled and event != "cancelled":
+            return
+        callback(job, *args)
@@ -1,16 +1,52 @@
 import tkinter as tk
 from tkinter import filedialog, ttk, messagebox
-import librosa
-import librosa.display
-import matplotlib.pyplot as plt
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-import numpy as np
-import soundfile as sf
-import threading
-import time  # For simulating loading time and estimating durations
 import os
-import subprocess
-import tempfile
+import threading
+
+from analysis_cache import AnalysisCache
+from jobs import JOB_DETECT, JOB_EXPORT, JOB_LOAD, JobManager
+from core import (EXPORT_PER_SEGMENT, EXPORT_SINGLE_PASS, EXPORT_STREAM_COPY, DetectionSettings, compute_rms,
+                  detect_silence, export_output, is_video_file, load_audio, warm_up_analysis)
+from parallel_export import default_workers
+from profiling import Profiler, write_chrome_trace, write_json
+
+# Labels shown in the Export Method combobox.
+EXPORT_METHOD_LABELS = {
+    "Stream Copy": EXPORT_STREAM_COPY,
+    "Single Pass": EXPORT_SINGLE_PASS,
+    "Per Segment": EXPORT_PER_SEGMENT,
+}
+
+# Labels shown in the Analysis Rate combobox; None analyses at the file's own rate.
+ANALYSIS_RATE_LABELS = {
+    "22050 Hz": 22050,
+    "16000 Hz": 16000,
+    "8000 Hz": 8000,
+    "Native": None,
+}
+
+# Quiet period after the last parameter change before silence is re-detected.
+REDETECT_DELAY_MS = 150
+
+# How long after the window appears the background warm-up starts.
+WARM_UP_DELAY_MS = 200
+
+
+def warm_up():
+    """Import and run once what the first load and plot need; called on a background thread.
+
+    Matplotlib is imported here rather than at startup (it takes most of the
+    import time), and librosa loads SciPy and numba on its first analysis.
+    A file opened before this finishes waits for the same imports instead
+    of repeating them.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+    fig = Figure(figsize=(8, 2), dpi=100)
+    fig.add_subplot().plot([0, 1])
+    FigureCanvasAgg(fig).draw()  # Loads the fonts.
+    warm_up_analysis()
+
 
 class SilenceCutterApp:
     def __init__(self, root):
@@ -21,16 +57,27 @@ class SilenceCutterApp:
         # --- UI Elements Initialization ---
         self.create_ui_elements()
         self.filepath = None
-        self.audio_data = None
-        self.sample_rate = None
+        self.source = None  # core.AudioSource of the loaded file
         self.silence_segments = []
-        self.is_loading = False
         self.waveform_fig = None
         self.waveform_ax = None
+        self.waveform_widget = None  # Tk widget of the embedded Matplotlib canvas
+        self.waveform_view = None  # WaveformView drawing the waveform and silence overlay
         self.zoom_factor = 1.0  # Default zoom level
         self.scroll_position = 0.0  # Default scroll position in seconds
         self.total_duration = 0.0  # Total duration of loaded audio
         self.is_video = False  # Flag to mark if input is a video
+        self.redetect_job = None  # Pending root.after id of a debounced re-detection
+        self.profiles = []  # profiling.Profiler of every job run on the current file, oldest first
+        # All background work goes through the job manager; its callbacks run on the Tk thread.
+        self.jobs = JobManager(dispatch=lambda func, *args: self.root.after(0, func, *args))
+        root.protocol("WM_DELETE_WINDOW", self.on_close)
+        try:
+            self.analysis_cache = AnalysisCache()  # Envelopes and pyramids of files analysed before
+        except OSError:
+            self.analysis_cache = None
+        # The window is up without matplotlib or librosa's analysis modules; load them now.
+        root.after(WARM_UP_DELAY_MS, lambda: threading.Thread(target=warm_up, daemon=True).start())
 
     def create_ui_elements(self):
         # --- Style ---
@@ -102,6 +149,25 @@ class SilenceCutterApp:
         self.lock_offsets_var = tk.BooleanVar(value=True)
         lock_offsets_check = ttk.Checkbutton(config_frame, text="Lock Offsets", variable=self.lock_offsets_var, command=self.toggle_lock_offsets)
         lock_offsets_check.grid(row=row_num, column=0, padx=5, pady=5, sticky="w")
+        self.streaming_var = tk.BooleanVar(value=False)
+        streaming_check = ttk.Checkbutton(config_frame, text="Low-Memory Streaming Analysis", variable=self.streaming_var)
+        streaming_check.grid(row=row_num, column=1, padx=5, pady=5, sticky="w")
+        row_num += 1
+
+        ttk.Label(config_frame, text="Analysis Rate:", style='TLabel').grid(row=row_num, column=0, padx=5, pady=5, sticky="w")
+        self.analysis_rate_var = tk.StringVar(value="22050 Hz")
+        ttk.Combobox(config_frame, textvariable=self.analysis_rate_var, values=tuple(ANALYSIS_RATE_LABELS), state="readonly", width=15).grid(row=row_num, column=1, padx=5, pady=5, sticky="w")
+        self.native_rate_var = tk.BooleanVar(value=False)
+        native_rate_check = ttk.Checkbutton(config_frame, text="Native-Rate Decode (no resampling)", variable=self.native_rate_var)
+        native_rate_check.grid(row=row_num, column=2, columnspan=2, padx=5, pady=5, sticky="w")
+        row_num += 1
+
+        ttk.Label(config_frame, text="Export Method:", style='TLabel').grid(row=row_num, column=0, padx=5, pady=5, sticky="w")
+        self.export_method_var = tk.StringVar(value="Stream Copy")
+        ttk.Combobox(config_frame, textvariable=self.export_method_var, values=tuple(EXPORT_METHOD_LABELS), state="readonly", width=15).grid(row=row_num, column=1, padx=5, pady=5, sticky="w")
+        ttk.Label(config_frame, text="Export Workers:", style='TLabel').grid(row=row_num, column=2, padx=5, pady=5, sticky="w")
+        self.export_workers_var = tk.IntVar(value=default_workers())
+        ttk.Spinbox(config_frame, from_=1, to=64, increment=1, textvariable=self.export_workers_var, width=7).grid(row=row_num, column=3, padx=5, pady=5, sticky="w")
         row_num += 1
         self.toggle_lock_offsets()
         config_frame.columnconfigure(1, weight=1)
@@ -129,6 +195,10 @@ class SilenceCutterApp:
         detect_button.pack(side=tk.LEFT, padx=10, pady=10)
         self.save_button = ttk.Button(control_frame, text="Save Output As...", command=self.save_output_threaded, state=tk.DISABLED, style='TButton')
         self.save_button.pack(side=tk.LEFT, padx=10, pady=10)
+        cancel_button = ttk.Button(control_frame, text="Cancel", command=self.cancel_jobs, style='TButton')
+        cancel_button.pack(side=tk.LEFT, padx=10, pady=10)
+        timings_button = ttk.Button(control_frame, text="Save Timings...", command=self.save_timings, style='TButton')
+        timings_button.pack(side=tk.RIGHT, padx=10, pady=10)
 
         # --- Status and Progress Area ---
         self.status_label_var = tk.StringVar(value="Ready")
@@ -146,15 +216,66 @@ class SilenceCutterApp:
         # --- Binding for Offset Lock ---
         self.offset_in_var.trace_add('write', self.sync_offset_out)
 
+        # --- Live re-detection when a detection parameter changes ---
+        for var in (self.noise_threshold_var, self.min_silence_duration_var, self.offset_in_var, self.offset_out_var):
+            var.trace_add('write', self.schedule_redetect)
+
         # --- Make frames resizable ---
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(2, weight=1)
 
     def update_progress_ui(self, percent, est_time_text):
-        # Called from worker threads via root.after to update progress
+        # Called on the Tk thread with job progress and timing events
         self.progress_var.set(percent)
         self.progress_text_var.set(f"Progress: {percent:.0f}% - {est_time_text}")
 
+    def _on_job_progress(self, job, percent, est_time_text):
+        self.update_progress_ui(percent, est_time_text)
+
+    def _report_job_time(self, job, label):
+        # Wall time of the whole job, then where it went.
+        self.update_progress_ui(100, f"{label} in {job.wall_time:.1f}s ({job.profiler.summary_text()})")
+
+    def _new_profiler(self, kind):
+        # All jobs on one file share the load's time origin, so they line up in one trace.
+        origin = self.profiles[0].origin if self.profiles else None
+        profiler = Profiler(kind, origin=origin)
+        self.profiles.append(profiler)
+        return profiler
+
+    def save_timings(self):
+        if not self.profiles:
+            messagebox.showinfo("Info", "Nothing has been timed yet.")
+            return
+        filetypes = (("Timing Report (JSON)", "*.json"), ("Chrome Trace", "*.trace.json"))
+        filepath = filedialog.asksaveasfilename(defaultextension=".json", filetypes=filetypes,
+                                                initialfile="silence_cutter_timings")
+        if not filepath:
+            return
+        try:
+            if filepath.endswith(".trace.json"):
+                write_chrome_trace(filepath, self.profiles)
+            else:
+                write_json(filepath, self.profiles)
+        except OSError as e:
+            messagebox.showerror("Error Saving Timings", f"Could not save timings.\nError: {e}")
+            return
+        self.update_status(f"Timings saved to: {filepath}")
+
+    def _on_job_cancelled(self, job):
+        if self.jobs.active(job.kind):
+            return  # Superseded by a newer job of the same kind, which reports for itself.
+        self.update_status(f"{job.kind.capitalize()} cancelled.")
+        self.update_progress_ui(0, "Cancelled")
+
+    def cancel_jobs(self):
+        self.jobs.cancel()
+
+    def on_close(self):
+        # Kill any running ffmpeg before the window goes away.
+        self.jobs.shutdown()
+        self.root.destroy()
+
     def choose_file(self):
         filetypes = (("Audio/Video files", "*.mp3 *.wav *.mp4 *.mkv *.avi *.flac"), ("All files", "*.*"))
         filepath = filedialog.askopenfilename(title="Choose an audio or video file", filetypes=filetypes)
@@ -163,49 +284,64 @@ class SilenceCutterApp:
             self.file_path_var.set(filepath)
             self.clear_waveform()
             # Set flag if file is a video
-            video_exts = ['.mp4', '.mkv', '.avi']
-            _, ext = os.path.splitext(filepath.lower())
-            self.is_video = ext in video_exts
+            self.is_video = is_video_file(filepath)
             self.load_audio_threaded()
 
     def load_audio_threaded(self):
-        if self.is_loading:
-            return
-        self.is_loading = True
         self.update_status("Loading file...")
         self.save_button.config(state=tk.DISABLED)
-        threading.Thread(target=self._load_audio_data).start()
-
-    def _load_audio_data(self):
-        try:
-            time.sleep(0.1)  # Simulate loading delay
-            # For both audio and video, extract the audio track for waveform and silence detection
-            self.audio_data, self.sample_rate = librosa.load(self.filepath)
-            self.total_duration = librosa.get_duration(y=self.audio_data, sr=self.sample_rate)
-            self.root.after(0, self._on_audio_loaded)
-        except Exception as e:
-            self.root.after(0, self._on_load_error, e)
-        finally:
-            self.is_loading = False
-
-    def _on_audio_loaded(self):
-        self.plot_waveform()
+        analysis_rate = ANALYSIS_RATE_LABELS[self.analysis_rate_var.get()]
+        self.profiles = []
+        # A new file replaces the analysis of the previous one. An export keeps its own source and
+        # segments and runs to the end; the user cancels it explicitly if they want to.
+        self.jobs.submit(JOB_LOAD, self._load_audio_data, self.filepath, self.streaming_var.get(),
+                         self.native_rate_var.get(), analysis_rate,
+                         supersedes=(JOB_LOAD, JOB_DETECT),
+                         on_done=self._on_audio_loaded, on_error=self._on_load_error,
+                         on_cancelled=self._on_job_cancelled, profiler=self._new_profiler(JOB_LOAD))
+
+    def is_loading(self):
+        return bool(self.jobs.active(JOB_LOAD))
+
+    def _load_audio_data(self, job, filepath, streaming, native_rate, analysis_rate):
+        # Runs on a job worker: build the source here, hand it to the Tk thread on completion.
+        source = load_audio(filepath, streaming=streaming, cache=self.analysis_cache,
+                            native_rate=native_rate, analysis_rate=analysis_rate)
+        job.check()
+        # Compute the RMS envelope once here; detection then only re-thresholds it.
+        compute_rms(source)
+        return source
+
+    def _on_audio_loaded(self, job, source):
+        self.source = source
+        self.total_duration = source.total_duration
+        self.silence_segments = []
+        self.gap_count_label_var.set("Detected Silence Gaps: 0")
+        with job.profiler.stage("plot"):
+            self.plot_waveform()
         self.update_status("File loaded successfully.")
+        self._report_job_time(job, "Loaded")
         self.save_button.config(state=tk.NORMAL)
         self.update_scroll_range()
 
-    def _on_load_error(self, error):
+    def _on_load_error(self, job, error):
         messagebox.showerror("Error Loading File", f"Could not load file.\nError: {error}")
         self.file_path_var.set("")
         self.filepath = None
-        self.audio_data = None
-        self.sample_rate = None
+        self.source = None
         self.clear_waveform()
         self.update_status("Error loading file.")
 
     def clear_waveform(self):
         self.waveform_canvas.delete("all")
-        plt.clf()
+        if self.waveform_widget is not None:
+            self.waveform_widget.destroy()
+            self.waveform_widget = None
+        if self.waveform_fig is not None:
+            self.waveform_fig.clf()
+        if self.waveform_view is not None:
+            self.waveform_view.disconnect()
+            self.waveform_view = None
         self.waveform_fig = None
         self.waveform_ax = None
         self.gap_count_label_var.set("Detected Silence Gaps: 0")
@@ -218,71 +354,92 @@ class SilenceCutterApp:
         self.progress_var.set(0)
         self.progress_text_var.set("Progress: 0%")
 
+    def has_audio(self):
+        return self.source is not None
+
     def plot_waveform(self):
         self.waveform_canvas.delete("all")
-        if self.audio_data is None:
+        if not self.has_audio():
             return
-        fig, ax = plt.subplots(figsize=(8, 2), dpi=100)
-        librosa.display.waveshow(self.audio_data, sr=self.sample_rate, ax=ax, color="#2b8cbe")
+        # Imported on first use (normally already done by warm_up) to keep startup fast.
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        from waveform_view import WaveformView
+        # A plain Figure, not pyplot: it belongs to this canvas only and goes with it.
+        fig = Figure(figsize=(8, 2), dpi=100)
+        ax = fig.add_subplot()
         ax.set_xticks([])
         ax.set_yticks([])
         ax.axis('off')
         self.waveform_fig = fig
         self.waveform_ax = ax
-        self.update_waveform_display_with_zoom_scroll()
         canvas = FigureCanvasTkAgg(fig, master=self.waveform_canvas)
-        canvas_widget = canvas.get_tk_widget()
-        canvas_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        self.waveform_view = WaveformView(ax, self.source.pyramid)
+        self.waveform_widget = canvas.get_tk_widget()
+        self.waveform_widget.pack(side=tk.TOP, fill=tk.BOTH, expand=1)
+        # The number of bins drawn follows the pixel width, so redraw on resize.
+        canvas.mpl_connect("resize_event", self.update_waveform_display_with_zoom_scroll)
+        self.update_waveform_display_with_zoom_scroll()
         canvas.draw()
-        plt.close(fig)
 
     def detect_silence_threaded(self):
-        if self.audio_data is None:
+        if not self.has_audio():
             messagebox.showerror("Error", "Please choose a file first.")
             return
+        if self.is_loading():
+            return  # Detection runs against the new file once it has loaded.
         self.update_status("Detecting silence...")
-        threading.Thread(target=self._detect_silence).start()
-
-    def _detect_silence(self):
+        # A newer detection supersedes one still running.
+        self.jobs.submit(JOB_DETECT, self._detect_silence, self.source, self.detection_settings(),
+                         on_done=self._on_silence_detected, on_error=self._on_detection_error,
+                         on_cancelled=self._on_job_cancelled, profiler=self._new_profiler(JOB_DETECT))
+
+    def detection_settings(self):
+        # Read the Tk variables on the main thread; workers only see plain values.
+        return DetectionSettings(
+            noise_threshold=self.noise_threshold_var.get(),
+            min_silence_duration_ms=self.min_silence_duration_var.get(),
+            offset_in_ms=self.offset_in_var.get(),
+            offset_out_ms=self.offset_out_var.get())
+
+    def schedule_redetect(self, *args):
+        # Debounced: dragging the threshold slider fires many writes.
+        if self.redetect_job is not None:
+            self.root.after_cancel(self.redetect_job)
+        self.redetect_job = self.root.after(REDETECT_DELAY_MS, self.redetect_silence)
+
+    def redetect_silence(self):
+        self.redetect_job = None
+        if not self.has_audio() or self.is_loading() or not self.source.has_rms():
+            return
+        try:
+            settings = self.detection_settings()
+        except (tk.TclError, ValueError):
+            return  # A spinbox is being edited and does not hold a number yet.
+        # Only the cached envelope is re-thresholded, which takes milliseconds: do it right here,
+        # replacing any detection still queued with older settings. The result stays in memory;
+        # the next Detect or Save writes it to the analysis cache off this thread.
+        self.jobs.cancel((JOB_DETECT,))
         try:
-            noise_threshold_percent = self.noise_threshold_var.get() / 100.0
-            min_silence_duration_ms = self.min_silence_duration_var.get()
-            offset_in_ms = self.offset_in_var.get()
-            offset_out_ms = self.offset_out_var.get()
-            frame_length = 2048
-            hop_length = 512
-            rms = librosa.feature.rms(y=self.audio_data, frame_length=frame_length, hop_length=hop_length)[0]
-            silence_mask = rms < noise_threshold_percent * np.max(rms)
-            silence_segments = []
-            in_silence = False
-            silence_start_frame = 0
-            min_silence_frames = int(min_silence_duration_ms * self.sample_rate / hop_length / 1000)
-            for i, is_silent in enumerate(silence_mask):
-                if is_silent and not in_silence:
-                    in_silence = True
-                    silence_start_frame = i
-                elif not is_silent and in_silence:
-                    in_silence = False
-                    silence_end_frame = i
-                    if (silence_end_frame - silence_start_frame) >= min_silence_frames:
-                        start_time = librosa.frames_to_time(silence_start_frame, sr=self.sample_rate, hop_length=hop_length)
-                        end_time = librosa.frames_to_time(silence_end_frame, sr=self.sample_rate, hop_length=hop_length)
-                        start_time += (offset_in_ms / 1000.0)
-                        end_time -= (offset_out_ms / 1000.0)
-                        start_time = max(0, start_time)
-                        end_time = max(start_time, end_time)
-                        silence_segments.append((start_time, end_time))
-            self.silence_segments = silence_segments
-            self.root.after(0, self._on_silence_detected)
+            self.show_silence(detect_silence(self.source, settings, persist=False))
         except Exception as e:
-            self.root.after(0, self._on_detection_error, e)
+            self._on_detection_error(None, e)
+
+    def _detect_silence(self, job, source, settings):
+        return detect_silence(source, settings)
+
+    def _on_silence_detected(self, job, silence_segments):
+        with job.profiler.stage("plot", gaps=len(silence_segments)):
+            self.show_silence(silence_segments)
+        self._report_job_time(job, "Detected")
 
-    def _on_silence_detected(self):
+    def show_silence(self, silence_segments):
+        self.silence_segments = silence_segments
         self.update_waveform_display_with_silence()
         self.gap_count_label_var.set(f"Detected Silence Gaps: {len(self.silence_segments)}")
         self.update_status("Silence detection complete.")
 
-    def _on_detection_error(self, error):
+    def _on_detection_error(self, job, error):
         messagebox.showerror("Error Detecting Silence", f"Error during silence detection: {error}")
         self.update_status("Error during silence detection.")
 
@@ -290,31 +447,26 @@ class SilenceCutterApp:
         if self.waveform_ax is None:
             self.plot_waveform()
             return
-        self.waveform_ax.clear()
-        librosa.display.waveshow(self.audio_data, sr=self.sample_rate, ax=self.waveform_ax, color="#2b8cbe", alpha=0.7)
-        for start, end in self.silence_segments:
-            self.waveform_ax.axvspan(start, end, color='red', alpha=0.3)
-            self.waveform_ax.axvline(x=start, color='red', linestyle='--', linewidth=0.8)
-            self.waveform_ax.axvline(x=end, color='red', linestyle='--', linewidth=0.8)
-        self.update_waveform_display_with_zoom_scroll()
+        # Only the overlay changes: it is blitted over the cached waveform.
+        self.waveform_view.set_silence(self.silence_segments)
 
     def update_waveform_display_with_zoom_scroll(self, event=None):
-        if self.waveform_ax is None or self.audio_data is None:
+        if self.waveform_ax is None or not self.has_audio():
             return
         current_zoom = self.zoom_slider_var.get()
         current_scroll_ratio = self.scroll_slider_var.get()
         display_duration = self.total_duration / current_zoom
         start_time = current_scroll_ratio * max(0, self.total_duration - display_duration)
         end_time = start_time + display_duration
-        self.waveform_ax.set_xlim(start_time, end_time)
-        self.waveform_fig.canvas.draw_idle()
+        # Blits a window of the pre-rendered waveform strip; no full canvas draw while scrolling.
+        self.waveform_view.set_view(start_time, end_time)
 
     def update_zoom_scroll(self, event=None):
         self.update_waveform_display_with_zoom_scroll(event)
         self.update_scroll_range()
 
     def update_scroll_range(self):
-        if self.audio_data is None:
+        if not self.has_audio():
             self.scroll_slider.config(state=tk.DISABLED, from_=0, to_=1.0)
             return
         current_zoom = self.zoom_slider_var.get()
@@ -329,7 +481,7 @@ class SilenceCutterApp:
         if not self.silence_segments:
             messagebox.showinfo("Info", "No silence segments detected or no file loaded to process.")
             return
-        if self.audio_data is None:
+        if not self.has_audio():
             messagebox.showerror("Error", "No data loaded to save.")
             return
         if self.is_video:
@@ -342,98 +494,31 @@ class SilenceCutterApp:
             self.update_status("Saving output...")
             # Reset progress bar
             self.root.after(0, self.update_progress_ui, 0, "Estimating...")
-            threading.Thread(target=self._save_output, args=(output_filepath,)).start()
-
-    def _save_output(self, output_filepath):
+            export_method = EXPORT_METHOD_LABELS[self.export_method_var.get()]
+            self.jobs.submit(JOB_EXPORT, self._save_output, self.source, list(self.silence_segments),
+                             output_filepath, export_method, self.export_workers_var.get(),
+                             on_progress=self._on_job_progress, on_done=self._on_save_complete,
+                             on_error=self._on_save_error, on_cancelled=self._on_job_cancelled,
+                             profiler=self._new_profiler(JOB_EXPORT))
+
+    def _save_output(self, job, source, silence_segments, output_filepath, export_method, export_workers):
+        if source.cache_entry is not None:
+            source.cache_entry.flush()  # Results of live re-detection.
         try:
-            # Build non-silent segments to keep
-            segments_to_keep = []
-            last_end_time = 0
-            for start_time, end_time in self.silence_segments:
-                segments_to_keep.append((last_end_time, start_time))
-                last_end_time = end_time
-            segments_to_keep.append((last_end_time, librosa.get_duration(y=self.audio_data, sr=self.sample_rate)))
-            _, ext = os.path.splitext(output_filepath.lower())
-            if ext == ".mp4" and self.is_video:
-                self._save_video_output(segments_to_keep, output_filepath)
-            else:
-                self._save_audio_output(segments_to_keep, output_filepath)
-            self.root.after(0, self._on_save_complete, output_filepath)
-        except Exception as e:
-            self.root.after(0, self._on_save_error, e)
-
-    def _save_audio_output(self, segments_to_keep, output_filepath):
-        # For audio conversion, simulate progress update in two steps.
-        output_audio_segments = []
-        for start, end in segments_to_keep:
-            start_sample = int(start * self.sample_rate)
-            end_sample = int(end * self.sample_rate)
-            output_audio_segments.append(self.audio_data[start_sample:end_sample])
-        if output_audio_segments:
-            output_audio = np.concatenate(output_audio_segments)
-        else:
-            output_audio = self.audio_data
-        temp_wav = tempfile.NamedTemporaryFile(delete=False, suffix=".wav")
-        sf.write(temp_wav.name, output_audio, self.sample_rate)
-        temp_wav.close()
-        # Update progress to 50%
-        self.root.after(0, self.update_progress_ui, 50, "Converting audio...")
-        cmd = [
-            "ffmpeg", "-y", "-i", temp_wav.name,
-            "-vn", "-ar", str(self.sample_rate), "-ac", "2", "-b:a", "192k",
-            output_filepath
-        ]
-        subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        os.unlink(temp_wav.name)
-        self.root.after(0, self.update_progress_ui, 100, "Completed")
-
-    def _save_video_output(self, segments_to_keep, output_filepath):
-        # For video, process each segment with re-encoding.
-        temp_files = []
-        total_segments = len(segments_to_keep)
-        start_total = time.time()
-        for idx, (start, end) in enumerate(segments_to_keep):
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
-            temp_files.append(temp_file.name)
-            temp_file.close()
-            cmd = [
-                "ffmpeg", "-y", "-i", self.filepath,
-                "-ss", str(start), "-to", str(end),
-                "-c:v", "libx264", "-preset", "fast", "-crf", "23",
-                "-c:a", "aac", "-b:a", "128k",
-                temp_file.name
-            ]
-            subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            # Update progress after each segment is processed.
-            elapsed = time.time() - start_total
-            progress = ((idx + 1) / (total_segments + 1)) * 100
-            # Estimate remaining time based on average segment time.
-            avg_time = elapsed / (idx + 1)
-            remaining = avg_time * (total_segments - idx)
-            est_text = f"Estimated time left: {int(remaining)}s"
-            self.root.after(0, self.update_progress_ui, progress, est_text)
-        # Create concat list for the segments.
-        concat_list_path = tempfile.NamedTemporaryFile(delete=False, mode="w", suffix=".txt")
-        for temp_file in temp_files:
-            concat_list_path.write(f"file '{temp_file}'\n")
-        concat_list_path.close()
-        # Concatenate segments.
-        cmd_concat = [
-            "ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_list_path.name,
-            "-c", "copy", output_filepath
-        ]
-        subprocess.run(cmd_concat, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        os.unlink(concat_list_path.name)
-        for temp_file in temp_files:
-            if os.path.exists(temp_file):
-                os.unlink(temp_file)
-        self.root.after(0, self.update_progress_ui, 100, "Completed")
-
-    def _on_save_complete(self, filepath):
+            export_output(source, silence_segments, output_filepath, method=export_method,
+                          workers=export_workers, progress_callback=job.report_progress)
+        except BaseException:
+            if job.token.cancelled and os.path.exists(output_filepath):
+                os.remove(output_filepath)  # Do not leave a truncated file behind.
+            raise
+        return output_filepath
+
+    def _on_save_complete(self, job, filepath):
+        self._report_job_time(job, "Saved")
         self.update_status(f"Output saved to: {filepath}")
         messagebox.showinfo("Save Complete", f"Output saved to: {filepath}")
 
-    def _on_save_error(self, error):
+    def _on_save_error(self, job, error):
         messagebox.showerror("Error Saving File", f"Could not save output.\nError: {error}")
         self.update_status("Error saving output.")
 
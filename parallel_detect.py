@@ -0,0 +1,205 @@
+"""Multi-core RMS analysis and silence detection for long recordings.
+
+The frames of the RMS envelope are split into shards. Each shard is
+computed by a worker process from its own slice of the signal: the slices
+overlap by frame_length - hop_length samples, so every frame sees exactly
+the samples it would see in a single pass, and the zero padding of
+librosa's center=True is applied to the first and last shard only. The
+per-frame arithmetic is librosa.feature.rms itself, so the envelope is
+bitwise identical to a single-pass run.
+
+Samples and envelope live in shared memory; workers attach to the blocks
+by name and only a few integers are pickled. A signal allocated with
+shared_signal (core.py decodes long files straight into one) is handed to
+the workers as it is; any other array is first copied into a block. Once
+the global maximum is known, the workers threshold their shards and
+return their silent runs; runs that touch a shard boundary are stitched
+back together, so the silence segments also match a single pass exactly.
+"""
+import contextlib
+import os
+import threading
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+
+import librosa
+import numpy as np
+
+from segmentation import find_silent_runs, stitch_runs
+
+# A worker's librosa.feature.rms holds frame_length / hop_length copies of its slice;
+# shards are sized to keep that under this many bytes.
+SHARD_BYTES = 64 * 1024 ** 2
+# Below this many samples (about 50 minutes at 22050 Hz) a single pass takes well under a
+# second, less than starting the workers the first time.
+MIN_SHARDED_SAMPLES = 1 << 26
+MAX_DEFAULT_WORKERS = 8
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_workers = 0
+
+
+def default_detect_workers():
+    return max(1, min(MAX_DEFAULT_WORKERS, os.cpu_count() or 1))
+
+
+def should_shard(n_samples, workers):
+    return workers is not None and workers > 1 and n_samples >= MIN_SHARDED_SAMPLES
+
+
+def _get_pool(workers):
+    # One pool is kept for the life of the process: starting workers (which import librosa)
+    # costs about a second, and the GUI analyses one file after another.
+    global _pool, _pool_workers
+    with _pool_lock:
+        if _pool is None or _pool_workers != workers:
+            if _pool is not None:
+                _pool.shutdown(wait=False)
+            # spawn, not fork: the GUI forks from a process with Tk and worker threads running.
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=get_context("spawn"))
+            _pool_workers = workers
+        return _pool
+
+
+def plan_shards(n_frames, frame_length, workers):
+    """Split range(n_frames) into (first, last) frame ranges: bounded in size, at least one per worker."""
+    max_frames = max(1, SHARD_BYTES // (frame_length * 4))
+    n_shards = max(workers, -(-n_frames // max_frames))
+    edges = np.linspace(0, n_frames, min(n_shards, n_frames) + 1).astype(np.int64)
+    return [(int(first), int(last)) for first, last in zip(edges[:-1], edges[1:]) if last > first]
+
+
+def n_rms_frames(n_samples, frame_length, hop_length):
+    """Number of frames librosa.feature.rms(center=True) returns for n_samples."""
+    return 1 + (n_samples + 2 * (frame_length // 2) - frame_length) // hop_length
+
+
+class _SharedSignal:
+    """A SharedMemory block NumPy arrays are made from; it is unlinked once the last of them is gone.
+
+    The arrays reference this object, not the block's memoryview, so no
+    buffer export is left open when the block is closed.
+    """
+
+    def __init__(self, n_samples):
+        self.block = shared_memory.SharedMemory(create=True, size=max(1, n_samples * 4))
+        self.address = np.frombuffer(self.block.buf, dtype=np.uint8).__array_interface__["data"][0]
+        self.__array_interface__ = {"shape": (n_samples,), "typestr": "<f4", "data": (self.address, False),
+                                    "version": 3}
+        weakref.finalize(self, _release_block, self.block)
+
+
+def _release_block(block):
+    block.close()
+    block.unlink()
+
+
+def shared_signal(n_samples):
+    """An uninitialised float32 array in shared memory, for a signal that will be analysed in shards.
+
+    sharded_analysis passes its block (or that of any contiguous slice of
+    it) to the workers instead of copying the samples.
+    """
+    return np.asarray(_SharedSignal(n_samples))
+
+
+def _shared_location(samples):
+    """(block name, offset in samples) of a contiguous float32 view of a shared_signal array, else None."""
+    owner = samples
+    while owner is not None and not isinstance(owner, _SharedSignal):
+        owner = getattr(owner, "base", None)
+    if owner is None or samples.dtype != np.float32 or not samples.flags.c_contiguous:
+        return None
+    return owner.block.name, (samples.__array_interface__["data"][0] - owner.address) // 4
+
+
+@contextlib.contextmanager
+def _shared_array(shape, dtype):
+    block = shared_memory.SharedMemory(create=True, size=max(1, int(np.prod(shape)) * np.dtype(dtype).itemsize))
+    try:
+        yield block, np.ndarray(shape, dtype=dtype, buffer=block.buf)
+    finally:
+        try:
+            block.close()
+        except BufferError:
+            pass  # Unwinding an error with a view still alive; the mapping goes when the view does.
+        block.unlink()
+
+
+@contextlib.contextmanager
+def _attached(name):
+    # Pool workers share the parent's resource tracker, so attaching here does not make the
+    # block outlive the parent's unlink, nor get it unlinked when a worker exits.
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        yield block
+    finally:
+        block.close()
+
+
+def _rms_shard(samples_name, offset, n_samples, rms_name, n_frames, first, last, frame_length, hop_length):
+    """Worker: compute frames [first, last) into the shared envelope; return their maximum."""
+    with _attached(samples_name) as samples_block, _attached(rms_name) as rms_block:
+        return _rms_into(np.ndarray((n_samples,), dtype=np.float32, buffer=samples_block.buf, offset=offset * 4),
+                         np.ndarray((n_frames,), dtype=np.float32, buffer=rms_block.buf),
+                         first, last, frame_length, hop_length)
+
+
+def _rms_into(samples, rms, first, last, frame_length, hop_length):
+    # Frame i of the centred envelope covers samples [i * hop - pad, i * hop - pad + frame_length).
+    pad = frame_length // 2
+    start = first * hop_length - pad
+    stop = (last - 1) * hop_length - pad + frame_length
+    chunk = samples[max(0, start):min(samples.shape[0], stop)]
+    if start < 0 or stop > samples.shape[0]:
+        chunk = np.pad(chunk, (max(0, -start), max(0, stop - samples.shape[0])))
+    shard = librosa.feature.rms(y=chunk, frame_length=frame_length, hop_length=hop_length, center=False)[0]
+    rms[first:last] = shard
+    return float(np.max(shard))
+
+
+def _runs_shard(rms_name, n_frames, first, last, threshold):
+    """Worker: return the silent runs of frames [first, last) in global frame numbers."""
+    with _attached(rms_name) as rms_block:
+        rms = np.ndarray((n_frames,), dtype=np.float32, buffer=rms_block.buf)
+        starts, ends = find_silent_runs(rms[first:last] < threshold)
+        del rms
+    return starts + first, ends + first
+
+
+def sharded_analysis(samples, frame_length, hop_length, workers, threshold_fraction=None):
+    """Compute the RMS envelope of samples on a pool of worker processes.
+
+    Returns (rms, rms_max, runs). rms matches librosa.feature.rms(y=samples,
+    frame_length=frame_length, hop_length=hop_length)[0] exactly. With a
+    threshold_fraction (of rms_max), runs are the stitched (start_frames,
+    end_frames) of find_silent_runs(rms < threshold); otherwise None.
+    """
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    n_samples = samples.shape[0]
+    n_frames = n_rms_frames(n_samples, frame_length, hop_length)
+    shards = plan_shards(n_frames, frame_length, workers)
+    pool = _get_pool(workers)
+    with contextlib.ExitStack() as stack:
+        location = _shared_location(samples)
+        if location is None:
+            samples_block, shared_samples = stack.enter_context(_shared_array((n_samples,), np.float32))
+            shared_samples[:] = samples
+            del shared_samples
+            location = (samples_block.name, 0)
+        rms_block, shared_rms = stack.enter_context(_shared_array((n_frames,), np.float32))
+        maxima = list(pool.map(_rms_shard, *zip(*[
+            (*location, n_samples, rms_block.name, n_frames, first, last, frame_length, hop_length)
+            for first, last in shards])))
+        rms_max = max(maxima)
+        runs = None
+        if threshold_fraction is not None:
+            # The same Python float the single-pass detect_silence_segments compares against.
+            threshold = threshold_fraction * rms_max
+            runs = stitch_runs(list(pool.map(_runs_shard, *zip(*[
+                (rms_block.name, n_frames, first, last, threshold) for first, last in shards]))))
+        rms = shared_rms.copy()
+        del shared_rms  # Views must go before the blocks are closed.
+    return rms, rms_max, runs
@@ -0,0 +1,126 @@
+"""Per-segment video export with a bounded pool of concurrent ffmpeg encodes.
+
+Adjacent short segments are batched into chunks of a sensible media length
+so each ffmpeg process has enough work to be worth starting. Chunks are
+encoded concurrently, joined in their original order, and if one encode
+fails every other running encode is killed and its error is raised with
+ffmpeg's stderr.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ffmpeg_utils import FFMPEG, ProcessGroup, concat_files, current_process_group
+from filtergraph_export import build_filtergraph, has_audio_stream
+from profiling import current_profiler, stage, using_profiler
+from segmentation import kept_duration
+from video_export import AUDIO_ENCODE_ARGS, VIDEO_ENCODE_ARGS
+
+# Kept media seconds per encode job; shorter adjacent segments are batched.
+DEFAULT_CHUNK_DURATION = 10.0
+
+
+def default_workers():
+    # libx264 is multi-threaded itself, so half the cores is usually the sweet spot.
+    return max(1, (os.cpu_count() or 2) // 2)
+
+
+def chunk_segments(segments_to_keep, min_chunk_duration=DEFAULT_CHUNK_DURATION):
+    """Group adjacent segments into chunks of about min_chunk_duration kept seconds.
+
+    A segment only joins the current chunk while the chunk is still short and
+    the gap before the segment is shorter than min_chunk_duration, so a chunk
+    never decodes long stretches of source that are thrown away.
+    """
+    chunks = []
+    current = []
+    current_duration = 0.0
+    for start, end in segments_to_keep:
+        if end <= start:
+            continue
+        if current and (current_duration >= min_chunk_duration or start - current[-1][1] >= min_chunk_duration):
+            chunks.append(current)
+            current = []
+            current_duration = 0.0
+        current.append((start, end))
+        current_duration += end - start
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def chunk_command(filepath, chunk, output_filepath, audio=True, threads=None):
+    """Build the ffmpeg command that encodes one chunk to output_filepath."""
+    chunk_start = chunk[0][0]
+    cmd = [FFMPEG, "-y", "-ss", str(chunk_start), "-i", filepath, "-t", str(chunk[-1][1] - chunk_start)]
+    if len(chunk) > 1:
+        # Input seeking makes filter timestamps start at zero at chunk_start.
+        relative = [(start - chunk_start, end - chunk_start) for start, end in chunk]
+        cmd += ["-filter_complex", build_filtergraph(relative, video=True, audio=audio),
+                "-map", "[v]", "-fps_mode", "passthrough"]
+        if audio:
+            cmd += ["-map", "[a]"]
+    cmd += VIDEO_ENCODE_ARGS + AUDIO_ENCODE_ARGS
+    if threads is not None:
+        cmd += ["-threads", str(threads)]
+    return cmd + [output_filepath]
+
+
+def export_video_parallel(filepath, segments_to_keep, output_filepath, progress_callback=None,
+                          workers=None, min_chunk_duration=DEFAULT_CHUNK_DURATION, process_group=None):
+    """Encode the kept segments concurrently and concatenate them in order.
+
+    Progress is reported as completed media seconds over total kept seconds.
+    Pass a ProcessGroup to be able to cancel the export from another thread.
+    """
+    workers = workers or default_workers()
+    # The pool threads do not inherit this thread's process group or profiler; pass them on explicitly.
+    group = process_group or current_process_group() or ProcessGroup()
+    profiler = current_profiler()
+    chunks = chunk_segments(segments_to_keep, min_chunk_duration)
+    audio = has_audio_stream(filepath)
+    # Split the cores between workers instead of letting every encoder grab all of them.
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    total_seconds = kept_duration(segments_to_keep)
+    done_seconds = 0.0
+    start_total = time.time()
+    temp_files = []
+    for _ in chunks:
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        temp_files.append(temp_file.name)
+        temp_file.close()
+
+    def encode(idx):
+        chunk = chunks[idx]
+        with using_profiler(profiler), stage("export segment", chunk=idx, segments=len(chunk),
+                                             start=chunk[0][0], end=chunk[-1][1]):
+            group.run(chunk_command(filepath, chunk, temp_files[idx], audio=audio, threads=threads))
+        return idx
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(encode, idx) for idx in range(len(chunks))]
+            try:
+                for future in as_completed(futures):
+                    idx = future.result()
+                    done_seconds += kept_duration(chunks[idx])
+                    if progress_callback is not None and total_seconds > 0:
+                        elapsed = time.time() - start_total
+                        remaining = elapsed / done_seconds * (total_seconds - done_seconds)
+                        # Hold back the last percent for the concat step.
+                        progress_callback(min(99.0, done_seconds / total_seconds * 100),
+                                          f"Estimated time left: {int(remaining)}s")
+            except BaseException:
+                # One failure (or a cancel) stops everything still queued or running.
+                for pending in futures:
+                    pending.cancel()
+                group.cancel()
+                raise
+        concat_files(temp_files, output_filepath)
+    finally:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+    if progress_callback is not None:
+        progress_callback(100, "Completed")
@@ -0,0 +1,229 @@
+"""Per-stage performance instrumentation.
+
+Code that does measurable work wraps it in ``with stage("decode"):``. While
+a thread runs inside using_profiler(profiler), every stage it enters is
+recorded in that profiler with
+
+* its wall time,
+* the CPU time of the thread (NumPy, librosa, soundfile),
+* the CPU time of the ffmpeg processes the thread waited for during the
+  stage (see ffmpeg_utils.Process),
+* the process's peak resident memory when the stage ended, and by how much
+  the stage raised it.
+
+The ffmpeg helpers attach ffmpeg's own speed ("speed=2.5x") to the stage
+that ran the command through annotate(). Without a profiler, stage() and
+annotate() cost next to nothing.
+
+Profilers can be summarised in one line for a status bar, or written as a
+JSON report or as a Chrome trace (load it in chrome://tracing or
+https://ui.perfetto.dev).
+"""
+import contextlib
+import json
+import os
+import sys
+import threading
+import time
+
+try:
+    import resource
+except ImportError:  # Windows: no peak memory
+    resource = None
+
+# Child CPU time comes from os.wait4, which Windows lacks.
+CHILD_CPU_MEASURED = hasattr(os, "wait4")
+
+_local = threading.local()
+_NO_STAGE = contextlib.nullcontext()
+
+
+def peak_rss():
+    """Peak resident memory of this process in bytes, or None where it cannot be read."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageRecord:
+    """One timed stage. Times are in seconds, start relative to the profiler's origin."""
+
+    def __init__(self, name, start, depth, args):
+        thread = threading.current_thread()
+        self.name = name
+        self.start = start
+        self.depth = depth
+        self.thread_id = thread.ident
+        self.thread_name = thread.name
+        self.args = args
+        self.wall = None
+        self.cpu = None
+        self.child_cpu = 0.0 if CHILD_CPU_MEASURED else None
+        self.peak_rss = None
+        self.rss_growth = None
+
+    def as_dict(self):
+        return dict(vars(self))
+
+
+class Profiler:
+    """Collects StageRecords from any number of threads."""
+
+    def __init__(self, name="", origin=None):
+        self.name = name
+        # Profilers sharing an origin (e.g. all jobs on one file) line up in a combined trace.
+        self.origin = time.perf_counter() if origin is None else origin
+        self.records = []
+        self._lock = threading.Lock()
+        self._stacks = threading.local()
+
+    def _stack(self):
+        stack = getattr(self._stacks, "stack", None)
+        if stack is None:
+            stack = self._stacks.stack = []
+        return stack
+
+    @contextlib.contextmanager
+    def stage(self, name, **args):
+        """Time the block as a stage; args are stored with it (and shown in traces)."""
+        stack = self._stack()
+        record = StageRecord(name, time.perf_counter() - self.origin, len(stack), args)
+        cpu_start = time.thread_time()
+        rss_start = peak_rss()
+        stack.append(record)
+        try:
+            yield record
+        finally:
+            stack.pop()
+            record.wall = time.perf_counter() - self.origin - record.start
+            record.cpu = time.thread_time() - cpu_start
+            if rss_start is not None:
+                record.peak_rss = peak_rss()
+                record.rss_growth = record.peak_rss - rss_start
+            with self._lock:
+                self.records.append(record)
+
+    def annotate(self, **args):
+        """Add args to the innermost stage open on this thread, if any."""
+        stack = self._stack()
+        if stack:
+            stack[-1].args.update(args)
+
+    def add_child_cpu(self, seconds):
+        """Charge a child process's CPU time to every stage open on this thread."""
+        for record in self._stack():
+            if record.child_cpu is not None:
+                record.child_cpu += seconds
+
+    def sorted_records(self):
+        with self._lock:
+            return sorted(self.records, key=lambda record: record.start)
+
+    def summary(self):
+        """Totals per stage name, in order of first start: count, wall, cpu, child_cpu, peak_rss."""
+        totals = {}
+        for record in self.sorted_records():
+            total = totals.setdefault(record.name, {"count": 0, "wall": 0.0, "cpu": 0.0, "child_cpu": None,
+                                                    "peak_rss": None})
+            total["count"] += 1
+            total["wall"] += record.wall
+            total["cpu"] += record.cpu
+            if record.child_cpu is not None:
+                total["child_cpu"] = (total["child_cpu"] or 0.0) + record.child_cpu
+            if record.peak_rss is not None:
+                total["peak_rss"] = max(total["peak_rss"] or 0, record.peak_rss)
+            if "ffmpeg_speed" in record.args:
+                total.setdefault("ffmpeg_speeds", []).append(record.args["ffmpeg_speed"])
+        return totals
+
+    def summary_text(self, limit=4):
+        """One line for a status bar: the slowest stages and the peak memory."""
+        totals = self.summary()
+        parts = []
+        for name, total in sorted(totals.items(), key=lambda item: -item[1]["wall"])[:limit]:
+            count = f" x{total['count']}" if total["count"] > 1 else ""
+            speeds = total.get("ffmpeg_speeds")
+            speed = f" @{sum(speeds) / len(speeds):.1f}x" if speeds else ""
+            parts.append(f"{name}{count} {total['wall']:.2f}s{speed}")
+        peaks = [total["peak_rss"] for total in totals.values() if total["peak_rss"] is not None]
+        if peaks:
+            parts.append(f"peak {max(peaks) / 2 ** 20:.0f} MB")
+        return ", ".join(parts)
+
+    def as_dict(self):
+        return {"name": self.name, "stages": [record.as_dict() for record in self.sorted_records()],
+                "summary": self.summary()}
+
+
+def current_profiler():
+    """The Profiler stages of this thread are recorded in, or None."""
+    return getattr(_local, "profiler", None)
+
+
+@contextlib.contextmanager
+def using_profiler(profiler):
+    """Record the stages this thread enters inside the block in profiler (None disables)."""
+    previous = current_profiler()
+    _local.profiler = profiler
+    try:
+        yield profiler
+    finally:
+        _local.profiler = previous
+
+
+def stage(name, **args):
+    """Context manager timing a stage in the current profiler; a no-op without one."""
+    profiler = current_profiler()
+    if profiler is None:
+        return _NO_STAGE
+    return profiler.stage(name, **args)
+
+
+def annotate(**args):
+    """Add args to the current stage of the current profiler, if any."""
+    profiler = current_profiler()
+    if profiler is not None:
+        profiler.annotate(**args)
+
+
+def add_child_cpu(seconds):
+    """Charge a child process's CPU time to the open stages of the current profiler, if any."""
+    profiler = current_profiler()
+    if profiler is not None:
+        profiler.add_child_cpu(seconds)
+
+
+def write_json(filepath, profilers):
+    """Write the records and per-stage totals of profilers as a JSON report."""
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump({"profiles": [profiler.as_dict() for profiler in profilers]}, f, indent=2)
+
+
+def chrome_trace(profilers):
+    """Return profilers as a Chrome trace-event dict (one complete event per stage)."""
+    pid = os.getpid()
+    events = []
+    thread_names = {}
+    for profiler in profilers:
+        for record in profiler.sorted_records():
+            thread_names[record.thread_id] = record.thread_name
+            args = dict(record.args, cpu_s=round(record.cpu, 6))
+            if record.child_cpu is not None:
+                args["child_cpu_s"] = round(record.child_cpu, 6)
+            if record.peak_rss is not None:
+                args["peak_rss_mb"] = round(record.peak_rss / 2 ** 20, 1)
+                args["rss_growth_mb"] = round(record.rss_growth / 2 ** 20, 1)
+            events.append({"name": record.name, "cat": profiler.name or "stage", "ph": "X",
+                           "ts": record.start * 1e6, "dur": record.wall * 1e6,
+                           "pid": pid, "tid": record.thread_id, "args": args})
+    for thread_id, thread_name in thread_names.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": thread_id,
+                       "args": {"name": thread_name}})
+    return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+
+def write_chrome_trace(filepath, profilers):
+    with open(filepath, "w", encoding="utf-8") as f:
+        json.dump(chrome_trace(profilers), f)
@@ -0,0 +1,101 @@
+"""Vectorized silence segmentation.
+
+Turns a per-frame RMS envelope into silence segments (in seconds) without
+walking the frames in Python. Nothing in here depends on Tk, so the same
+code is used by the GUI and by anything else that needs to detect silence.
+"""
+import numpy as np
+
+
+def find_silent_runs(silence_mask):
+    """Return (start_frames, end_frames) of every run of True in the mask.
+
+    End frames are exclusive. A run that reaches the end of the mask is
+    closed at len(silence_mask) instead of being dropped.
+    """
+    mask = np.asarray(silence_mask, dtype=bool)
+    if mask.size == 0:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    # Pad with False on both sides so every run has a rising and a falling edge.
+    padded = np.concatenate(([False], mask, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    return edges[0::2], edges[1::2]
+
+
+def stitch_runs(shard_runs):
+    """Join the runs of consecutive shards of a mask into the runs of the whole mask.
+
+    shard_runs is a list of (start_frames, end_frames) in global frame
+    numbers, one per shard, in order. Within a shard two runs never touch,
+    so a run ending exactly where the next one starts continues across a
+    shard boundary (possibly across several shards).
+    """
+    if not shard_runs:
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+    starts = np.concatenate([np.asarray(runs[0], dtype=np.int64) for runs in shard_runs])
+    ends = np.concatenate([np.asarray(runs[1], dtype=np.int64) for runs in shard_runs])
+    if starts.size == 0:
+        return starts, ends
+    joined = ends[:-1] == starts[1:]
+    return starts[np.concatenate(([True], ~joined))], ends[np.concatenate((~joined, [True]))]
+
+
+def silence_segments_from_runs(start_frames, end_frames, sample_rate, hop_length,
+                               min_silence_duration_ms, offset_in_ms, offset_out_ms,
+                               max_time=None):
+    """Apply the min-duration and offset rules to all runs at once.
+
+    Returns a list of (start_time, end_time) tuples in seconds.
+    """
+    start_frames = np.asarray(start_frames, dtype=np.int64)
+    end_frames = np.asarray(end_frames, dtype=np.int64)
+    min_silence_frames = int(min_silence_duration_ms * sample_rate / hop_length / 1000)
+    keep = (end_frames - start_frames) >= min_silence_frames
+    # frames * hop / sr, in that order: what librosa.frames_to_time computes, to the last bit.
+    start_times = start_frames[keep] * hop_length / float(sample_rate) + (offset_in_ms / 1000.0)
+    end_times = end_frames[keep] * hop_length / float(sample_rate) - (offset_out_ms / 1000.0)
+    if max_time is not None:
+        # The last RMS frame is centred past the final sample; never cut beyond the file.
+        start_times = np.minimum(start_times, max_time)
+        end_times = np.minimum(end_times, max_time)
+    start_times = np.maximum(0.0, start_times)
+    end_times = np.maximum(start_times, end_times)
+    return list(zip(start_times.tolist(), end_times.tolist()))
+
+
+def detect_silence_segments(rms, sample_rate, hop_length, noise_threshold_percent,
+                            min_silence_duration_ms, offset_in_ms, offset_out_ms,
+                            max_time=None, rms_max=None):
+    """Threshold an RMS envelope and return the silence segments in seconds.
+
+    noise_threshold_percent is a fraction (0.0 - 1.0) of the envelope maximum.
+    Pass rms_max when it is already known to skip the extra pass over rms.
+    """
+    rms = np.asarray(rms)
+    if rms.size == 0:
+        return []
+    if rms_max is None:
+        rms_max = np.max(rms)
+    silence_mask = rms < noise_threshold_percent * rms_max
+    start_frames, end_frames = find_silent_runs(silence_mask)
+    return silence_segments_from_runs(start_frames, end_frames, sample_rate, hop_length,
+                                      min_silence_duration_ms, offset_in_ms, offset_out_ms,
+                                      max_time=max_time)
+
+
+def build_segments_to_keep(silence_segments, total_duration):
+    """Return the non-silent (start, end) segments between the silence gaps."""
+    keep = []
+    last_end_time = 0
+    for start_time, end_time in silence_segments:
+        keep.append((last_end_time, start_time))
+        last_end_time = end_time
+    keep.append((last_end_time, total_duration))
+    return keep
+
+
+def kept_duration(segments_to_keep):
+    """Return the total length in seconds of the kept segments."""
+    return sum(max(0.0, end - start) for start, end in segments_to_keep)
@@ -0,0 +1,125 @@
+"""Block-wise decode and RMS analysis for long recordings.
+
+The file is read in fixed-size blocks and the RMS envelope (plus the
+waveform pyramid used for drawing) is computed incrementally, so no
+samples are kept: memory grows only with the envelope, and the pyramid
+is held to a fixed number of bins (see pyramid_block). Frames that
+straddle a block boundary are carried over to the next block, which
+makes the result match librosa.feature.rms (center=True, constant
+padding) on the same mono signal.
+"""
+import numpy as np
+import soundfile as sf
+
+from waveform_pyramid import BASE_BLOCK, PyramidBuilder
+
+DEFAULT_BLOCK_SIZE = 1 << 18  # samples per read, per channel
+# Level-0 bins of the waveform pyramid a streaming pass keeps, however long the input (8 MB).
+STREAM_PYRAMID_BINS = 1 << 20
+
+
+class StreamingRMS:
+    """Incremental equivalent of librosa.feature.rms(y=..., center=True)."""
+
+    def __init__(self, frame_length=2048, hop_length=512):
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+        # center=True pads frame_length // 2 zeros on both sides of the signal.
+        self._carry = np.zeros(frame_length // 2, dtype=np.float32)
+        self._chunks = []
+        self.n_samples = 0
+
+    def push(self, block):
+        """Feed the next block of mono samples."""
+        block = np.asarray(block, dtype=np.float32)
+        self.n_samples += block.shape[0]
+        self._consume(np.concatenate((self._carry, block)))
+
+    def finish(self):
+        """Flush the trailing padding and return the full RMS envelope."""
+        pad = np.zeros(self.frame_length // 2, dtype=np.float32)
+        self._consume(np.concatenate((self._carry, pad)))
+        self._carry = np.empty(0, dtype=np.float32)
+        if not self._chunks:
+            return np.empty(0, dtype=np.float32)
+        return np.concatenate(self._chunks)
+
+    def _consume(self, buffer):
+        if buffer.shape[0] < self.frame_length:
+            self._carry = buffer
+            return
+        n_frames = 1 + (buffer.shape[0] - self.frame_length) // self.hop_length
+        frames = np.lib.stride_tricks.sliding_window_view(buffer, self.frame_length)[::self.hop_length][:n_frames]
+        power = np.mean(np.square(frames), axis=1)
+        self._chunks.append(np.sqrt(power).astype(np.float32, copy=False))
+        # Keep every sample that a later frame still needs.
+        self._carry = buffer[n_frames * self.hop_length:].copy()
+
+
+class StreamAnalysis:
+    """Result of a streaming pass: the envelope plus what is known about the file."""
+
+    def __init__(self, rms, sample_rate, n_samples, frame_length, hop_length, pyramid=None):
+        self.rms = rms
+        self.pyramid = pyramid
+        self.sample_rate = sample_rate
+        self.n_samples = n_samples
+        self.frame_length = frame_length
+        self.hop_length = hop_length
+
+    @property
+    def duration(self):
+        return self.n_samples / float(self.sample_rate)
+
+
+def can_stream(filepath):
+    """Return True if soundfile can read the file block by block."""
+    try:
+        sf.info(filepath)
+    except RuntimeError:
+        return False
+    return True
+
+
+def iter_mono_blocks(filepath, block_size=DEFAULT_BLOCK_SIZE):
+    """Yield (sample_rate, block) pairs of float32 mono samples at the native rate."""
+    with sf.SoundFile(filepath) as f:
+        for block in f.blocks(blocksize=block_size, dtype="float32", always_2d=True):
+            # Same downmix as librosa.to_mono: the mean over channels.
+            yield f.samplerate, block.mean(axis=1) if block.shape[1] > 1 else block[:, 0]
+
+
+def pyramid_block(expected_samples, hop_length):
+    """Samples per level-0 pyramid bin for a streaming pass over about expected_samples samples.
+
+    Never finer than the envelope (hop_length), and coarse enough to keep
+    level 0 within STREAM_PYRAMID_BINS; expected_samples may be None if the
+    length is not known in advance.
+    """
+    block = max(BASE_BLOCK, hop_length)
+    if expected_samples:
+        block = max(block, -(-int(expected_samples) // STREAM_PYRAMID_BINS))
+    return block
+
+
+def stream_rms(filepath, frame_length=2048, hop_length=512, block_size=DEFAULT_BLOCK_SIZE):
+    """Compute the RMS envelope and waveform pyramid of a file without loading it into memory."""
+    info = sf.info(filepath)
+    blocks = (block for _, block in iter_mono_blocks(filepath, block_size))
+    return analyse_blocks(blocks, info.samplerate, frame_length, hop_length, expected_samples=info.frames)
+
+
+def analyse_blocks(blocks, sample_rate, frame_length=2048, hop_length=512, expected_samples=None):
+    """Streaming analysis of any iterable of mono blocks (e.g. from an ffmpeg pipe).
+
+    Blocks may be views of a reused buffer; nothing keeps a reference to them.
+    The pyramid's bins are sized from expected_samples (see pyramid_block).
+    """
+    analyzer = StreamingRMS(frame_length, hop_length)
+    pyramid_builder = PyramidBuilder(pyramid_block(expected_samples, hop_length))
+    for block in blocks:
+        analyzer.push(block)
+        pyramid_builder.push(block)
+    rms = analyzer.finish()
+    return StreamAnalysis(rms, sample_rate, analyzer.n_samples, frame_length, hop_length,
+                          pyramid=pyramid_builder.finish(sample_rate))
@@ -0,0 +1,92 @@
+"""Keys, eviction and persistence of the on-disk analysis cache."""
+import os
+
+import numpy as np
+
+from analysis_cache import AnalysisCache
+
+PARAMS = {"streaming": False}
+
+
+def write_file(path, content=b"\x00" * 4096, mtime_ns=None):
+    with open(path, "wb") as f:
+        f.write(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return str(path)
+
+
+def store(cache, key, n_bytes=4096):
+    return cache.store(key, {"rms": np.zeros(n_bytes // 4, dtype=np.float32)}, {"sample_rate": 22050})
+
+
+def set_last_used(cache, key, seconds):
+    os.utime(os.path.join(cache.directory, key), (seconds, seconds))
+
+
+def test_key_changes_with_the_file_and_the_params(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    path = write_file(tmp_path / "a.wav", mtime_ns=10 ** 18)
+    key = cache.key_for(path, PARAMS)
+    assert cache.key_for(path, PARAMS) == key
+    assert cache.key_for(path, {"streaming": True}) != key
+    # Same content, touched later.
+    write_file(path, mtime_ns=10 ** 18 + 1)
+    assert cache.key_for(path, PARAMS) != key
+    # Same mtime, one byte longer.
+    write_file(path, b"\x00" * 4097, mtime_ns=10 ** 18)
+    assert cache.key_for(path, PARAMS) != key
+
+
+def test_a_modified_file_misses(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    path = write_file(tmp_path / "a.wav")
+    store(cache, cache.key_for(path, PARAMS))
+    assert cache.lookup(cache.key_for(path, PARAMS)) is not None
+    write_file(path, b"\x01" * 4096)
+    assert cache.lookup(cache.key_for(path, PARAMS)) is None
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"), max_bytes=3 * 4096 + 1024)
+    for age, key in enumerate(["c", "b", "a"]):
+        store(cache, key)
+        set_last_used(cache, key, 1000 - age)
+    # A lookup counts as a use: "a" is now the newest.
+    assert cache.lookup("a") is not None
+    store(cache, "d")
+    assert cache.lookup("b") is None
+    assert {key for _, _, key in cache.entries()} == {"a", "c", "d"}
+    assert sum(size for _, size, _ in cache.entries()) <= cache.max_bytes
+
+
+def test_new_entry_is_kept_even_if_larger_than_the_cap(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"), max_bytes=1024)
+    store(cache, "old")
+    entry = store(cache, "new", n_bytes=8192)
+    assert [key for _, _, key in cache.entries()] == ["new"]
+    assert entry.array("rms").shape == (2048,)
+
+
+def test_segments_are_written_only_when_persisted_or_flushed(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    entry = store(cache, "key")
+    live, saved = {"noise_threshold": 5}, {"noise_threshold": 10}
+    entry.store_segments(live, [(0.5, 1.0)], persist=False)
+    assert entry.segments(live) == [(0.5, 1.0)]
+    assert cache.lookup("key").segments(live) is None
+    entry.flush()
+    assert cache.lookup("key").segments(live) == [(0.5, 1.0)]
+    # Persisting one result also writes those held back before it.
+    entry.store_segments(live, [(0.6, 1.0)], persist=False)
+    entry.store_segments(saved, [(1.5, 2.5), (3.0, 4.0)])
+    reopened = cache.lookup("key")
+    assert reopened.segments(live) == [(0.6, 1.0)]
+    assert reopened.segments(saved) == [(1.5, 2.5), (3.0, 4.0)]
+    assert reopened.segments({"noise_threshold": 20}) is None
+
+
+def test_empty_segments_round_trip(tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    store(cache, "key").store_segments(PARAMS, [])
+    assert cache.lookup("key").segments(PARAMS) == []
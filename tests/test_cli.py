@@ -0,0 +1,35 @@
+"""Output planning of the batch front end."""
+import os
+
+import cli
+
+
+def make_inputs(tmp_path, *names):
+    paths = []
+    for name in names:
+        path = tmp_path / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+        paths.append(str(path))
+    return paths
+
+
+def test_same_basename_in_one_output_dir_is_refused(tmp_path, capsys):
+    inputs = make_inputs(tmp_path, "a/talk.wav", "b/talk.wav", "b/other.wav")
+    output_dir = tmp_path / "out"
+    assert cli.main([*inputs, "-o", str(output_dir), "--no-cache"]) == 2
+    error = capsys.readouterr().err
+    assert os.path.join(str(output_dir), "talk_silence_cut.mp3") in error
+    assert "other.wav" not in error
+    # Refused before anything was created.
+    assert not output_dir.exists()
+
+
+def test_same_stem_summaries_collide_in_detect_only(tmp_path):
+    inputs = make_inputs(tmp_path, "talk.wav", "talk.mp3")
+    assert cli.main([*inputs, "--detect-only", "--no-cache"]) == 2
+
+
+def test_path_collisions_ignores_distinct_and_missing_paths():
+    paths = {"a.wav": ("out/a.mp3", None), "b.wav": ("out/b.mp3", None), "c.wav": ("out/./a.mp3", None)}
+    assert list(cli.path_collisions(paths).values()) == [["a.wav", "c.wav"]]
@@ -0,0 +1,133 @@
+"""The GUI-free pipeline in core.py: loading, the analysis cache and audio export."""
+import shutil
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+import parallel_detect
+from analysis_cache import AnalysisCache
+from core import export_audio_piped, iter_kept_samples, load_audio
+from ffmpeg_utils import FFMPEG, run_ffmpeg
+from profiling import Profiler, using_profiler
+
+SAMPLE_RATE = 44100
+
+
+@pytest.fixture
+def speech_wav(tmp_path):
+    """Two seconds of tone with a half-second pause in the middle, in stereo."""
+    t = np.arange(2 * SAMPLE_RATE) / SAMPLE_RATE
+    tone = 0.3 * np.sin(2 * np.pi * 440 * t)
+    tone[int(0.75 * SAMPLE_RATE):int(1.25 * SAMPLE_RATE)] = 0.0
+    path = tmp_path / "speech.wav"
+    sf.write(str(path), np.stack([tone, 0.5 * tone], axis=1).astype(np.float32), SAMPLE_RATE, subtype="FLOAT")
+    return str(path)
+
+
+def test_cache_hit_without_profiler(speech_wav, tmp_path):
+    # stage() is a no-op without a profiler; a cache hit must not depend on one.
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    first = load_audio(speech_wav, cache=cache)
+    second = load_audio(speech_wav, cache=cache)
+    assert second.cache_entry is not None
+    np.testing.assert_array_equal(second.rms, first.rms)
+
+
+def test_cache_hit_is_recorded_in_the_profile(speech_wav, tmp_path):
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    profilers = [Profiler("miss"), Profiler("hit")]
+    for profiler in profilers:
+        with using_profiler(profiler):
+            load_audio(speech_wav, cache=cache)
+    lookups = [[record.args.get("hit") for record in profiler.records if record.name == "cache lookup"]
+               for profiler in profilers]
+    assert lookups == [[None], [True]]
+
+
+@pytest.mark.parametrize("kind, native_rate", [("stereo", False), ("stereo", True), ("mono", True), ("aac", False)])
+def test_long_signals_are_decoded_into_shared_memory(monkeypatch, tmp_path, speech_wav, kind, native_rate):
+    if kind == "aac" and shutil.which(FFMPEG) is None:
+        pytest.skip("ffmpeg not installed")
+    path = speech_wav
+    if kind == "mono":
+        path = str(tmp_path / "mono.wav")
+        sf.write(path, sf.read(speech_wav, dtype="float32")[0][:, 0], SAMPLE_RATE, subtype="FLOAT")
+    elif kind == "aac":
+        path = str(tmp_path / "speech.m4a")
+        run_ffmpeg([FFMPEG, "-v", "error", "-i", speech_wav, "-c:a", "aac", path])
+    expected = load_audio(path, native_rate=native_rate, detect_workers=1).audio_data
+    # Pretend the file is long enough to be analysed in shards.
+    monkeypatch.setattr(parallel_detect, "MIN_SHARDED_SAMPLES", 1000)
+    source = load_audio(path, native_rate=native_rate, detect_workers=2)
+    assert parallel_detect._shared_location(source.audio_data) is not None
+    np.testing.assert_array_equal(source.audio_data, expected)
+
+
+@pytest.mark.skipif(shutil.which(FFMPEG) is None, reason="ffmpeg not installed")
+def test_export_after_a_cache_hit_matches_a_miss(speech_wav, tmp_path):
+    # A hit keeps no samples; export must read them again exactly as the miss did, resampler included.
+    cache = AnalysisCache(str(tmp_path / "cache"))
+    segments_to_keep = [(0.1, 0.9), (1.2, 1.9)]
+    outputs = []
+    for name in ("miss", "hit"):
+        source = load_audio(speech_wav, cache=cache)
+        outputs.append(str(tmp_path / f"{name}.wav"))
+        export_audio_piped(source, segments_to_keep, outputs[-1])
+    assert source.audio_data is None
+    miss, hit = (sf.read(path, dtype="float32")[0] for path in outputs)
+    np.testing.assert_array_equal(hit, miss)
+
+
+def random_ranges(rng, n_samples):
+    edges = np.sort(rng.choice(n_samples + 1, size=2 * rng.integers(0, 8), replace=False))
+    return [(int(start), int(end)) for start, end in edges.reshape(-1, 2)]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_iter_kept_samples_matches_slicing(seed):
+    rng = np.random.default_rng(seed)
+    samples = rng.standard_normal(int(rng.integers(0, 5000))).astype(np.float32)
+    sample_ranges = random_ranges(rng, samples.shape[0])
+    # Random block sizes: ranges start, end and span several blocks at any offset.
+    edges = np.sort(rng.integers(0, samples.shape[0] + 1, int(rng.integers(0, 20))))
+    blocks = np.split(samples, edges)
+    pieces = list(iter_kept_samples(iter(blocks), sample_ranges))
+    expected = [samples[start:end] for start, end in sample_ranges]
+    np.testing.assert_array_equal(np.concatenate(pieces or [np.empty(0, np.float32)]),
+                                  np.concatenate(expected or [np.empty(0, np.float32)]))
+    assert all(piece.base is not None for piece in pieces)  # Views, not copies.
+
+
+def test_iter_kept_samples_stops_reading_after_the_last_range():
+    read = []
+
+    def blocks():
+        for i in range(10):
+            read.append(i)
+            yield np.full(100, i, dtype=np.float32)
+
+    pieces = list(iter_kept_samples(blocks(), [(150, 250)]))
+    assert [piece.tolist() for piece in pieces] == [[1.0] * 50, [2.0] * 50]
+    assert read == [0, 1, 2]
+
+
+@pytest.mark.skipif(shutil.which(FFMPEG) is None, reason="ffmpeg not installed")
+@pytest.mark.parametrize("streaming", [False, True])
+def test_export_audio_piped_writes_the_kept_samples(speech_wav, tmp_path, streaming):
+    source = load_audio(speech_wav, streaming=streaming, native_rate=True)
+    segments_to_keep = [(0.1, 0.6), (1.3, 1.8), (1.9, 5.0)]
+    output = str(tmp_path / "cut.wav")
+    progress = []
+    export_audio_piped(source, segments_to_keep, output, lambda percent, text: progress.append(percent))
+    stereo, _ = sf.read(speech_wav, dtype="float32")
+    kept = np.concatenate([stereo.mean(axis=1)[int(start * SAMPLE_RATE):int(end * SAMPLE_RATE)]
+                           for start, end in segments_to_keep])
+    # What the export did before piping: write the kept samples to a WAV and convert that.
+    reference_wav, reference = str(tmp_path / "kept.wav"), str(tmp_path / "reference.wav")
+    sf.write(reference_wav, kept, SAMPLE_RATE, subtype="FLOAT")
+    run_ffmpeg([FFMPEG, "-v", "error", "-i", reference_wav, "-vn", "-ar", str(SAMPLE_RATE), "-ac", "2", reference])
+    exported, sample_rate = sf.read(output, dtype="float32", always_2d=True)
+    assert sample_rate == SAMPLE_RATE and exported.shape == (kept.shape[0], 2)
+    np.testing.assert_array_equal(exported, sf.read(reference, dtype="float32", always_2d=True)[0])
+    assert progress[-1] == 100
@@ -0,0 +1,64 @@
+"""Level of the ffmpeg decode: multichannel audio is mixed down like librosa.to_mono."""
+import shutil
+
+import librosa
+import numpy as np
+import pytest
+import soundfile as sf
+
+from core import read_native
+from ffmpeg_decode import decode_ffmpeg, iter_ffmpeg_blocks, probe_audio
+
+pytestmark = pytest.mark.skipif(shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None,
+                                reason="ffmpeg not installed")
+
+SAMPLE_RATE = 44100
+
+
+@pytest.fixture(params=[1, 2, 3], ids=["mono", "stereo", "3ch"])
+def multichannel_wav(request, tmp_path):
+    """A float WAV whose channels differ in level, so a wrong downmix changes the peak."""
+    rng = np.random.RandomState(request.param)
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+    channels = [(0.4 / (c + 1)) * np.sin(2 * np.pi * (220 * (c + 1)) * t) + 0.01 * rng.standard_normal(t.shape)
+                for c in range(request.param)]
+    path = tmp_path / "tone.wav"
+    sf.write(str(path), np.stack(channels, axis=1).astype(np.float32), SAMPLE_RATE, subtype="FLOAT")
+    return str(path)
+
+
+def librosa_mono(path):
+    samples, _ = sf.read(path, dtype="float32", always_2d=True)
+    return librosa.to_mono(samples.T)
+
+
+def test_probe_reports_channels(multichannel_wav):
+    sample_rate, duration, channels = probe_audio(multichannel_wav)
+    assert (sample_rate, channels) == (SAMPLE_RATE, sf.info(multichannel_wav).channels)
+    assert duration == pytest.approx(2.0)
+
+
+def test_decode_matches_librosa_to_mono(multichannel_wav):
+    expected = librosa_mono(multichannel_wav)
+    decoded = decode_ffmpeg(multichannel_wav)
+    assert decoded.shape == expected.shape
+    np.testing.assert_allclose(decoded, expected, atol=1e-6)
+    assert np.abs(decoded).max() == pytest.approx(np.abs(expected).max(), rel=1e-5)
+    # Same samples as the soundfile path a WAV normally takes.
+    native, _ = read_native(multichannel_wav)
+    np.testing.assert_allclose(decoded, native, atol=1e-6)
+
+
+@pytest.mark.parametrize("block_size", [1000, 4096, 1 << 20])
+def test_blocks_match_librosa_to_mono(multichannel_wav, block_size):
+    expected = librosa_mono(multichannel_wav)
+    decoded = np.concatenate([block.copy() for block in iter_ffmpeg_blocks(multichannel_wav, block_size=block_size)])
+    np.testing.assert_allclose(decoded, expected, atol=1e-6)
+
+
+def test_resampled_decode_keeps_the_level(multichannel_wav):
+    # ffmpeg and librosa resample differently; the level must still agree closely.
+    expected = librosa.resample(librosa_mono(multichannel_wav), orig_sr=SAMPLE_RATE, target_sr=22050)
+    decoded = decode_ffmpeg(multichannel_wav, 22050)
+    assert abs(decoded.shape[0] - expected.shape[0]) <= 1
+    assert np.sqrt(np.mean(decoded ** 2)) == pytest.approx(np.sqrt(np.mean(expected ** 2)), rel=0.01)
@@ -0,0 +1,76 @@
+"""Process cleanup and CPU accounting of the ffmpeg runners."""
+import os
+import shutil
+import threading
+
+import numpy as np
+import pytest
+
+import ffmpeg_utils
+from ffmpeg_decode import DecodeProcess
+from ffmpeg_utils import FFMPEG, ProcessGroup, run_ffmpeg, run_ffmpeg_progress, run_ffmpeg_stdin
+from profiling import Profiler, stage, using_profiler
+
+pytestmark = pytest.mark.skipif(shutil.which(FFMPEG) is None, reason="ffmpeg not installed")
+
+
+def test_failing_progress_callback_stops_ffmpeg(monkeypatch):
+    started = []
+
+    def start_process(cmd, **popen_kwargs):
+        started.append(ffmpeg_utils.subprocess.Popen(cmd, **popen_kwargs))
+        return started[-1]
+
+    def progress_callback(percent, est_time_text):
+        raise KeyError("callback failed")
+
+    monkeypatch.setattr(ffmpeg_utils, "start_process", start_process)
+    # Long enough that ffmpeg is still running when the first progress report arrives.
+    cmd = [FFMPEG, "-v", "error", "-re", "-f", "lavfi", "-i", "anullsrc=d=60", "-f", "null", "-"]
+    with pytest.raises(KeyError):
+        run_ffmpeg_progress(cmd, 60, progress_callback)
+    assert started and started[0].returncode is not None
+
+
+def test_child_cpu_is_charged_to_the_stage_that_ran_ffmpeg():
+    # A busy encode finishes on one thread while an idle ffmpeg, started first, still runs on another.
+    busy_cmd = [FFMPEG, "-v", "error", "-f", "lavfi", "-i", "sine=d=600", "-c:a", "flac", "-f", "null", "-"]
+    idle_cmd = [FFMPEG, "-v", "error", "-re", "-f", "lavfi", "-i", "anullsrc=d=3", "-f", "null", "-"]
+    profilers = {"busy": Profiler("busy"), "idle": Profiler("idle")}
+
+    def run(name, cmd):
+        with using_profiler(profilers[name]), stage("ffmpeg"):
+            run_ffmpeg(cmd)
+
+    threads = [threading.Thread(target=run, args=("idle", idle_cmd)),
+               threading.Thread(target=run, args=("busy", busy_cmd))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    busy, = profilers["busy"].records
+    idle, = profilers["idle"].records
+    if busy.child_cpu is None:
+        pytest.skip("child CPU time is not measured on this platform")
+    assert busy.child_cpu > 0.1
+    assert idle.child_cpu < busy.child_cpu / 2
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="child CPU time is only read where os.wait4 exists")
+def test_every_runner_reaps_through_the_wait4_hook(monkeypatch, tmp_path):
+    # Process overrides CPython's private Popen._try_wait; if a Python release stops calling it,
+    # child CPU would silently read 0. Every way a process is waited for must go through it.
+    reaped = []
+    monkeypatch.setattr(ffmpeg_utils, "add_child_cpu", reaped.append)
+    cmd = [FFMPEG, "-v", "error", "-f", "lavfi", "-i", "sine=d=1", "-f", "null", "-"]
+    run_ffmpeg(cmd)
+    run_ffmpeg_progress(cmd, 1.0)
+    run_ffmpeg_stdin([FFMPEG, "-v", "error", "-f", "f32le", "-ar", "8000", "-ac", "1", "-i", "pipe:0",
+                      "-f", "null", "-"], [np.zeros(8000, dtype=np.float32)])
+    ProcessGroup().run(cmd)
+    path = str(tmp_path / "tone.wav")
+    run_ffmpeg([FFMPEG, "-v", "error", "-f", "lavfi", "-i", "sine=d=1", path])
+    with DecodeProcess(path, channels=1) as decode:
+        decode.readinto(np.empty(1 << 16, dtype=np.float32))
+    assert len(reaped) == 6
+    assert all(seconds >= 0 for seconds in reaped)
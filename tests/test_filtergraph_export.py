@@ -0,0 +1,51 @@
+"""The select expression keeps the same instants as the original sum of terms."""
+import random
+
+import pytest
+
+from filtergraph_export import merge_segments, select_expression
+
+
+def reference_expression(segments):
+    terms = [f"gte(t,{start:.6f})*lt(t,{end:.6f})" for start, end in segments if end > start]
+    return "+".join(terms) if terms else "0"
+
+
+def evaluate(expression, t):
+    """Evaluate the subset of ffmpeg's expression language the export uses."""
+    functions = {
+        "if_": lambda condition, then, otherwise: then if condition else otherwise,
+        "lt": lambda x, y: float(x < y),
+        "gte": lambda x, y: float(x >= y),
+        "t": t,
+    }
+    return eval(expression.replace("if(", "if_("), functions)
+
+
+def random_segments(rng):
+    segments = []
+    for _ in range(rng.randint(0, 30)):
+        start = round(rng.uniform(0, 50), 3)
+        segments.append((start, start + round(rng.uniform(-1, 5), 3)))
+    return segments
+
+
+def test_merge_segments_joins_touching_and_overlapping():
+    assert merge_segments([(5, 6), (0, 1), (1, 2), (1.5, 3), (4, 4)]) == [(0, 3), (5, 6)]
+    assert merge_segments([]) == []
+
+
+def test_empty_keep_list_selects_nothing():
+    assert select_expression([]) == "0"
+    assert select_expression([(2.0, 1.0)]) == "0"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_select_expression_matches_reference(seed):
+    rng = random.Random(seed)
+    segments = random_segments(rng)
+    expression, reference = select_expression(segments), reference_expression(segments)
+    # Boundaries are where an off-by-one in the tree would show.
+    instants = [rng.uniform(-1, 60) for _ in range(200)] + [edge for segment in segments for edge in segment]
+    for t in instants:
+        assert bool(evaluate(expression, t)) == bool(evaluate(reference, t)), t
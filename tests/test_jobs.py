@@ -0,0 +1,144 @@
+"""Ordering, superseding and cancellation in the GUI's job manager."""
+import threading
+
+import pytest
+
+from jobs import JOB_DETECT, JOB_EXPORT, JOB_LOAD, JobCancelled, JobManager
+
+TIMEOUT = 10
+
+
+class Events:
+    """Collects callbacks as (event, job.kind, *args) and lets a test wait for them."""
+
+    def __init__(self):
+        self.calls = []
+        self._condition = threading.Condition()
+
+    def callbacks(self, *names):
+        return {f"on_{name}": self._recorder(name) for name in names}
+
+    def _recorder(self, name):
+        def record(job, *args):
+            with self._condition:
+                self.calls.append((name, job.kind, *args))
+                self._condition.notify_all()
+        return record
+
+    def wait_for(self, n_calls):
+        with self._condition:
+            assert self._condition.wait_for(lambda: len(self.calls) >= n_calls, TIMEOUT), self.calls
+        return list(self.calls)
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=1)
+    yield manager
+    manager.shutdown()
+
+
+def blocking_job(manager):
+    """Occupy the only worker until the returned event is set."""
+    started, release = threading.Event(), threading.Event()
+
+    def block(job):
+        started.set()
+        release.wait(TIMEOUT)
+
+    manager.submit("block", block)
+    assert started.wait(TIMEOUT)
+    return release
+
+
+def test_queued_jobs_run_by_priority_then_submission(manager):
+    release = blocking_job(manager)
+    events = Events()
+    order = []
+    for kind, name in [(JOB_EXPORT, "export"), (JOB_DETECT, "detect 1"), (JOB_LOAD, "load"),
+                       (JOB_DETECT, "detect 2")]:
+        manager.submit(kind, lambda job, name: order.append(name), name, supersedes=(),
+                       **events.callbacks("done"))
+    release.set()
+    events.wait_for(4)
+    assert order == ["load", "detect 1", "detect 2", "export"]
+
+
+def test_a_new_job_supersedes_a_running_one_of_the_same_kind(manager):
+    events = Events()
+    started = threading.Event()
+
+    def detect(job, value):
+        started.set()
+        while True:
+            job.report_progress(0, "")  # Raises once superseded.
+
+    old = manager.submit(JOB_DETECT, detect, 1, **events.callbacks("done", "cancelled"))
+    assert started.wait(TIMEOUT)
+    new = manager.submit(JOB_DETECT, lambda job, value: value, 2, **events.callbacks("done", "cancelled"))
+    assert events.wait_for(2) == [("cancelled", JOB_DETECT), ("done", JOB_DETECT, 2)]
+    assert (old.state, new.state) == ("cancelled", "done")
+
+
+def test_supersedes_only_cancels_the_listed_kinds(manager):
+    release = blocking_job(manager)
+    events = Events()
+    export = manager.submit(JOB_EXPORT, lambda job: "saved", **events.callbacks("done", "cancelled"))
+    detect = manager.submit(JOB_DETECT, lambda job: "segments", **events.callbacks("done", "cancelled"))
+    # What loading a new file does: its analysis replaces the old one, an export keeps going.
+    manager.submit(JOB_LOAD, lambda job: "source", supersedes=(JOB_LOAD, JOB_DETECT),
+                   **events.callbacks("done", "cancelled"))
+    assert detect.token.cancelled and not export.token.cancelled
+    release.set()
+    assert sorted(events.wait_for(3)) == [("cancelled", JOB_DETECT), ("done", JOB_EXPORT, "saved"),
+                                          ("done", JOB_LOAD, "source")]
+
+
+def test_a_job_cancelled_while_queued_never_runs(manager):
+    release = blocking_job(manager)
+    events = Events()
+    ran = []
+    job = manager.submit(JOB_EXPORT, lambda job: ran.append(job), **events.callbacks("done", "cancelled"))
+    manager.cancel([JOB_EXPORT])
+    release.set()
+    assert events.wait_for(1) == [("cancelled", JOB_EXPORT)]
+    assert ran == [] and job.state == "cancelled"
+
+
+def test_the_result_of_a_job_cancelled_while_finishing_is_dropped(manager):
+    events = Events()
+    started, release = threading.Event(), threading.Event()
+
+    def load(job):
+        started.set()
+        release.wait(TIMEOUT)
+        return "stale source"  # Finishes without noticing the cancel.
+
+    job = manager.submit(JOB_LOAD, load, **events.callbacks("done", "cancelled"))
+    assert started.wait(TIMEOUT)
+    job.cancel()
+    release.set()
+    assert events.wait_for(1) == [("cancelled", JOB_LOAD)]
+    with pytest.raises(JobCancelled):
+        job.report_progress(50, "")
+
+
+def test_callbacks_already_dispatched_are_dropped_once_cancelled():
+    # The GUI runs callbacks later on the Tk thread; a cancel in between must still win.
+    pending = []
+    manager = JobManager(dispatch=lambda func, *args: pending.append((func, args)), workers=1)
+    events = Events()
+    try:
+        job = manager.submit(JOB_DETECT, lambda job: job.report_progress(100, "done") or "segments",
+                             **events.callbacks("done", "progress", "cancelled"))
+        for _ in range(TIMEOUT * 100):
+            if len(pending) == 2:
+                break
+            threading.Event().wait(0.01)
+        assert [args[1] for _, args in pending] == ["progress", "done"]
+        job.cancel()
+        for func, args in pending:
+            func(*args)
+        assert events.calls == []
+    finally:
+        manager.shutdown()
@@ -0,0 +1,176 @@
+"""Exactness of the vectorized segmentation and of sharded detection.
+
+The reference is the per-frame loop the GUI originally ran, with the two
+documented changes: a run reaching the end of the mask is closed there
+instead of being dropped, and times are clamped to max_time.
+"""
+import librosa
+import numpy as np
+import pytest
+
+import parallel_detect
+from parallel_detect import n_rms_frames, sharded_analysis
+from segmentation import detect_silence_segments, find_silent_runs, stitch_runs
+
+SAMPLE_RATE = 22050
+HOP_LENGTH = 512
+
+
+def reference_runs(mask):
+    starts, ends = [], []
+    in_silence = False
+    for i, is_silent in enumerate(mask):
+        if is_silent and not in_silence:
+            in_silence = True
+            starts.append(i)
+        elif not is_silent and in_silence:
+            in_silence = False
+            ends.append(i)
+    if in_silence:
+        ends.append(len(mask))
+    return starts, ends
+
+
+def reference_segments(rms, threshold, min_silence_duration_ms, offset_in_ms, offset_out_ms, max_time=None):
+    min_silence_frames = int(min_silence_duration_ms * SAMPLE_RATE / HOP_LENGTH / 1000)
+    segments = []
+    for start_frame, end_frame in zip(*reference_runs(rms < threshold * np.max(rms))):
+        if end_frame - start_frame < min_silence_frames:
+            continue
+        start_time = librosa.frames_to_time(start_frame, sr=SAMPLE_RATE, hop_length=HOP_LENGTH)
+        end_time = librosa.frames_to_time(end_frame, sr=SAMPLE_RATE, hop_length=HOP_LENGTH)
+        start_time += offset_in_ms / 1000.0
+        end_time -= offset_out_ms / 1000.0
+        if max_time is not None:
+            start_time = min(start_time, max_time)
+            end_time = min(end_time, max_time)
+        start_time = max(0, start_time)
+        end_time = max(start_time, end_time)
+        segments.append((float(start_time), float(end_time)))
+    return segments
+
+
+def random_envelope(n_frames, seed):
+    # Loud and quiet stretches of random length, so runs of every size occur.
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(1, 200, n_frames // 10 + 1)
+    levels = np.repeat(rng.choice([0.01, 1.0], lengths.shape[0]), lengths)[:n_frames]
+    return (levels * rng.uniform(0.5, 1.0, levels.shape[0])).astype(np.float32)
+
+
+@pytest.mark.parametrize("mask", [
+    [], [True], [False], [True] * 50, [False] * 50,
+    [True, False, True], [False, True, True, False], [True, True, False, False, True, True],
+])
+def test_find_silent_runs_edge_cases(mask):
+    starts, ends = find_silent_runs(np.array(mask, dtype=bool))
+    assert (starts.tolist(), ends.tolist()) == reference_runs(mask)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_find_silent_runs_matches_loop(seed):
+    mask = np.random.default_rng(seed).random(5000) < 0.5
+    starts, ends = find_silent_runs(mask)
+    assert (starts.tolist(), ends.tolist()) == reference_runs(mask.tolist())
+
+
+@pytest.mark.parametrize("threshold", [0.05, 0.1, 0.3, 0.6])
+@pytest.mark.parametrize("offsets", [(0, 0), (20, 20), (150, 40)])
+def test_detect_silence_segments_matches_loop(threshold, offsets):
+    rms = random_envelope(20000, seed=1)
+    max_time = rms.shape[0] * HOP_LENGTH / SAMPLE_RATE
+    expected = reference_segments(rms, threshold, 200, *offsets, max_time=max_time)
+    assert detect_silence_segments(rms, SAMPLE_RATE, HOP_LENGTH, threshold, 200, *offsets,
+                                   max_time=max_time) == expected
+
+
+def test_detect_silence_segments_empty_and_all_silent():
+    assert detect_silence_segments(np.empty(0, dtype=np.float32), SAMPLE_RATE, HOP_LENGTH, 0.1, 200, 20, 20) == []
+    # A constant envelope is never below a fraction of its own maximum.
+    assert detect_silence_segments(np.ones(100, dtype=np.float32), SAMPLE_RATE, HOP_LENGTH, 0.1, 0, 0, 0) == []
+    silent = np.zeros(100, dtype=np.float32)
+    assert detect_silence_segments(silent, SAMPLE_RATE, HOP_LENGTH, 0.1, 0, 0, 0) == []  # max 0: nothing below
+    rms = np.concatenate((np.ones(1, dtype=np.float32), np.zeros(99, dtype=np.float32)))
+    assert detect_silence_segments(rms, SAMPLE_RATE, HOP_LENGTH, 0.1, 0, 0, 0) == [
+        (HOP_LENGTH / SAMPLE_RATE, 100 * HOP_LENGTH / SAMPLE_RATE)]
+
+
+def shard_runs(mask, edges):
+    return [tuple(runs + first for runs in find_silent_runs(mask[first:last]))
+            for first, last in zip(edges[:-1], edges[1:])]
+
+
+@pytest.mark.parametrize("edges", [
+    [0, 10, 20, 30, 40],  # boundaries inside, at the start and at the end of runs
+    [0, 12, 13, 14, 40],  # one-frame shards inside a run: it spans several shards
+    [0, 0, 5, 5, 40],  # empty shards
+    [0, 40],
+])
+def test_stitch_runs_at_shard_edges(edges):
+    mask = np.zeros(40, dtype=bool)
+    mask[[0, 1, 2, 9, 10, 11, 20]] = True
+    mask[12:30] = True
+    mask[39] = True
+    starts, ends = stitch_runs(shard_runs(mask, edges))
+    assert (starts.tolist(), ends.tolist()) == reference_runs(mask.tolist())
+
+
+@pytest.mark.parametrize("fill", [True, False])
+def test_stitch_runs_uniform_mask(fill):
+    mask = np.full(30, fill)
+    starts, ends = stitch_runs(shard_runs(mask, [0, 7, 15, 30]))
+    assert (starts.tolist(), ends.tolist()) == reference_runs(mask.tolist())
+
+
+def test_stitch_runs_empty():
+    starts, ends = stitch_runs([])
+    assert starts.size == ends.size == 0
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_stitch_runs_random(seed):
+    rng = np.random.default_rng(seed)
+    mask = rng.random(3000) < 0.7
+    edges = [0] + sorted(rng.integers(0, 3000, 25).tolist()) + [3000]
+    starts, ends = stitch_runs(shard_runs(mask, edges))
+    assert (starts.tolist(), ends.tolist()) == reference_runs(mask.tolist())
+
+
+def test_sharded_analysis_matches_librosa(monkeypatch):
+    # Shards of a few frames each, so nearly every run crosses a shard boundary.
+    frame_length, hop_length = 2048, 512
+    monkeypatch.setattr(parallel_detect, "SHARD_BYTES", frame_length * 4 * 7)
+    rng = np.random.default_rng(0)
+    loud = np.repeat(rng.random(60) < 0.5, 4000)
+    samples = (rng.standard_normal(loud.shape[0]) * np.where(loud, 0.3, 0.001)).astype(np.float32)
+    rms, rms_max, (starts, ends) = sharded_analysis(samples, frame_length, hop_length, workers=2,
+                                                    threshold_fraction=0.1)
+    expected = librosa.feature.rms(y=samples, frame_length=frame_length, hop_length=hop_length)[0]
+    assert rms.shape[0] == n_rms_frames(samples.shape[0], frame_length, hop_length)
+    assert np.array_equal(rms, expected)
+    assert rms_max == float(np.max(expected))
+    expected_starts, expected_ends = find_silent_runs(expected < 0.1 * float(np.max(expected)))
+    assert np.array_equal(starts, expected_starts) and np.array_equal(ends, expected_ends)
+    assert len(parallel_detect.plan_shards(rms.shape[0], frame_length, 2)) > 10
+
+
+@pytest.mark.parametrize("offset", [0, 3])
+def test_sharded_analysis_reads_a_shared_signal_in_place(monkeypatch, offset):
+    frame_length, hop_length = 2048, 512
+    monkeypatch.setattr(parallel_detect, "SHARD_BYTES", frame_length * 4 * 7)
+    blocks = []
+    shared_array = parallel_detect._shared_array
+
+    def counting_shared_array(shape, dtype):
+        blocks.append(shape)
+        return shared_array(shape, dtype)
+
+    monkeypatch.setattr(parallel_detect, "_shared_array", counting_shared_array)
+    rng = np.random.default_rng(1)
+    signal = parallel_detect.shared_signal(offset + 100000)
+    signal[:] = rng.standard_normal(signal.shape[0]) * 0.1
+    samples = signal[offset:]
+    rms, _, _ = sharded_analysis(samples, frame_length, hop_length, workers=2)
+    assert np.array_equal(rms, librosa.feature.rms(y=samples, frame_length=frame_length, hop_length=hop_length)[0])
+    # Only the envelope needed a new block; the samples were not copied.
+    assert blocks == [(rms.shape[0],)]
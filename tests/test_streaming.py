@@ -0,0 +1,90 @@
+"""Block-wise analysis gives the same envelope and pyramid whatever the block size.
+
+Frames and pyramid bins that straddle a block boundary are carried over to
+the next block; the reference is librosa.feature.rms on the whole signal.
+"""
+import librosa
+import numpy as np
+import pytest
+
+from streaming import StreamingRMS, analyse_blocks
+from waveform_pyramid import PyramidBuilder
+
+FRAME_LENGTH, HOP_LENGTH = 2048, 512
+# Smaller than, equal to, a multiple of and not dividing frame_length; 1 makes every frame straddle blocks.
+BLOCK_SIZES = [1, 100, 511, 2048, 3000, 4096, 1 << 18]
+LENGTHS = [0, 1, 1023, 2047, 2048, 2049, 50000]
+
+
+def signal(n_samples, seed=0):
+    return (np.random.default_rng(seed).standard_normal(n_samples) * 0.1).astype(np.float32)
+
+
+def blocks_of(samples, block_size):
+    return [samples[start:start + block_size] for start in range(0, samples.shape[0], block_size)]
+
+
+def reference_rms(samples, frame_length=FRAME_LENGTH, hop_length=HOP_LENGTH):
+    return librosa.feature.rms(y=samples, frame_length=frame_length, hop_length=hop_length)[0]
+
+
+@pytest.mark.parametrize("n_samples", LENGTHS)
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_streaming_rms_matches_librosa(block_size, n_samples):
+    samples = signal(n_samples)
+    analyzer = StreamingRMS(FRAME_LENGTH, HOP_LENGTH)
+    for block in blocks_of(samples, block_size):
+        analyzer.push(block)
+    rms = analyzer.finish()
+    expected = reference_rms(samples)
+    assert analyzer.n_samples == n_samples
+    assert rms.shape == expected.shape
+    np.testing.assert_allclose(rms, expected, rtol=1e-5, atol=1e-7)
+
+
+@pytest.mark.parametrize("frame_length, hop_length", [(4096, 1024), (2048, 300), (1000, 1000)])
+def test_decimated_and_uneven_frames_match_librosa(frame_length, hop_length):
+    samples = signal(30011, seed=1)
+    rng = np.random.default_rng(2)
+    # Irregular block sizes, including empty blocks.
+    edges = np.sort(rng.integers(0, samples.shape[0], 40))
+    blocks = np.split(samples, edges)
+    analysis = analyse_blocks(blocks, 22050, frame_length, hop_length, expected_samples=samples.shape[0])
+    np.testing.assert_allclose(analysis.rms, reference_rms(samples, frame_length, hop_length), rtol=1e-5, atol=1e-7)
+    assert analysis.n_samples == samples.shape[0]
+
+
+@pytest.mark.parametrize("n_samples", LENGTHS)
+def test_analyse_blocks_is_independent_of_block_size(n_samples):
+    samples = signal(n_samples, seed=3)
+    results = [analyse_blocks(blocks_of(samples, block_size), 22050, FRAME_LENGTH, HOP_LENGTH,
+                              expected_samples=n_samples) for block_size in BLOCK_SIZES]
+    first = results[0]
+    for analysis in results[1:]:
+        np.testing.assert_array_equal(analysis.rms, first.rms)
+        assert analysis.duration == first.duration == n_samples / 22050.0
+        assert len(analysis.pyramid.levels) == len(first.pyramid.levels)
+        for (block, mins, maxs), (first_block, first_mins, first_maxs) in zip(analysis.pyramid.levels,
+                                                                              first.pyramid.levels):
+            assert block == first_block
+            np.testing.assert_array_equal(mins, first_mins)
+            np.testing.assert_array_equal(maxs, first_maxs)
+
+
+@pytest.mark.parametrize("n_samples", [0, 1, 511, 512, 513, 50000])
+@pytest.mark.parametrize("block_size", BLOCK_SIZES)
+def test_pyramid_builder_matches_whole_signal_bins(block_size, n_samples):
+    base_block = 512
+    samples = signal(n_samples, seed=4)
+    builder = PyramidBuilder(base_block)
+    for block in blocks_of(samples, block_size):
+        builder.push(block)
+    pyramid = builder.finish(22050)
+    _, mins, maxs = pyramid.levels[0]
+    n_bins = -(-n_samples // base_block)
+    bins = [samples[i * base_block:(i + 1) * base_block] for i in range(n_bins)]
+    expected_mins = np.array([b.min() for b in bins], dtype=np.float32) if bins else np.zeros(1, np.float32)
+    expected_maxs = np.array([b.max() for b in bins], dtype=np.float32) if bins else np.zeros(1, np.float32)
+    assert pyramid.n_samples == n_samples
+    np.testing.assert_array_equal(mins, expected_mins)
+    np.testing.assert_array_equal(maxs, expected_maxs)
@@ -0,0 +1,66 @@
+"""Frame accuracy of the stream-copy export, checked by content.
+
+Every output frame is matched to the most similar source frame, so a
+repeated or dropped frame at a cut shows up even when the frame count is
+right.
+"""
+import shutil
+
+import numpy as np
+import pytest
+
+from ffmpeg_utils import FFMPEG, run_ffmpeg
+from video_export import export_video_smart, plan_smart_cut, probe_video_packets
+
+pytestmark = pytest.mark.skipif(shutil.which(FFMPEG) is None or shutil.which("ffprobe") is None,
+                                reason="ffmpeg not installed")
+
+THUMBNAIL = (64, 48)
+
+
+def make_video(path, rate, duration=12, gop=25):
+    run_ffmpeg([
+        FFMPEG, "-y", "-v", "error", "-f", "lavfi", "-i", f"testsrc2=size=320x240:rate={rate}",
+        "-f", "lavfi", "-i", "sine=frequency=440", "-t", str(duration), "-c:v", "libx264", "-g", str(gop),
+        "-pix_fmt", "yuv420p", "-c:a", "aac", "-shortest", path
+    ])
+
+
+def thumbnails(path):
+    """Every decoded frame, in presentation order, as a small grey image."""
+    width, height = THUMBNAIL
+    raw = run_ffmpeg([FFMPEG, "-v", "error", "-i", path, "-map", "0:v:0", "-fps_mode", "passthrough",
+                      "-s", f"{width}x{height}", "-pix_fmt", "gray", "-f", "rawvideo", "-"])
+    return np.frombuffer(raw, dtype=np.uint8).reshape(-1, width * height).astype(np.float32)
+
+
+def kept_frames(packet_times, segments_to_keep):
+    return [index for start, end in segments_to_keep
+            for index in np.flatnonzero((packet_times >= start - 1e-5) & (packet_times < end - 1e-5))]
+
+
+@pytest.mark.parametrize("rate", ["25", "30000/1001"])
+def test_smart_export_keeps_exactly_the_kept_frames(tmp_path, rate):
+    source, output = str(tmp_path / "source.mp4"), str(tmp_path / "output.mp4")
+    make_video(source, rate)
+    # Cuts between frames and on keyframes, so there are copied and re-encoded pieces on both sides.
+    segments_to_keep = [(0.3, 4.7), (5.1, 8.0), (8.5, 11.2)]
+    packet_times, is_keyframe = probe_video_packets(source)
+    modes = {mode for mode, _, _, _ in plan_smart_cut(segments_to_keep, packet_times, is_keyframe)}
+    assert modes == {"copy", "encode"}
+
+    export_video_smart(source, segments_to_keep, output)
+
+    expected = kept_frames(packet_times, segments_to_keep)
+    source_frames, output_frames = thumbnails(source), thumbnails(output)
+    assert output_frames.shape[0] == len(expected)
+    matched = [int(np.argmin(np.mean((source_frames - frame) ** 2, axis=1))) for frame in output_frames]
+    assert matched == expected
+
+
+def test_encoded_pieces_start_on_their_first_frame():
+    packet_times = np.arange(100) / 25.0
+    is_keyframe = np.arange(100) % 25 == 0
+    pieces = plan_smart_cut([(0.3, 3.5)], packet_times, is_keyframe)
+    assert [(mode, round(start, 6), n_frames) for mode, start, _, n_frames in pieces] == [
+        ("encode", 0.32, 17), ("copy", 1.0, 50), ("encode", 3.0, 13)]
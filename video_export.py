@@ -0,0 +1,193 @@
+"""Video export: cut the kept segments out of the source and join them.
+
+Two strategies are available:
+
+* export_video_reencode re-encodes every kept segment with libx264 (the
+  original behaviour, works for any input codec).
+* export_video_smart looks up the keyframes once, stream-copies the part of
+  each segment that lies between keyframes and only re-encodes the short
+  pieces at the cut boundaries.
+"""
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from ffmpeg_utils import FFMPEG, FFPROBE, concat_files, probe_json, run_ffmpeg
+from profiling import stage
+from segmentation import kept_duration
+
+# Seeking to exactly a keyframe timestamp can land on the previous keyframe
+# when the printed time is rounded down, so copy seeks aim slightly past it.
+KEYFRAME_EPSILON = 0.001
+# ffprobe prints times with microsecond precision.
+TIME_TOLERANCE = 1e-5
+# Copying less than this is not worth the extra concat piece.
+MIN_COPY_DURATION = 0.5
+# Source codecs whose boundary pieces libx264 can re-encode to match the copied stream.
+SMART_CUT_CODECS = {"h264"}
+
+VIDEO_ENCODE_ARGS = ["-c:v", "libx264", "-preset", "fast", "-crf", "23"]
+AUDIO_ENCODE_ARGS = ["-c:a", "aac", "-b:a", "128k"]
+
+
+def probe_video_stream(filepath):
+    """Return the ffprobe description of the first video stream, or None."""
+    info = probe_json(filepath, "-select_streams", "v:0",
+                      "-show_entries", "stream=codec_name,pix_fmt,time_base,width,height")
+    streams = info.get("streams", [])
+    return streams[0] if streams else None
+
+
+def probe_video_packets(filepath):
+    """Return (times, is_keyframe) for every video packet, sorted by presentation time.
+
+    Reads packet flags only, so nothing is decoded.
+    """
+    cmd = [FFPROBE, "-v", "error", "-select_streams", "v:0",
+           "-show_entries", "packet=pts_time,flags", "-of", "csv=print_section=0", filepath]
+    times = []
+    flags = []
+    for line in run_ffmpeg(cmd).decode("utf-8", "replace").splitlines():
+        fields = line.strip().split(",")
+        if len(fields) >= 2 and fields[0] not in ("", "N/A"):
+            times.append(float(fields[0]))
+            flags.append("K" in fields[1])
+    times = np.asarray(times, dtype=np.float64)
+    order = np.argsort(times, kind="stable")
+    return times[order], np.asarray(flags, dtype=bool)[order]
+
+
+def plan_smart_cut(segments_to_keep, packet_times, is_keyframe, min_copy_duration=MIN_COPY_DURATION):
+    """Split kept segments into (mode, start, end, n_frames) pieces.
+
+    mode is "copy" for the span between the first and last keyframe inside a
+    segment and "encode" for the pieces before the first and after the last
+    keyframe. Segments without a usable keyframe span are re-encoded whole.
+    n_frames is the number of source frames in [start, end); it is passed to
+    ffmpeg so that every piece ends on an exact frame. An "encode" piece
+    starts at the time of its first frame rather than at the cut, so that
+    frame lands at 0 in the piece and the pieces join without a gap.
+    """
+    packet_times = np.asarray(packet_times, dtype=np.float64)
+    keyframes = packet_times[np.asarray(is_keyframe, dtype=bool)]
+
+    def piece(mode, start, end):
+        first, last = np.searchsorted(packet_times, (start - TIME_TOLERANCE, end - TIME_TOLERANCE))
+        if mode == "encode" and last > first:
+            start = float(packet_times[first])
+        return (mode, start, end, int(last - first))
+
+    pieces = []
+    for start, end in segments_to_keep:
+        if end - start <= KEYFRAME_EPSILON:
+            continue
+        first = np.searchsorted(keyframes, start - KEYFRAME_EPSILON, side="left")
+        last = np.searchsorted(keyframes, end + KEYFRAME_EPSILON, side="right") - 1
+        if first >= len(keyframes) or last < first or keyframes[last] - keyframes[first] < min_copy_duration:
+            pieces.append(piece("encode", start, end))
+            continue
+        copy_start = float(keyframes[first])
+        copy_end = float(keyframes[last])
+        if copy_start - start > KEYFRAME_EPSILON:
+            pieces.append(piece("encode", start, copy_start))
+        pieces.append(piece("copy", copy_start, copy_end))
+        if end - copy_end > KEYFRAME_EPSILON:
+            pieces.append(piece("encode", copy_end, end))
+    return [p for p in pieces if p[3] > 0]
+
+
+def _report(progress_callback, done_seconds, total_seconds, start_total):
+    if progress_callback is None or done_seconds <= 0 or total_seconds <= 0:
+        return
+    elapsed = time.time() - start_total
+    # Hold back the last percent for the concat step.
+    progress = min(99.0, done_seconds / total_seconds * 100)
+    # Estimate remaining time from the media seconds processed so far.
+    remaining = elapsed / done_seconds * (total_seconds - done_seconds)
+    progress_callback(progress, f"Estimated time left: {int(remaining)}s")
+
+
+def export_video_reencode(filepath, segments_to_keep, output_filepath, progress_callback=None):
+    """Re-encode every kept segment and concatenate the results."""
+    temp_files = []
+    total_seconds = kept_duration(segments_to_keep)
+    done_seconds = 0.0
+    start_total = time.time()
+    try:
+        for start, end in segments_to_keep:
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+            temp_files.append(temp_file.name)
+            temp_file.close()
+            with stage("export segment", mode="encode", start=start, end=end):
+                run_ffmpeg([
+                    FFMPEG, "-y", "-i", filepath,
+                    "-ss", str(start), "-to", str(end),
+                    *VIDEO_ENCODE_ARGS, *AUDIO_ENCODE_ARGS,
+                    temp_file.name
+                ])
+            done_seconds += end - start
+            _report(progress_callback, done_seconds, total_seconds, start_total)
+        concat_files(temp_files, output_filepath)
+    finally:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+    if progress_callback is not None:
+        progress_callback(100, "Completed")
+
+
+def export_video_smart(filepath, segments_to_keep, output_filepath, progress_callback=None):
+    """Stream-copy keyframe-aligned spans and re-encode only the cut boundaries.
+
+    Falls back to export_video_reencode when the source codec cannot be
+    matched by the boundary encoder.
+    """
+    stream = probe_video_stream(filepath)
+    if stream is None or stream.get("codec_name") not in SMART_CUT_CODECS:
+        export_video_reencode(filepath, segments_to_keep, output_filepath, progress_callback)
+        return
+    # Boundary pieces must share pixel format and time base with the copied
+    # pieces, otherwise the concat demuxer produces broken timestamps.
+    match_args = ["-pix_fmt", stream.get("pix_fmt", "yuv420p")]
+    time_base = stream.get("time_base", "")
+    if "/" in time_base:
+        match_args += ["-video_track_timescale", time_base.split("/")[1]]
+    with stage("keyframe probe"):
+        pieces = plan_smart_cut(segments_to_keep, *probe_video_packets(filepath))
+    temp_files = []
+    total_seconds = sum(end - start for _, start, end, _ in pieces)
+    done_seconds = 0.0
+    start_total = time.time()
+    try:
+        for mode, start, end, n_frames in pieces:
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+            temp_files.append(temp_file.name)
+            temp_file.close()
+            if mode == "copy":
+                # Move the keyframe from -KEYFRAME_EPSILON back to 0; -avoid_negative_ts would
+                # delay it by the B-frame reorder, and the concat would overlap the next piece.
+                video_args = ["-ss", str(start + KEYFRAME_EPSILON), "-i", filepath, "-t", str(end - start),
+                              "-c:v", "copy", "-output_ts_offset", str(KEYFRAME_EPSILON)]
+            else:
+                # start is the first frame's time: seek just before it so it is neither dropped nor
+                # delayed, and keep the source's frame times. The default CFR vsync would fill any
+                # gap before it with a duplicate, and -frames:v would then cut off the last frame.
+                video_args = ["-ss", str(start - TIME_TOLERANCE), "-i", filepath, "-t", str(end - start),
+                              "-fps_mode", "passthrough", *VIDEO_ENCODE_ARGS, *match_args]
+            # With stream copy, -t alone lets packets of the next GOP through;
+            # an exact frame count keeps every piece frame-accurate.
+            with stage("export segment", mode=mode, start=start, end=end):
+                run_ffmpeg([
+                    FFMPEG, "-y", *video_args, "-frames:v", str(n_frames), *AUDIO_ENCODE_ARGS, temp_file.name
+                ])
+            done_seconds += end - start
+            _report(progress_callback, done_seconds, total_seconds, start_total)
+        concat_files(temp_files, output_filepath)
+    finally:
+        for temp_file in temp_files:
+            if os.path.exists(temp_file):
+                os.unlink(temp_file)
+    if progress_callback is not None:
+        progress_callback(100, "Completed")
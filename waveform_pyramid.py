@@ -0,0 +1,124 @@
+"""Multi-resolution min/max envelope for fast waveform drawing.
+
+Level 0 holds the min and max of every BASE_BLOCK samples, and each level
+above it reduces the one below by FACTOR. Drawing picks the coarsest level
+that still gives at least one bin per pixel for the visible time window, so
+the number of points drawn depends on the plot width, not on file length.
+"""
+import numpy as np
+
+BASE_BLOCK = 64  # samples per bin at level 0
+FACTOR = 4  # bins merged per level
+MIN_LEVEL_BINS = 1024  # stop building levels below this many bins
+
+
+class PyramidBuilder:
+    """Accumulates level-0 min/max bins from blocks of samples of any size."""
+
+    def __init__(self, base_block=BASE_BLOCK):
+        self.base_block = base_block
+        self._carry = np.empty(0, dtype=np.float32)
+        self._mins = []
+        self._maxs = []
+        self.n_samples = 0
+
+    def push(self, block):
+        block = np.asarray(block, dtype=np.float32)
+        self.n_samples += block.shape[0]
+        buffer = np.concatenate((self._carry, block)) if self._carry.size else block
+        n_bins = buffer.shape[0] // self.base_block
+        if n_bins:
+            bins = buffer[:n_bins * self.base_block].reshape(n_bins, self.base_block)
+            self._mins.append(bins.min(axis=1))
+            self._maxs.append(bins.max(axis=1))
+        self._carry = buffer[n_bins * self.base_block:].copy()
+
+    def finish(self, sample_rate):
+        if self._carry.size:
+            # The last, partial bin.
+            self._mins.append(self._carry.min(keepdims=True))
+            self._maxs.append(self._carry.max(keepdims=True))
+            self._carry = np.empty(0, dtype=np.float32)
+        mins = np.concatenate(self._mins) if self._mins else np.zeros(1, dtype=np.float32)
+        maxs = np.concatenate(self._maxs) if self._maxs else np.zeros(1, dtype=np.float32)
+        return WaveformPyramid(mins, maxs, sample_rate, self.n_samples, self.base_block)
+
+
+def _reduce(values, factor, func):
+    n_full = values.shape[0] // factor * factor
+    reduced = func(values[:n_full].reshape(-1, factor), axis=1)
+    if n_full < values.shape[0]:
+        reduced = np.append(reduced, func(values[n_full:]))
+    return reduced
+
+
+def _peak(level):
+    _, mins, maxs = level
+    return float(max(abs(mins.min()), abs(maxs.max()), 1e-9))
+
+
+class WaveformPyramid:
+    """Min/max envelope pyramid of one mono signal."""
+
+    def __init__(self, mins, maxs, sample_rate, n_samples, base_block=BASE_BLOCK, factor=FACTOR, samples=None):
+        self.sample_rate = sample_rate
+        self.n_samples = n_samples
+        self.factor = factor
+        # Raw samples, if still in memory, are used when zoomed in past level 0.
+        self.samples = samples
+        self.levels = [(base_block, mins, maxs)]
+        while mins.shape[0] > MIN_LEVEL_BINS:
+            base_block *= factor
+            mins = _reduce(mins, factor, np.min)
+            maxs = _reduce(maxs, factor, np.max)
+            self.levels.append((base_block, mins, maxs))
+        self.peak = _peak(self.levels[-1])
+
+    @classmethod
+    def from_levels(cls, levels, sample_rate, n_samples, factor=FACTOR):
+        """Rebuild a pyramid from its saved [(block, mins, maxs), ...] levels without reducing again."""
+        pyramid = cls.__new__(cls)
+        pyramid.sample_rate = sample_rate
+        pyramid.n_samples = n_samples
+        pyramid.factor = factor
+        pyramid.samples = None
+        pyramid.levels = list(levels)
+        pyramid.peak = _peak(pyramid.levels[-1])
+        return pyramid
+
+    @classmethod
+    def from_samples(cls, samples, sample_rate, base_block=BASE_BLOCK):
+        builder = PyramidBuilder(base_block)
+        builder.push(samples)
+        pyramid = builder.finish(sample_rate)
+        pyramid.samples = samples
+        return pyramid
+
+    def view(self, start_time, end_time, pixel_width):
+        """Return (times, mins, maxs) covering [start_time, end_time] at about pixel_width bins."""
+        start_sample = max(0, int(start_time * self.sample_rate))
+        end_sample = min(self.n_samples, int(np.ceil(end_time * self.sample_rate)) + 1)
+        if end_sample <= start_sample:
+            empty = np.empty(0, dtype=np.float32)
+            return empty, empty, empty
+        samples_per_pixel = (end_sample - start_sample) / max(1, pixel_width)
+        if self.samples is not None and samples_per_pixel < self.levels[0][0]:
+            # Zoomed in past level 0: the envelope of each pair of neighbouring samples
+            # draws the line between them.
+            window = self.samples[start_sample:min(self.n_samples, end_sample + 1)]
+            if window.shape[0] > 1:
+                mins = np.minimum(window[:-1], window[1:])
+                maxs = np.maximum(window[:-1], window[1:])
+            else:
+                mins = maxs = window
+            times = (start_sample + np.arange(mins.shape[0])) / self.sample_rate
+            return times, mins, maxs
+        block, mins, maxs = self.levels[0]
+        for level_block, level_mins, level_maxs in self.levels:
+            if level_block > samples_per_pixel:
+                break
+            block, mins, maxs = level_block, level_mins, level_maxs
+        first = start_sample // block
+        last = min(mins.shape[0], end_sample // block + 1)
+        times = np.arange(first, last) * block / self.sample_rate
+        return times, mins[first:last], maxs[first:last]
@@ -0,0 +1,179 @@
+"""Waveform plot with blitted scrolling and a blitted silence overlay.
+
+The waveform is drawn from a WaveformPyramid into an off-screen strip: an
+Agg image about STRIP_WINDOWS visible windows wide, at the pixel scale of
+the current zoom. The canvas itself only caches the empty axes as its
+background. Every frame restores that background, copies the visible part
+of the strip on top and draws the silence overlay, then blits the axes.
+Scrolling therefore only shifts the strip; it is rendered again when the
+zoom or plot size changes, or when the view reaches its edge.
+
+All silence regions share one PolyCollection (the shaded spans) and one
+LineCollection (the dashed boundaries), both culled to the visible window.
+Dashed boundaries are only drawn while the visible gaps are far enough
+apart to tell them apart.
+"""
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+from matplotlib.figure import Figure
+
+WAVEFORM_COLOR = "#2b8cbe"
+SILENCE_COLOR = "red"
+# Boundary lines are left out when there are more visible gaps than one per this many
+# pixels: they would merge into the shading anyway and dominate the draw time.
+MIN_PIXELS_PER_EDGE_GAP = 4
+# Width of the pre-rendered waveform strip, in visible windows: one window of slack on
+# either side of the view when it is rendered.
+STRIP_WINDOWS = 3
+
+
+class WaveformStrip:
+    """The waveform rendered off-screen at a fixed pixel scale, over more time than is visible."""
+
+    def __init__(self, pyramid, start_time, end_time, pixels_per_second, height, ylim):
+        width = max(1, int(round((end_time - start_time) * pixels_per_second)))
+        fig = Figure(figsize=(width / 100, height / 100), dpi=100)
+        fig.patch.set_alpha(0)
+        ax = fig.add_axes((0, 0, 1, 1))
+        ax.axis("off")
+        canvas = FigureCanvasAgg(fig)
+        # The figure may come out a pixel off the size asked for; its pixels set the time scale.
+        width = int(fig.bbox.width)
+        self.start_time = start_time
+        self.end_time = start_time + width / pixels_per_second
+        self.pixels_per_second = pixels_per_second
+        self.height = height
+        ax.set_xlim(self.start_time, self.end_time)
+        ax.set_ylim(*ylim)
+        times, mins, maxs = pyramid.view(self.start_time, self.end_time, width)
+        ax.fill_between(times, mins, maxs, step="post", color=WAVEFORM_COLOR, linewidth=0.5)
+        canvas.draw()
+        # Flipped to bottom-up rows, the order renderer.draw_image takes.
+        self.pixels = np.ascontiguousarray(np.asarray(canvas.buffer_rgba())[::-1])
+
+    def covers(self, start_time, width, pixels_per_second, height):
+        """True if width pixels from start_time at this scale and height can be cut from the strip."""
+        if height != self.height or not np.isclose(pixels_per_second, self.pixels_per_second, rtol=1e-9):
+            return False
+        offset = self.offset(start_time)
+        return 0 <= offset and offset + width <= self.pixels.shape[1]
+
+    def offset(self, start_time):
+        return int(round((start_time - self.start_time) * self.pixels_per_second))
+
+    def window(self, start_time, width):
+        """The pixels of the width-pixel window starting at start_time, bottom row first."""
+        offset = self.offset(start_time)
+        return np.ascontiguousarray(self.pixels[:, offset:offset + width])
+
+
+class WaveformView:
+    """Draws a pyramid-backed waveform and a silence overlay into one Axes."""
+
+    def __init__(self, ax, pyramid):
+        self.ax = ax
+        self.pyramid = pyramid
+        self.canvas = ax.figure.canvas
+        self.strip = None
+        self.silence_starts = np.empty(0)
+        self.silence_ends = np.empty(0)
+        self.background = None
+        self.background_bounds = None  # ax.bbox.bounds the background was copied at
+        # x in data coordinates, y in axes coordinates: spans always fill the height.
+        transform = ax.get_xaxis_transform()
+        self.span_collection = PolyCollection([], facecolors=SILENCE_COLOR, edgecolors="none", alpha=0.3,
+                                              transform=transform, animated=True)
+        self.edge_collection = LineCollection([], colors=SILENCE_COLOR, linestyles="--", linewidths=0.8,
+                                              transform=transform, animated=True)
+        ax.add_collection(self.span_collection, autolim=False)
+        ax.add_collection(self.edge_collection, autolim=False)
+        peak = pyramid.peak
+        ax.set_ylim(-peak * 1.05, peak * 1.05)
+        self._draw_cid = self.canvas.mpl_connect("draw_event", self._on_draw)
+
+    def disconnect(self):
+        self.canvas.mpl_disconnect(self._draw_cid)
+
+    def _pixel_size(self):
+        return max(1, int(round(self.ax.bbox.width))), max(1, int(round(self.ax.bbox.height)))
+
+    def set_view(self, start_time, end_time):
+        """Show [start_time, end_time] and blit it; the strip is rendered again only when needed."""
+        if end_time <= start_time:
+            return
+        self.ax.set_xlim(start_time, end_time)
+        width, height = self._pixel_size()
+        pixels_per_second = width / (end_time - start_time)
+        if self.strip is None or not self.strip.covers(start_time, width, pixels_per_second, height):
+            self.strip = self._render_strip(start_time, end_time, pixels_per_second, height)
+        self._update_overlay()
+        self.blit()
+
+    def _render_strip(self, start_time, end_time, pixels_per_second, height):
+        slack = (end_time - start_time) * (STRIP_WINDOWS - 1) / 2
+        duration = self.pyramid.n_samples / self.pyramid.sample_rate
+        strip_start = min(start_time, max(0.0, start_time - slack))
+        strip_end = max(end_time, min(duration, end_time + slack))
+        # One spare pixel absorbs the rounding of the view's offset into the strip.
+        return WaveformStrip(self.pyramid, strip_start, strip_end + 1 / pixels_per_second, pixels_per_second,
+                             height, self.ax.get_ylim())
+
+    def set_silence(self, silence_segments):
+        """Replace the silence overlay and blit it over the waveform."""
+        segments = np.asarray(silence_segments, dtype=np.float64).reshape(-1, 2)
+        self.silence_starts = segments[:, 0]
+        self.silence_ends = segments[:, 1]
+        self._update_overlay()
+        self.blit()
+
+    def _update_overlay(self):
+        # Only the segments that intersect the visible window become vertices.
+        start_time, end_time = self.ax.get_xlim()
+        first = np.searchsorted(self.silence_ends, start_time, side="left")
+        last = np.searchsorted(self.silence_starts, end_time, side="right")
+        starts = self.silence_starts[first:last]
+        ends = self.silence_ends[first:last]
+        n = starts.shape[0]
+        spans = np.empty((n, 4, 2))
+        spans[:, 0, 0] = spans[:, 1, 0] = starts
+        spans[:, 2, 0] = spans[:, 3, 0] = ends
+        spans[:, :, 1] = (0, 1, 1, 0)
+        self.span_collection.set_verts(spans)
+        if n * MIN_PIXELS_PER_EDGE_GAP > self.ax.bbox.width:
+            n = 0
+            starts = ends = starts[:0]
+        edges = np.empty((2 * n, 2, 2))
+        edges[:, 0, 0] = edges[:, 1, 0] = np.concatenate((starts, ends))
+        edges[:, :, 1] = (0, 1)
+        self.edge_collection.set_segments(edges)
+
+    def _on_draw(self, event):
+        # A full draw just rendered the empty axes: neither the strip nor the animated overlay.
+        self.background = self.canvas.copy_from_bbox(self.ax.bbox)
+        self.background_bounds = self.ax.bbox.bounds
+        self._draw_layers()
+
+    def _draw_layers(self):
+        if self.strip is not None:
+            width, height = self._pixel_size()
+            start_time = self.ax.get_xlim()[0]
+            if self.strip.covers(start_time, width, self.strip.pixels_per_second, height):
+                renderer = self.canvas.get_renderer()
+                gc = renderer.new_gc()
+                gc.set_clip_rectangle(self.ax.bbox)
+                renderer.draw_image(gc, int(round(self.ax.bbox.x0)), int(round(self.ax.bbox.y0)),
+                                    self.strip.window(start_time, width))
+                gc.restore()
+        self.ax.draw_artist(self.span_collection)
+        self.ax.draw_artist(self.edge_collection)
+
+    def blit(self):
+        """Redraw the waveform window and the overlay over the cached background, and blit them."""
+        if self.background is None or self.background_bounds != self.ax.bbox.bounds:
+            # Not drawn yet, or resized since: a full draw re-caches the background.
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        self._draw_layers()
+        self.canvas.blit(self.ax.bbox)